@@ -2,33 +2,119 @@
 Flask在线文件翻译应用
 """
 import os
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
-from docx import Document
-from docx.shared import Pt, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 from datetime import datetime
 import io
+import json
+import queue
+import threading
+import uuid
+import base64
 import config
 from file_parser import FileParser
 from translator import Translator
+from document_store import DocumentStore, KEY_PATTERN, fill_repeated_furniture
+from asset_store import AssetStore
+from exporter import Exporter
+from speculative import SpeculativeTranslator
+from segment import Segment
+import profiling
+from scheduler import get_scheduler, PRIORITY_INTERACTIVE
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = config.SECRET_KEY
 app.config['UPLOAD_FOLDER'] = config.UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = config.MAX_FILE_SIZE
 
+# 部署在反向代理之后时，按代理追加的 X-Forwarded-For 获取客户端地址
+if getattr(config, 'PROXY_COUNT', 0):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=config.PROXY_COUNT)
+
 # 确保上传文件夹存在
 os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
 
 # 初始化翻译器
 translator = Translator()
 
+# 上传的图片、Word内嵌图片等资源（按内容寻址，整图翻译可直接引用已上传的图片）
+asset_store = AssetStore(
+    getattr(config, 'ASSET_FOLDER', 'assets'),
+    ttl=getattr(config, 'ASSET_TTL', 24 * 3600)
+)
+
+# 服务端文档存储（按页分块保存，前端按需获取页面；文档保留时间延长时一并刷新其引用的资源）
+document_store = DocumentStore(
+    getattr(config, 'DOCUMENT_FOLDER', 'documents'),
+    ttl=getattr(config, 'DOCUMENT_TTL', 24 * 3600),
+    asset_store=asset_store
+)
+
+# 批量导出（从保存的译文生成，导出文件按内容摘要缓存）
+exporter = Exporter(
+    document_store,
+    getattr(config, 'EXPORT_CACHE_FOLDER', 'exports'),
+    ttl=getattr(config, 'EXPORT_CACHE_TTL', 24 * 3600)
+)
+
+# 资源的浏览器缓存时间（秒）：资源ID即内容摘要，内容不会改变
+ASSET_CACHE_MAX_AGE = 365 * 24 * 3600
+
+# 上传后的后台预翻译（结果随文档保存）
+speculative_translator = SpeculativeTranslator(translator, document_store)
+
+# 预加载文件解析器（预fork部署时在主进程中导入，工作进程共享已加载的模块）
+if getattr(config, 'PRELOAD_PARSERS', False):
+    FileParser.preload()
+    import bs4, docx  # 导出功能依赖  # noqa: F401
+
+def get_tenant():
+    """
+    获取当前用户标识（调度器据此在用户之间公平轮询）
+    
+    客户端自带的标识不可信，只使用前置认证代理设置的 TENANT_HEADER，否则按客户端IP区分
+    """
+    header = getattr(config, 'TENANT_HEADER', '')
+    if header and request.headers.get(header):
+        return request.headers[header]
+    return request.remote_addr or 'anonymous'
+
+@app.before_request
+def start_profiling():
+    """按需分析请求性能（管理员令牌或按比例采样），结果写入 PROFILE_FOLDER"""
+    if request.endpoint == 'static':
+        return
+    if profiling.requested(request.headers.get('X-Profile') or request.args.get('profile')):
+        profiling.start(request.path)
+
+@app.after_request
+def finish_profiling(response):
+    profile = profiling.stop()
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile.id
+    return response
+
+@app.teardown_request
+def teardown_profiling(error=None):
+    # 请求异常结束时 after_request 不会执行，在这里确保停止采样
+    profiling.stop()
+
 def allowed_file(filename):
     """检查文件类型是否允许"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in config.ALLOWED_EXTENSIONS
 
+def supported_language(lang):
+    """检查目标语言是否受支持（同时作为服务端译文的版本名）"""
+    return isinstance(lang, str) and lang in config.LANGUAGES and bool(KEY_PATTERN.match(lang))
+
+def allowed_image(filename):
+    """检查是否为允许的图片类型"""
+    return allowed_file(filename) and \
+           FileParser.get_handler(filename.rsplit('.', 1)[1].lower()).file_type == 'image'
+
 @app.route('/')
 def index():
     """首页"""
@@ -50,44 +136,54 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': '不支持的文件类型'}), 400
         
-        # 保存文件
+        # 保存文件（临时文件名加随机前缀，避免同名文件并发上传时互相覆盖或被删除）
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f'{uuid.uuid4().hex}_{filename}')
         file.save(file_path)
         
-        # 解析文件
+        # 解析文件（按扩展名从注册表获取解析器，首次使用时才加载对应的库）
         file_ext = filename.rsplit('.', 1)[1].lower()
+        handler = FileParser.get_handler(file_ext)
         
-        # 对于Word和PDF文档，使用格式化解析
-        if file_ext in ['docx', 'doc']:
-            html_content, paragraphs = FileParser.parse_docx_with_format(file_path)
+        # 对于Word和PDF文档，使用格式化解析，按页保存在服务端
+        if handler.has_format:
+            if handler.extracts_assets:
+                # 内嵌图片保存到资源存储，页面HTML中只引用URL
+                pages = handler.parse_pages(file_path, asset_store=asset_store)
+            else:
+                pages = handler.parse_pages(file_path)
             # 清理临时文件
             os.remove(file_path)
             
-            return jsonify({
-                'success': True,
-                'content': paragraphs,
-                'html_content': html_content,
-                'filename': filename,
-                'has_format': True,
-                'file_type': 'word'
-            })
-        elif file_ext == 'pdf':
-            html_content, paragraphs = FileParser.parse_pdf_with_format(file_path)
-            # 清理临时文件
-            os.remove(file_path)
+            doc_id = document_store.create(filename, handler.file_type, pages)
             
-            return jsonify({
-                'success': True,
-                'content': paragraphs,
-                'html_content': html_content,
-                'filename': filename,
-                'has_format': True,
-                'file_type': 'pdf'
-            })
+            # 只返回文档信息，段落和页面由前端按需获取（响应大小与文档大小无关）
+            with profiling.span('json.encode'):
+                response = jsonify({
+                    'success': True,
+                    'doc_id': doc_id,
+                    'segment_count': sum(len(page['segments']) for page in pages),
+                    'page_count': len(pages),
+                    'filename': filename,
+                    'has_format': True,
+                    'file_type': handler.file_type
+                })
+            
+            # 预翻译：立即在后台翻译到当前选择（或上次使用）的语言，点击翻译时直接使用已完成的译文
+            if speculative_translator.enabled():
+                speculative_translator.start(
+                    doc_id,
+                    get_tenant(),
+                    request.form.get('target_lang'),
+                    request.form.get('ai_model')
+                )
+            
+            return response
         else:
             # 其他文件类型使用普通解析
-            parsed_content = FileParser.parse_file(file_path, file_ext)
+            parsed_content = handler.parse(file_path)
+            # 图片保存到资源存储，整图翻译时可直接引用，无需再次上传
+            image_id = asset_store.put_file(file_path) if handler.file_type == 'image' else None
             # 清理临时文件
             os.remove(file_path)
             
@@ -95,7 +191,8 @@ def upload_file():
                 'success': True,
                 'content': parsed_content,
                 'filename': filename,
-                'has_format': False
+                'has_format': False,
+                'image_id': image_id
             })
         
     except Exception as e:
@@ -103,57 +200,279 @@ def upload_file():
 
 @app.route('/translate', methods=['POST'])
 def translate():
-    """翻译文本"""
+    """
+    翻译文本
+    
+    服务端文档（doc_id）的译文按页保存，响应只包含译文版本（translation_key），前端按需获取译文页面；
+    请求中直接提交 content 时响应包含全部译文段落。
+    
+    请求中 stream 为 true 时返回NDJSON流（每行一个事件），段落译完即推送，不必等待整篇完成：
+        {"type": "start", "total": 段落数}
+        {"type": "segment", "index": 段落序号, "id": 段落ID, "translation": 译文}
+        {"type": "done", "success": true, ...与非流式响应相同的字段}
+        {"type": "error", "error": 错误信息}
+    """
     try:
         data = request.get_json()
         
-        if not data or 'content' not in data:
+        if not data or ('content' not in data and 'doc_id' not in data):
             return jsonify({'error': '缺少内容'}), 400
         
-        content = data['content']
+        doc_id = data.get('doc_id')  # 服务端保存的文档
         target_lang = data.get('target_lang', 'zh-CN')
         source_lang = data.get('source_lang', 'auto')
         html_content = data.get('html_content')  # 原始HTML内容
+        
+        # 在调度任何翻译之前检查，避免译完才在保存时失败
+        if not supported_language(target_lang):
+            return jsonify({'error': f'不支持的目标语言: {target_lang}'}), 400
+        
+        if 'content' in data:
+            content = [Segment.from_dict(item) for item in data['content']]
+        else:
+            content = list(document_store.iter_segments(doc_id))
         ai_model = data.get('ai_model', 'gpt-4o')  # 选择的AI模型
         
         # 获取模型配置
         model_config = config.AI_MODELS.get(ai_model, config.AI_MODELS['gpt-4o'])
         
-        # 执行翻译（使用批量+线程池优化）
-        translated_content = translator.translate_batch(
-            content, 
-            target_lang, 
-            source_lang,
-            batch_size=config.BATCH_SIZE,
-            max_workers=config.MAX_WORKERS,
-            model_config=model_config
-        )
+        tenant = get_tenant()
+        # 记录本次选择，下次上传时预翻译到相同的语言和模型
+        speculative_translator.remember(tenant, target_lang, ai_model)
+        
+        # 上传后预翻译已完成的段落（保存在文档存储中，任一工作进程都能读取）
+        known_translations = None
+        if doc_id and source_lang == 'auto':
+            known_translations = speculative_translator.load(doc_id, target_lang, ai_model)
         
-        # 如果有HTML内容，生成翻译后的HTML
-        translated_html = None
-        if html_content:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
+        def run(emit=None):
+            # 执行翻译（使用批量+共享调度器优化，预翻译已完成的段落不再调用API）
+            translated_content = translator.translate_batch(
+                content, 
+                target_lang, 
+                source_lang,
+                batch_size=config.BATCH_SIZE,
+                max_workers=config.MAX_WORKERS,
+                model_config=model_config,
+                tenant=tenant,
+                on_segment=segment_callback(content, emit),
+                known_translations=known_translations
+            )
             
-            # 替换每个段落的文本
-            for item in translated_content:
-                element_id = item.get('id')
-                if element_id:
-                    element = soup.find(id=element_id)
-                    if element:
-                        element.string = item.get('translation', '')
+            # 服务端文档：按页保存译文，只返回译文版本，前端按需获取译文页面
+            if doc_id:
+                document_store.save_translation(doc_id, target_lang, translated_content)
+                return {
+                    'success': True,
+                    'doc_id': doc_id,
+                    'translation_key': target_lang,
+                    'segment_count': len(translated_content)
+                }
             
-            translated_html = str(soup)
+            return {
+                'success': True,
+                'translated_content': [segment.to_dict() for segment in translated_content],
+                'translated_html': build_translated_html(html_content, translated_content),
+                'doc_id': None,
+                'translation_key': None
+            }
         
-        return jsonify({
-            'success': True,
-            'translated_content': translated_content,
-            'translated_html': translated_html
-        })
+        if data.get('stream'):
+            return stream_translation(len(content), run)
+        
+        result = run()
+        with profiling.span('json.encode'):
+            return jsonify(result)
+        
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/translate_multi', methods=['POST'])
+def translate_multi():
+    """
+    一次翻译成多种语言
+    
+    源语言检测、去重和分批只做一次，所有语言的批次在共享调度器中并发，结果一起返回（服务端文档按语言分别保存）。
+    stream 为 true 时的事件与 /translate 相同，segment 事件多一个 lang 字段，start 事件的 total 为 段落数×语言数。
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or ('content' not in data and 'doc_id' not in data):
+            return jsonify({'error': '缺少内容'}), 400
+        
+        target_langs = data.get('target_langs')
+        if not isinstance(target_langs, list) or not target_langs:
+            return jsonify({'error': '缺少目标语言列表'}), 400
+        unknown = [lang for lang in target_langs if not supported_language(lang)]
+        if unknown:
+            return jsonify({'error': f"不支持的目标语言: {', '.join(map(str, unknown))}"}), 400
+        target_langs = list(dict.fromkeys(target_langs))
+        
+        doc_id = data.get('doc_id')
+        source_lang = data.get('source_lang', 'auto')
+        html_content = data.get('html_content')
+        
+        if 'content' in data:
+            content = [Segment.from_dict(item) for item in data['content']]
+        else:
+            content = list(document_store.iter_segments(doc_id))
+        ai_model = data.get('ai_model', 'gpt-4o')
+        model_config = config.AI_MODELS.get(ai_model, config.AI_MODELS['gpt-4o'])
+        tenant = get_tenant()
+        
+        def run(emit=None):
+            on_segment = None
+            if emit:
+                def on_segment(lang, idx, segment):
+                    emit({'type': 'segment', 'lang': lang, 'index': idx, 'id': segment.id, 'translation': segment.translation})
+            
+            translations = translator.translate_multi(
+                content,
+                target_langs,
+                source_lang,
+                batch_size=config.BATCH_SIZE,
+                max_workers=config.MAX_WORKERS,
+                model_config=model_config,
+                tenant=tenant,
+                on_segment=on_segment
+            )
+            
+            results = {}
+            for lang, translated_content in translations.items():
+                if doc_id:
+                    document_store.save_translation(doc_id, lang, translated_content)
+                    results[lang] = {'translation_key': lang}
+                    continue
+                results[lang] = {
+                    'translated_content': [segment.to_dict() for segment in translated_content],
+                    'translated_html': build_translated_html(html_content, translated_content),
+                    'translation_key': None
+                }
+            return {'success': True, 'doc_id': doc_id, 'translations': results}
+        
+        if data.get('stream'):
+            return stream_translation(len(content) * len(target_langs), run)
+        
+        result = run()
+        with profiling.span('json.encode'):
+            return jsonify(result)
         
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def build_translated_html(html_content, translated_content):
+    """把译文替换进原始HTML（按段落ID），没有HTML时返回None"""
+    if not html_content:
+        return None
+    from bs4 import BeautifulSoup
+    with profiling.span('html.replace'):
+        soup = BeautifulSoup(html_content, 'html.parser')
+        
+        # 替换每个段落的文本
+        for segment in translated_content:
+            if segment.id:
+                element = soup.find(id=segment.id)
+                if element:
+                    element.string = segment.translation or ''
+        fill_repeated_furniture(soup, {segment.id: segment for segment in translated_content if segment.id})
+        
+        return str(soup)
+
+def segment_callback(content, emit):
+    """流式响应时把完成的段落转为 segment 事件"""
+    if emit is None:
+        return None
+    positions = {id(segment): idx for idx, segment in enumerate(content)}
+    return lambda segment: emit({'type': 'segment', 'index': positions.get(id(segment)), 'id': segment.id, 'translation': segment.translation})
+
+def stream_translation(total, run):
+    """
+    在后台线程中执行 run(emit)，返回NDJSON流式响应，把每个完成的段落作为一行JSON推送给浏览器
+    
+    翻译在视图函数返回后才进行：请求的性能分析交给后台线程，响应结束时再写出
+    """
+    events = queue.Queue()
+    profile = profiling.release()
+    
+    def worker():
+        try:
+            with profiling.attached(profile):
+                events.put(dict(run(events.put), type='done'))
+        except Exception as e:
+            events.put({'type': 'error', 'error': str(e)})
+    
+    threading.Thread(target=worker, name='translate-stream', daemon=True).start()
+    
+    def generate():
+        yield json.dumps({'type': 'start', 'total': total}, ensure_ascii=False) + '\n'
+        while True:
+            event = events.get()
+            yield json.dumps(event, ensure_ascii=False) + '\n'
+            if event['type'] in ('done', 'error'):
+                return
+    
+    response = Response(generate(), mimetype='application/x-ndjson')
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profile.id
+        response.call_on_close(lambda: profiling.finish(profile))
+    return response
+
+@app.route('/documents/<doc_id>', methods=['GET'])
+def document_info(doc_id):
+    """获取服务端文档信息（页数、已有译文版本等）"""
+    try:
+        meta = document_store.get_meta(doc_id)
+        return jsonify({'success': True, **meta})
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+
+@app.route('/documents/<doc_id>/pages', methods=['GET'])
+def document_pages(doc_id):
+    """
+    按页码范围获取文档页面
+    
+    参数：start、end（页码，包含首尾），lang（译文版本，不传则返回原文）
+    """
+    try:
+        start = request.args.get('start', 1, type=int)
+        end = request.args.get('end', start, type=int)
+        # 限制单次获取的页数，保证响应大小可控
+        end = min(end, start + getattr(config, 'PAGE_FETCH_LIMIT', 10) - 1)
+        key = request.args.get('lang') or None
+        
+        pages = document_store.get_pages(doc_id, start, end, key)
+        
+        return jsonify({
+            'success': True,
+            'pages': [{'page': page['page'], 'html': page['html']} for page in pages]
+        })
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/assets/<asset_id>', methods=['GET'])
+def get_asset(asset_id):
+    """获取资源（内容寻址，同一URL的内容永不改变，浏览器可长期缓存）"""
+    try:
+        # send_file 把相对路径解析到应用目录，这里按当前工作目录转为绝对路径
+        path = os.path.abspath(asset_store.path(asset_id))
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    
+    response = send_file(path, mimetype=asset_store.mime_type(asset_id), conditional=True, etag=asset_id, max_age=ASSET_CACHE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    # 资源来自用户上传的文件，禁止按内容猜测类型，也不允许其中的脚本执行
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+    return response
+
 @app.route('/translate-single', methods=['POST'])
 def translate_single():
     """翻译单段文本（用于实时翻译）"""
@@ -167,8 +486,15 @@ def translate_single():
         target_lang = data.get('target_lang', 'zh-CN')
         source_lang = data.get('source_lang', 'auto')
         
-        # 执行翻译
-        translation = translator.translate_text(text, target_lang, source_lang)
+        # 执行翻译（交互式请求，优先调度）
+        translation = get_scheduler().run(
+            translator.translate_text,
+            text,
+            target_lang,
+            source_lang,
+            priority=PRIORITY_INTERACTIVE,
+            tenant=get_tenant()
+        )
         
         return jsonify({
             'success': True,
@@ -180,32 +506,70 @@ def translate_single():
 
 @app.route('/translate_image', methods=['POST'])
 def translate_image():
-    """整图翻译（直接发送图片给AI翻译）"""
+    """
+    整图翻译（直接发送图片给AI翻译）
+    
+    图片可以以下任一方式提供：
+    1. multipart/form-data 的 image 字段（二进制，参数 target_lang、ai_model 放在表单中）
+    2. JSON 中的 image_id：已通过 /upload 上传的图片
+    3. JSON 中的 image_base64（旧接口，按JPEG发送）
+    """
     try:
-        data = request.get_json()
+        mime_type = 'image/jpeg'
+        image_id = None
         
-        if not data or 'image_base64' not in data:
-            return jsonify({'error': '缺少图片数据'}), 400
+        if request.files:
+            params = request.form
+            image = request.files.get('image') or request.files.get('file')
+            if image is None or not allowed_image(image.filename):
+                return jsonify({'error': '不支持的图片类型'}), 400
+            image_id = asset_store.put(image.read(), image.filename.rsplit('.', 1)[1])
+        else:
+            params = request.get_json(silent=True) or {}
+            image_id = params.get('image_id')
+            if not image_id and 'image_base64' not in params:
+                return jsonify({'error': '缺少图片数据'}), 400
         
-        image_base64 = data['image_base64']
-        target_lang = data.get('target_lang', 'zh-CN')
-        ai_model = data.get('ai_model', 'gpt-4o')
+        if image_id:
+            # 只在发送给AI时编码一次
+            image_base64 = base64.b64encode(asset_store.read(image_id)).decode('ascii')
+            mime_type = asset_store.mime_type(image_id)
+        else:
+            image_base64 = params['image_base64']
+        
+        target_lang = params.get('target_lang', 'zh-CN')
+        ai_model = params.get('ai_model', 'gpt-4o')
         
         # 获取模型配置
         model_config = config.AI_MODELS.get(ai_model, config.AI_MODELS['gpt-4o'])
         
-        # 执行整图翻译
-        translation = translator.translate_image(
+        # 执行整图翻译（交互式请求，优先调度）
+        translation = get_scheduler().run(
+            translator.translate_image,
             image_base64,
             target_lang,
-            model_config=model_config
+            model_config=model_config,
+            mime_type=mime_type,
+            priority=PRIORITY_INTERACTIVE,
+            tenant=get_tenant()
         )
         
         return jsonify({
             'success': True,
-            'translation': translation
+            'translation': translation,
+            'image_id': image_id
         })
         
+    except RequestEntityTooLarge:
+        return jsonify({
+            'success': False,
+            'error': f"图片过大（上限 {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)}MB）"
+        }), 413
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': e.args[0]
+        }), 404
     except Exception as e:
         return jsonify({
             'success': False,
@@ -214,18 +578,37 @@ def translate_image():
 
 @app.route('/export', methods=['POST'])
 def export_translation():
-    """导出翻译结果（仅译文）"""
+    """
+    导出翻译结果
+    
+    服务端文档（doc_id + translation_key）从保存的译文段落生成（支持双译），无需前端回传内容；
+    其他文档按请求中的 content / translated_html 导出译文
+    """
     try:
         data = request.get_json()
         
+        doc_id = data.get('doc_id') if data else None
+        if doc_id and data.get('translation_key'):
+            return export_stored_translation(data)
+        
         if not data or 'content' not in data:
             return jsonify({'error': '缺少内容'}), 400
         
-        content = data['content']
+        content = [Segment.from_dict(item) for item in data['content']]
         format_type = data.get('format', 'txt')  # txt 或 docx
         filename = data.get('filename', '翻译结果')
         has_format = data.get('has_format', False)
         translated_html = data.get('translated_html')
+        omit_furniture = data.get('omit_furniture', False)  # 不导出页眉、页脚等页面装饰
+        
+        if omit_furniture:
+            content = [segment for segment in content if not segment.furniture]
+            if translated_html:
+                from bs4 import BeautifulSoup
+                soup = BeautifulSoup(translated_html, 'html.parser')
+                for element in soup.select('.pdf-furniture'):
+                    element.decompose()
+                translated_html = str(soup)
         
         if format_type == 'txt':
             # 导出为TXT文件（仅译文）
@@ -242,10 +625,9 @@ def export_translation():
                 output.write(text)
             else:
                 # 段落模式，只输出译文
-                for item in content:
-                    translation = item.get('translation', '')
-                    if translation:
-                        output.write(translation + "\n\n")
+                for segment in content:
+                    if segment.translation:
+                        output.write(segment.translation + "\n\n")
             
             # 转换为字节流
             output_bytes = io.BytesIO()
@@ -260,6 +642,9 @@ def export_translation():
             )
             
         elif format_type == 'docx':
+            from docx import Document
+            from docx.enum.text import WD_ALIGN_PARAGRAPH
+            
             # 导出为Word文档（仅译文）
             if has_format and translated_html:
                 # 使用mammoth将HTML转回Word（保留格式）
@@ -291,10 +676,9 @@ def export_translation():
                 doc = Document()
                 doc.add_heading('译文', 0).alignment = WD_ALIGN_PARAGRAPH.CENTER
                 
-                for item in content:
-                    translation = item.get('translation', '')
-                    if translation:
-                        doc.add_paragraph(translation)
+                for segment in content:
+                    if segment.translation:
+                        doc.add_paragraph(segment.translation)
             
             # 保存到内存
             output_bytes = io.BytesIO()
@@ -314,5 +698,72 @@ def export_translation():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def export_stored_translation(data):
+    """从服务端保存的译文段落导出单个文件（与批量导出共用生成逻辑和缓存）"""
+    doc_id = data['doc_id']
+    format_type = data.get('format', 'txt')
+    bilingual = bool(data.get('bilingual'))
+    try:
+        exporter.plan([doc_id], [data['translation_key']], [format_type])
+        path, _ = exporter.render(doc_id, data['translation_key'], format_type, bilingual, bool(data.get('omit_furniture')))
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    filename = data.get('filename') or os.path.splitext(document_store.get_meta(doc_id)['filename'])[0]
+    mimetype = 'text/plain' if format_type == 'txt' else 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+    return send_file(
+        os.path.abspath(path),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=f"{filename}_{'双译' if bilingual else '译文'}.{format_type}"
+    )
+
+@app.route('/export/batch', methods=['GET', 'POST'])
+def export_batch():
+    """
+    批量导出服务端文档的译文（ZIP，边生成边发送）
+    
+    参数（POST为JSON，GET为查询参数，列表参数在查询中可重复）：
+        doc_ids: 文档ID列表
+        langs: 目标语言列表，不传时导出每个文档已有的全部译文
+        formats: txt、docx（默认txt）
+        bilingual: 原文和译文对照导出
+        omit_furniture: 不导出页眉、页脚等页面装饰
+    """
+    try:
+        if request.method == 'POST':
+            data = request.get_json() or {}
+        else:
+            data = {
+                'doc_ids': request.args.getlist('doc_id'),
+                'langs': request.args.getlist('lang') or None,
+                'formats': request.args.getlist('format') or None,
+                'bilingual': request.args.get('bilingual') in ('1', 'true'),
+                'omit_furniture': request.args.get('omit_furniture') in ('1', 'true')
+            }
+        
+        doc_ids = data.get('doc_ids')
+        if not doc_ids or not isinstance(doc_ids, list):
+            return jsonify({'error': '缺少文档ID'}), 400
+        
+        # 先校验参数并生成全部文件，开始发送ZIP后无法再返回错误状态码
+        items = exporter.plan(doc_ids, data.get('langs'), data.get('formats') or ['txt'])
+        files = exporter.prepare(items, bool(data.get('bilingual')), bool(data.get('omit_furniture')))
+        
+        return Response(
+            exporter.stream_zip(files),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f"attachment; filename=translations-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"}
+        )
+    
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     app.run(debug=config.DEBUG, host='0.0.0.0', port=5001)
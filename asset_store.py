@@ -0,0 +1,127 @@
+"""
+资源存储模块 - 按内容寻址保存上传的图片等二进制资源
+
+资源ID为内容的SHA-256摘要加扩展名，同一张图片只保存一份；
+上传识别过的图片可直接用ID整图翻译，无需浏览器再次发送；
+Word文档中的内嵌图片以URL引用，文档HTML中不再携带图片数据。
+
+目录结构：
+    <root>/<ID前两位>/<资源ID>
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import time
+import uuid
+
+ASSET_ID_PATTERN = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{1,5}$')
+
+# 资源的访问路径（见 app.py 的 /assets/<asset_id>）
+ASSET_URL_PREFIX = '/assets/'
+
+# 两次清理之间的最短间隔（秒）
+CLEANUP_INTERVAL = 600
+
+
+class AssetStore:
+    """内容寻址的资源存储"""
+
+    def __init__(self, root: str, ttl: int = 24 * 3600):
+        """
+        Args:
+            root: 存储目录
+            ttl: 资源保留时间（秒），自最后一次写入或 touch() 起算
+        """
+        self.root = root
+        self.ttl = ttl
+        self._last_cleanup = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, data: bytes, extension: str) -> str:
+        """
+        保存资源
+
+        Args:
+            data: 资源内容
+            extension: 扩展名（如 png），决定返回时的MIME类型
+
+        Returns:
+            资源ID
+        """
+        self.cleanup()
+
+        asset_id = f'{hashlib.sha256(data).hexdigest()}.{extension.lower().lstrip(".")}'
+        if not ASSET_ID_PATTERN.match(asset_id):
+            raise ValueError(f"无效的资源类型: {extension}")
+
+        path = self._path(asset_id)
+        if os.path.exists(path):
+            # 已有相同内容，刷新保留时间即可
+            os.utime(path)
+            return asset_id
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return asset_id
+
+    def put_file(self, file_path: str) -> str:
+        """保存文件（扩展名取自文件名）"""
+        with open(file_path, 'rb') as f:
+            return self.put(f.read(), file_path.rsplit('.', 1)[-1])
+
+    def path(self, asset_id: str) -> str:
+        """资源文件路径（校验ID，防止路径穿越）"""
+        if not ASSET_ID_PATTERN.match(asset_id or ''):
+            raise KeyError(f"资源不存在: {asset_id}")
+        path = self._path(asset_id)
+        if not os.path.exists(path):
+            raise KeyError(f"资源不存在或已过期: {asset_id}")
+        return path
+
+    def touch(self, asset_ids):
+        """刷新资源的保留时间（引用它们的文档仍在使用），已过期删除的资源忽略"""
+        for asset_id in asset_ids:
+            if not ASSET_ID_PATTERN.match(asset_id or ''):
+                continue
+            try:
+                os.utime(self._path(asset_id))
+            except OSError:
+                continue
+
+    def read(self, asset_id: str) -> bytes:
+        with open(self.path(asset_id), 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def url(asset_id: str) -> str:
+        """资源的访问URL（内容不变，浏览器可长期缓存）"""
+        return f'{ASSET_URL_PREFIX}{asset_id}'
+
+    @staticmethod
+    def mime_type(asset_id: str) -> str:
+        return mimetypes.guess_type(asset_id)[0] or 'application/octet-stream'
+
+    def cleanup(self, force: bool = False):
+        """删除超过保留时间的资源（默认每 CLEANUP_INTERVAL 秒最多执行一次）"""
+        now = time.time()
+        if not force and now - self._last_cleanup < CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        for prefix in os.listdir(self.root):
+            prefix_dir = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                path = os.path.join(prefix_dir, name)
+                try:
+                    if now - os.path.getmtime(path) > self.ttl:
+                        os.remove(path)
+                except OSError:
+                    continue
+
+    def _path(self, asset_id: str) -> str:
+        return os.path.join(self.root, asset_id[:2], asset_id)
@@ -0,0 +1,85 @@
+"""
+段落内存基准 - 对比段落dict与Segment对象的内存占用
+
+用法：
+    python benchmarks/bench_segment_memory.py [--count 200000]
+
+模拟表格密集的大文档：每段包含 id/text/tag/index/page/is_table/row/col，
+并模拟翻译后附带译文的结果。
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segment import Segment
+
+
+def build_dicts(count: int):
+    """原有表示：每段一个dict，翻译时再复制一份"""
+    items = []
+    for idx in range(count):
+        items.append({
+            'id': f'para-{idx}',
+            'text': f'cell {idx}',
+            'tag': ''.join(['t', 'd']),  # 模拟解析时动态生成的标签字符串
+            'index': idx,
+            'page': idx // 500 + 1,
+            'is_table': True,
+            'row': idx % 50,
+            'col': idx % 8
+        })
+    results = []
+    for item in items:
+        result_item = item.copy()
+        result_item['translation'] = item['text']
+        results.append(result_item)
+    return items, results
+
+
+def build_segments(count: int):
+    """紧凑表示：Segment对象，译文原地写入"""
+    segments = []
+    for idx in range(count):
+        segments.append(Segment(
+            id=f'para-{idx}',
+            text=f'cell {idx}',
+            tag=''.join(['t', 'd']),
+            index=idx,
+            page=idx // 500 + 1,
+            is_table=True,
+            row=idx % 50,
+            col=idx % 8
+        ))
+    for segment in segments:
+        segment.translation = segment.text
+    return segments
+
+
+def measure(builder, count: int) -> int:
+    """返回构建过程中的峰值内存（字节）"""
+    tracemalloc.start()
+    data = builder(count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='段落表示内存对比')
+    parser.add_argument('--count', type=int, default=200000)
+    args = parser.parse_args()
+
+    dict_peak = measure(build_dicts, args.count)
+    segment_peak = measure(build_segments, args.count)
+    print(f"段落数: {args.count}")
+    print(f"dict     峰值内存: {dict_peak / 1024 / 1024:.1f} MB")
+    print(f"Segment  峰值内存: {segment_peak / 1024 / 1024:.1f} MB")
+    print(f"节省: {(dict_peak - segment_peak) / dict_peak:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+启动时间基准 - 测量导入应用的耗时和内存占用
+
+用法：
+    python benchmarks/bench_startup.py [--runs 5]
+
+分别在全新的子进程中测量：
+1. lazy：只导入 app（解析库首次使用时才加载）
+2. preload：导入 app 后预加载全部解析库（等同 PRELOAD_PARSERS = True）
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+if sys.argv[1] == 'preload':
+    from file_parser import FileParser
+    FileParser.preload()
+    import bs4, docx
+elapsed = time.perf_counter() - start
+maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform != 'darwin':
+    maxrss *= 1024
+print(json.dumps({'seconds': elapsed, 'rss': maxrss, 'modules': len(sys.modules)}))
+"""
+
+
+def measure(mode: str, runs: int):
+    """在子进程中多次测量，返回中位数"""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE, mode],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'seconds': statistics.median(sample['seconds'] for sample in samples),
+        'rss': statistics.median(sample['rss'] for sample in samples),
+        'modules': samples[-1]['modules'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='应用启动时间和内存测量')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'模式':<10}{'导入耗时(ms)':>14}{'峰值RSS(MB)':>14}{'模块数':>8}")
+    for mode in ('lazy', 'preload'):
+        result = measure(mode, args.runs)
+        print(f"{mode:<10}{result['seconds'] * 1000:>14.1f}{result['rss'] / 1024 / 1024:>14.1f}{result['modules']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+批量翻译报文格式基准 - 对比 json 与 compact 两种格式的token开销
+
+用法：
+    python benchmarks/bench_wire_format.py [文档路径] [--batch-size 15] [--target zh-CN]
+
+不指定文档时使用内置样例段落。安装了 tiktoken 时使用真实分词计数，否则按字符估算。
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from translator import Translator
+
+SAMPLE_TEXTS = [
+    "Total operating revenue increased by 12.4% compared with the previous fiscal year.",
+    "Net cash flows from operating activities",
+    "The Group's return on assets (ROA) remained stable at 4.2%, while adj_ret declined slightly.",
+    "Notes to the consolidated financial statements",
+    "Management believes that the current liquidity position is sufficient to meet obligations for the next twelve months.",
+    "Accounts receivable",
+    "In accordance with IFRS 9, expected credit losses are measured on a forward-looking basis.",
+    "Risk factors",
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """估算token数量（优先使用tiktoken）"""
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding('cl100k_base').encode(text))
+    except ImportError:
+        # 粗略估算：中日韩字符约1个token，其余约4个字符1个token
+        cjk = sum(1 for char in text if ord(char) >= 0x3000)
+        return cjk + (len(text) - cjk + 3) // 4
+
+
+def fake_response(texts, wire_format: str) -> str:
+    """用原文模拟模型返回，用于估算输出端的格式开销"""
+    if wire_format == 'json':
+        import json
+        return json.dumps([{"index": idx, "translation": text} for idx, text in enumerate(texts)],
+                          ensure_ascii=False, indent=2)
+    return '\n'.join(f'[[{idx}]]{text}' for idx, text in enumerate(texts))
+
+
+def load_texts(path: str):
+    """从文档中提取段落文本"""
+    from file_parser import FileParser
+    ext = path.rsplit('.', 1)[1].lower()
+    if ext == 'pdf':
+        _, paragraphs = FileParser.parse_pdf_with_format(path)
+    else:
+        _, paragraphs = FileParser.parse_docx_with_format(path)
+    return [segment.text for segment in paragraphs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量翻译报文格式token对比')
+    parser.add_argument('document', nargs='?', help='PDF或Word文档路径')
+    parser.add_argument('--batch-size', type=int, default=15)
+    parser.add_argument('--target', default='zh-CN')
+    args = parser.parse_args()
+
+    texts = load_texts(args.document) if args.document else SAMPLE_TEXTS * 4
+    translator = Translator()
+    batches = [texts[i:i + args.batch_size] for i in range(0, len(texts), args.batch_size)]
+
+    totals = {}
+    for wire_format in ('json', 'compact'):
+        input_tokens = 0
+        output_tokens = 0
+        for batch in batches:
+            messages = translator.build_batch_messages(batch, args.target, 'auto', wire_format)
+            input_tokens += sum(estimate_tokens(message['content']) for message in messages)
+            output_tokens += estimate_tokens(fake_response(batch, wire_format))
+        totals[wire_format] = (input_tokens, output_tokens)
+
+    content_tokens = sum(estimate_tokens(text) for text in texts)
+    print(f"段落数: {len(texts)}，批次数: {len(batches)}，正文token: {content_tokens}")
+    print(f"{'格式':<10}{'输入token':>12}{'输出token':>12}")
+    for wire_format, (input_tokens, output_tokens) in totals.items():
+        print(f"{wire_format:<10}{input_tokens:>12}{output_tokens:>12}")
+
+    json_in, json_out = totals['json']
+    compact_in, compact_out = totals['compact']
+    print(f"输入节省: {json_in - compact_in} token ({(json_in - compact_in) / json_in:.1%})")
+    print(f"输出节省: {json_out - compact_out} token ({(json_out - compact_out) / json_out:.1%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,510 @@
+"""
+端到端压测 - 多个虚拟用户并发执行 上传PDF → 翻译 → 导出（以及整图翻译），
+统计各接口的吞吐量和 p50/p95/p99 延迟，以及服务进程的CPU和内存占用
+
+用法：
+    python benchmarks/load_test.py [--users 10] [--duration 60] [--server werkzeug|gunicorn]
+    python benchmarks/load_test.py --users 20 --iterations 5 --max-p95 /translate=3000 --json result.json
+
+默认在临时目录中启动：
+1. 本地模拟翻译API（按 --provider-latency 延迟返回，译文即原文加前缀）
+2. 应用服务（子进程，配置指向模拟API，上传和文档目录都在临时目录中）
+
+默认关闭译文缓存（--with-cache 开启），每个虚拟用户上传不同内容的文档，测量实际翻译路径。
+指定 --url 时直接压测已运行的服务（不启动模拟API和应用，不统计服务端资源）。
+--max-p95 / --max-error-rate 超出时以非零状态退出，可在CI中检查性能回退。
+安装了 psutil 时用其统计资源，否则读取 /proc（仅Linux）。
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROUTES = ('/upload', '/translate', '/translate_image', '/export')
+
+PARAGRAPH = ("Paragraph {n} of document {doc}: total operating revenue increased by {pct}% compared "
+             "with the previous fiscal year, driven by growth in core markets.")
+
+# 应用子进程使用的配置：在仓库配置（或示例配置）的基础上覆盖
+CONFIG_TEMPLATE = """
+_source = {source!r}
+exec(compile(open(_source, encoding='utf-8').read(), _source, 'exec'))
+API_BASE_URL = {provider_url!r}
+API_KEY = 'load-test'
+for _model in AI_MODELS.values():
+    _model['base_url'] = API_BASE_URL
+UPLOAD_FOLDER = {upload_folder!r}
+DOCUMENT_FOLDER = {document_folder!r}
+DEBUG = False
+TRANSLATION_CACHE_SIZE = {cache_size!r}
+TENANT_HEADER = 'X-User-Id'  # 每个虚拟用户单独计算公平调度（压测客户端视为可信代理）
+"""
+
+# werkzeug：Flask自带的多线程服务；gunicorn：使用仓库的 gunicorn.conf.py（预fork + gthread）
+WERKZEUG_COMMAND = "import app; app.app.run(host='127.0.0.1', port={port}, threaded=True, use_reloader=False)"
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    """模拟 /v1/chat/completions：紧凑格式原样返回编号，其余返回固定文本；请求 stream 时按SSE分块返回"""
+
+    protocol_version = 'HTTP/1.1'
+    latency = 0.3
+    jitter = 0.1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        self.close_connection = True
+        delay = max(0.0, random.gauss(self.latency, self.jitter))
+
+        user_content = payload['messages'][-1]['content']
+        if isinstance(user_content, list):
+            content = '图片译文'
+        elif '[[编号:语言代码]]' in payload['messages'][0]['content']:
+            # 多语言请求：第一行为 语言代码=名称；每段按 [[编号:语言代码]] 逐语言返回
+            header, *lines = user_content.split('\n')
+            langs = [item.split('=', 1)[0] for item in header.split('：', 1)[1].split('；')]
+            content = '\n'.join(line.replace(']]', f':{lang}]]{lang}:', 1) for line in lines for lang in langs)
+        elif payload['messages'][0]['role'] == 'system':
+            # 去掉第一行语言说明，其余按 [[编号]] 原样返回
+            content = '\n'.join(line.replace(']]', ']]译:', 1) for line in user_content.split('\n')[1:])
+        else:
+            content = '译文'
+
+        if payload.get('stream'):
+            self._send_stream(content, delay)
+            return
+
+        time.sleep(delay)
+        body = json.dumps({'choices': [{'message': {'role': 'assistant', 'content': content}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, content: str, delay: float):
+        """首个分块前等待一半延迟，其余时间均摊到各分块之间（模拟逐token生成）"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        chunks = [content[pos:pos + 16] for pos in range(0, len(content), 16)] or ['']
+        time.sleep(delay / 2)
+        for chunk in chunks:
+            event = {'choices': [{'delta': {'content': chunk}}]}
+            self._write_chunk(f'data: {json.dumps(event, ensure_ascii=False)}\n\n'.encode('utf-8'))
+            time.sleep(delay / 2 / len(chunks))
+        self._write_chunk(b'data: [DONE]\n\n')
+        self._write_chunk(b'')
+
+    def _write_chunk(self, data: bytes):
+        """按HTTP分块编码写出（与真实API一致，客户端收到一块即可处理一块）"""
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_provider(latency: float, jitter: float):
+    """在后台线程中启动模拟翻译API，返回 (server, url)"""
+    MockProviderHandler.latency = latency
+    MockProviderHandler.jitter = jitter
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockProviderHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def build_pdf(doc_no: int, pages: int) -> bytes:
+    """生成测试PDF，每个文档内容不同"""
+    import fitz
+    doc = fitz.open()
+    for page_no in range(pages):
+        page = doc.new_page()
+        y = 72
+        for n in range(12):
+            text = PARAGRAPH.format(n=page_no * 12 + n, doc=doc_no, pct=random.randint(1, 99))
+            page.insert_textbox(fitz.Rect(72, y, 540, y + 48), text, fontsize=10)
+            y += 52
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def build_image() -> bytes:
+    """生成一张带文字的小PNG图片"""
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page(width=320, height=80)
+    page.insert_text((12, 44), 'Quarterly revenue report', fontsize=18)
+    png = page.get_pixmap().tobytes('png')
+    doc.close()
+    return png
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(workdir: str, provider_url: str, server: str, with_cache: bool, overrides):
+    """在子进程中启动应用，返回 (进程, url, 日志路径)"""
+    source = os.path.join(ROOT, 'config.py')
+    if not os.path.exists(source):
+        source = os.path.join(ROOT, 'config.example.py')
+
+    config_text = CONFIG_TEMPLATE.format(
+        source=source,
+        provider_url=provider_url,
+        upload_folder=os.path.join(workdir, 'uploads'),
+        document_folder=os.path.join(workdir, 'documents'),
+        cache_size=50000 if with_cache else 0,
+    )
+    for key, value in overrides:
+        config_text += f'{key} = {value}\n'
+    with open(os.path.join(workdir, 'config.py'), 'w', encoding='utf-8') as f:
+        f.write(config_text)
+
+    port = free_port()
+    if server == 'gunicorn':
+        command = ['gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'), '--bind', f'127.0.0.1:{port}', 'app:app']
+    else:
+        command = [sys.executable, '-c', WERKZEUG_COMMAND.format(port=port)]
+
+    # 临时目录在前，应用和 gunicorn.conf.py 导入的都是覆盖后的配置
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([workdir, ROOT]), PYTHONUNBUFFERED='1')
+    log_path = os.path.join(workdir, 'server.log')
+    log = open(log_path, 'w')
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return process, f'http://127.0.0.1:{port}', log_path
+
+
+def wait_until_ready(url: str, process=None, timeout: float = 30):
+    import requests
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError('应用进程启动失败')
+        try:
+            if requests.get(url + '/', timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('等待应用启动超时')
+
+
+class ResourceMonitor(threading.Thread):
+    """定期采样服务进程（含子进程）的CPU和RSS"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.cpu_samples = []
+        self.rss_samples = []
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            import psutil
+            sample = self._psutil_sampler(psutil)
+        except ImportError:
+            if not os.path.exists(f'/proc/{self.pid}/stat'):
+                return
+            sample = self._proc_sampler()
+
+        while not self._stopped.wait(self.interval):
+            try:
+                cpu, rss = sample()
+            except (OSError, ValueError):
+                break
+            if cpu is not None:
+                self.cpu_samples.append(cpu)
+            self.rss_samples.append(rss)
+
+    def stop(self):
+        self._stopped.set()
+        self.join(timeout=2)
+
+    def summary(self):
+        if not self.rss_samples:
+            return None
+        return {
+            'cpu_avg_percent': sum(self.cpu_samples) / len(self.cpu_samples) if self.cpu_samples else 0.0,
+            'cpu_max_percent': max(self.cpu_samples, default=0.0),
+            'rss_max_mb': max(self.rss_samples) / 1024 / 1024,
+        }
+
+    def _psutil_sampler(self, psutil):
+        root = psutil.Process(self.pid)
+        processes = {}
+
+        def sample():
+            cpu = 0.0
+            rss = 0
+            for proc in [root] + root.children(recursive=True):
+                # 第一次调用 cpu_percent 只记录基准
+                proc = processes.setdefault(proc.pid, proc)
+                try:
+                    cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                except psutil.NoSuchProcess:
+                    processes.pop(proc.pid, None)
+            return cpu, rss
+        return sample
+
+    def _proc_sampler(self):
+        ticks_per_second = os.sysconf('SC_CLK_TCK')
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        state = {'ticks': None, 'time': None}
+
+        def process_tree():
+            pids = [self.pid]
+            parents = {}
+            for name in os.listdir('/proc'):
+                if name.isdigit():
+                    try:
+                        with open(f'/proc/{name}/stat') as f:
+                            parents[int(name)] = int(f.read().rsplit(')', 1)[1].split()[1])
+                    except (OSError, IndexError, ValueError):
+                        continue
+            for pid in pids:
+                pids.extend(child for child, parent in parents.items() if parent == pid)
+            return pids
+
+        def sample():
+            ticks = 0
+            rss = 0
+            for pid in process_tree():
+                try:
+                    with open(f'/proc/{pid}/stat') as f:
+                        fields = f.read().rsplit(')', 1)[1].split()
+                    with open(f'/proc/{pid}/statm') as f:
+                        rss += int(f.read().split()[1]) * page_size
+                except OSError:
+                    continue
+                ticks += int(fields[11]) + int(fields[12])  # utime + stime
+            now = time.monotonic()
+            cpu = None
+            if state['ticks'] is not None:
+                cpu = (ticks - state['ticks']) / ticks_per_second / (now - state['time']) * 100
+            state['ticks'], state['time'] = ticks, now
+            return cpu, rss
+        return sample
+
+
+class Stats:
+    """按接口记录延迟和错误"""
+
+    def __init__(self):
+        self.latencies = {route: [] for route in ROUTES}
+        self.errors = {route: 0 for route in ROUTES}
+        self.first_errors = {}  # 每个接口第一次出错的信息，便于排查
+        self._lock = threading.Lock()
+
+    def record(self, route: str, seconds: float, ok: bool, error: str = None):
+        with self._lock:
+            if ok:
+                self.latencies[route].append(seconds)
+            else:
+                self.errors[route] += 1
+                self.first_errors.setdefault(route, error)
+
+    def summary(self, elapsed: float):
+        result = {}
+        for route in ROUTES:
+            samples = sorted(self.latencies[route])
+            total = len(samples) + self.errors[route]
+            if not total:
+                continue
+            result[route] = {
+                'requests': total,
+                'errors': self.errors[route],
+                'throughput_rps': len(samples) / elapsed,
+                'p50_ms': percentile(samples, 50) * 1000,
+                'p95_ms': percentile(samples, 95) * 1000,
+                'p99_ms': percentile(samples, 99) * 1000,
+            }
+        return result
+
+
+def percentile(samples, pct: float) -> float:
+    """最近秩百分位数（samples已排序）"""
+    if not samples:
+        return 0.0
+    rank = max(1, -(-len(samples) * pct // 100))
+    return samples[int(rank) - 1]
+
+
+def virtual_user(user_no: int, base_url: str, documents, image: bytes, args, stats: Stats, deadline: float):
+    """一个虚拟用户：循环执行 上传 → 翻译 → 导出，按比例穿插整图翻译"""
+    import requests
+
+    session = requests.Session()
+    session.headers['X-User-Id'] = f'load-user-{user_no}'
+    rng = random.Random(user_no)
+
+    def call(route, **kwargs):
+        start = time.perf_counter()
+        error = None
+        try:
+            response = session.post(base_url + route, timeout=args.timeout, **kwargs)
+            ok = response.status_code == 200
+            if not ok:
+                error = f'{response.status_code} {response.text[:200]}'
+        except requests.RequestException as e:
+            response, ok, error = None, False, str(e)
+        stats.record(route, time.perf_counter() - start, ok, error)
+        return response if ok else None
+
+    iteration = 0
+    while time.time() < deadline and (not args.iterations or iteration < args.iterations):
+        iteration += 1
+        doc_no = (user_no + iteration) % len(documents)
+        target_lang = rng.choice(args.languages)
+
+        response = call('/upload', files={'file': (f'doc{doc_no}.pdf', documents[doc_no], 'application/pdf')})
+        if response is not None:
+            doc_id = response.json()['doc_id']
+            response = call('/translate', json={'doc_id': doc_id, 'target_lang': target_lang, 'ai_model': args.model})
+            if response is not None:
+                translated = response.json()
+                call('/export', json={
+                    'format': 'docx' if iteration % 2 else 'txt',
+                    'filename': f'doc{doc_no}',
+                    'doc_id': doc_id,
+                    'translation_key': translated['translation_key'],
+                })
+
+        if rng.random() < args.image_ratio:
+            call('/translate_image', files={'image': ('image.png', image, 'image/png')},
+                 data={'target_lang': target_lang, 'ai_model': args.model})
+
+
+def parse_limits(values):
+    """解析 ROUTE=毫秒 形式的p95上限"""
+    limits = {}
+    for value in values or []:
+        route, _, ms = value.partition('=')
+        limits[route] = float(ms)
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description='应用端到端压测')
+    parser.add_argument('--users', type=int, default=10, help='并发虚拟用户数')
+    parser.add_argument('--duration', type=float, default=60, help='压测时长（秒）')
+    parser.add_argument('--iterations', type=int, default=0, help='每个用户的循环次数（0表示不限，直到时长结束）')
+    parser.add_argument('--pages', type=int, default=5, help='测试PDF页数')
+    parser.add_argument('--documents', type=int, default=8, help='不同内容的测试文档数')
+    parser.add_argument('--image-ratio', type=float, default=0.3, help='每次循环执行整图翻译的概率')
+    parser.add_argument('--languages', nargs='+', default=['zh-CN', 'ja', 'fr'])
+    parser.add_argument('--model', default='gpt-4o')
+    parser.add_argument('--provider-latency', type=float, default=0.3, help='模拟API的平均延迟（秒）')
+    parser.add_argument('--provider-jitter', type=float, default=0.1)
+    parser.add_argument('--server', choices=['werkzeug', 'gunicorn'], default='werkzeug')
+    parser.add_argument('--with-cache', action='store_true', help='开启译文缓存')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='覆盖应用配置（值为Python字面量），如 --set MAX_CONCURRENT_REQUESTS=16')
+    parser.add_argument('--url', help='压测已运行的服务（不启动模拟API和应用）')
+    parser.add_argument('--timeout', type=float, default=300, help='单个请求超时（秒）')
+    parser.add_argument('--json', help='结果写入JSON文件')
+    parser.add_argument('--max-p95', action='append', metavar='ROUTE=MS', help='p95上限（毫秒），超出时退出码为1')
+    parser.add_argument('--max-error-rate', type=float, default=None, help='错误率上限，超出时退出码为1')
+    args = parser.parse_args()
+
+    print(f"生成 {args.documents} 个测试文档（{args.pages} 页）...")
+    documents = [build_pdf(doc_no, args.pages) for doc_no in range(args.documents)]
+    image = build_image()
+
+    process = None
+    monitor = None
+    base_url = args.url
+    if base_url is None:
+        workdir = tempfile.mkdtemp(prefix='load-test-')
+        _, provider_url = start_mock_provider(args.provider_latency, args.provider_jitter)
+        overrides = [item.split('=', 1) for item in args.set]
+        process, base_url, log_path = start_app(workdir, provider_url, args.server, args.with_cache, overrides)
+        print(f"应用: {base_url}（{args.server}，日志 {log_path}），模拟API: {provider_url}")
+        try:
+            wait_until_ready(base_url, process)
+        except RuntimeError:
+            process.kill()
+            with open(log_path) as f:
+                print(f.read())
+            raise
+        monitor = ResourceMonitor(process.pid)
+        monitor.start()
+
+    stats = Stats()
+    print(f"{args.users} 个虚拟用户，时长 {args.duration:g}s" + (f"，每用户 {args.iterations} 轮" if args.iterations else ''))
+    start = time.time()
+    deadline = start + args.duration
+    users = [
+        threading.Thread(target=virtual_user, args=(user_no, base_url, documents, image, args, stats, deadline))
+        for user_no in range(args.users)
+    ]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.time() - start
+
+    resources = None
+    if monitor is not None:
+        monitor.stop()
+        resources = monitor.summary()
+    if process is not None:
+        process.terminate()
+        process.wait(timeout=10)
+
+    routes = stats.summary(elapsed)
+    print(f"\n耗时 {elapsed:.1f}s")
+    print(f"{'接口':<18}{'请求数':>8}{'错误':>6}{'吞吐(req/s)':>13}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for route, item in routes.items():
+        print(f"{route:<18}{item['requests']:>8}{item['errors']:>6}{item['throughput_rps']:>13.2f}"
+              f"{item['p50_ms']:>10.0f}{item['p95_ms']:>10.0f}{item['p99_ms']:>10.0f}")
+    for route, error in stats.first_errors.items():
+        print(f"{route} 首个错误: {error}")
+    if resources:
+        print(f"服务端CPU 平均 {resources['cpu_avg_percent']:.0f}% / 峰值 {resources['cpu_max_percent']:.0f}%，"
+              f"峰值RSS {resources['rss_max_mb']:.1f}MB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'elapsed': elapsed, 'users': args.users, 'routes': routes, 'server': resources}, f, indent=2)
+
+    # CI检查
+    failures = []
+    for route, limit in parse_limits(args.max_p95).items():
+        if route in routes and routes[route]['p95_ms'] > limit:
+            failures.append(f"{route} p95 {routes[route]['p95_ms']:.0f}ms > {limit:.0f}ms")
+    if args.max_error_rate is not None:
+        total = sum(item['requests'] for item in routes.values())
+        errors = sum(item['errors'] for item in routes.values())
+        if total and errors / total > args.max_error_rate:
+            failures.append(f"错误率 {errors / total:.2%} > {args.max_error_rate:.2%}")
+    if not any(item['requests'] > item['errors'] for item in routes.values()):
+        failures.append('没有完成任何请求')
+    for failure in failures:
+        print(f"未通过: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -45,9 +45,18 @@ AI_MODELS = {
 
 # 文件上传配置
 UPLOAD_FOLDER = 'uploads'
-MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB（文档按页存储在服务端，前端按需加载页面）
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc', 'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
 
+# 文档存储配置（解析后的文档按页保存在服务端）
+DOCUMENT_FOLDER = 'documents'
+DOCUMENT_TTL = 24 * 3600  # 文档保留时间（秒），自最后一次上传或保存译文起算
+PAGE_FETCH_LIMIT = 10  # 单次请求最多获取的页数
+ASSET_FOLDER = 'assets'  # 上传图片、Word内嵌图片等资源的存储目录（按内容寻址）
+ASSET_TTL = 24 * 3600  # 资源保留时间（秒），Word内嵌图片由文档引用，文档保存译文时一并刷新；不应短于 DOCUMENT_TTL
+EXPORT_CACHE_FOLDER = 'exports'  # 批量导出文件的缓存目录（按文档内容和导出选项的摘要缓存）
+EXPORT_CACHE_TTL = 24 * 3600  # 导出文件缓存保留时间（秒），自最后一次使用起算
+
 # 支持的语言
 LANGUAGES = {
     'zh-CN': '中文（简体）',
@@ -70,4 +79,25 @@ DEBUG = True
 
 # 翻译优化配置
 BATCH_SIZE = 15  # 每批翻译的段落数（10-20段最佳）
-MAX_WORKERS = 3  # 线程池最大并发数（建议2-5）
+MAX_WORKERS = 3  # 单个用户的最大并发批次数（建议2-5）
+MAX_CONCURRENT_REQUESTS = 8  # 整个进程对翻译API的最大并发数（所有用户共享）
+TENANT_HEADER = ''  # 可信的用户标识请求头（由前置认证代理设置，并覆盖客户端传入的同名请求头，如 'X-Authenticated-User'），调度器按用户公平轮询；留空时按客户端IP区分用户
+PROXY_COUNT = 0  # 应用前面的反向代理层数：大于0时按代理追加的 X-Forwarded-For 识别客户端IP，直接对外提供服务时保持0（否则客户端可伪造IP）
+BATCH_WIRE_FORMAT = 'compact'  # 批量翻译报文格式：compact（编号分隔，省token）或 json（旧格式）；可在AI_MODELS中按模型设置 'wire_format' 覆盖
+LANGUAGES_PER_REQUEST = 1  # 多语言翻译（/translate_multi）时一个请求同时翻译的语言数，仅紧凑格式支持；能稳定处理多语言输出的模型可在AI_MODELS中设置 'languages_per_request' 覆盖
+STREAM_COMPLETIONS = True  # 流式接收翻译API输出：批量译文逐段解析并推送给浏览器；可在AI_MODELS中按模型设置 'stream' 覆盖（不支持流式的服务设为False）
+STREAM_INACTIVITY_TIMEOUT = 30  # 流式接收时两次收到数据之间的最长等待（秒），超时后未完成的段落逐段补译
+PREFILTER_ENABLED = True  # 本地预过滤：数字、日期、网址、编号及已是目标语言的段落不调用API，并在本地检测源语言
+PDF_FURNITURE_MIN_RATIO = 0.5  # PDF中至少在该比例的页面相同位置重复出现的文本（页眉、页脚、保密声明、水印等）视为页面装饰：单独成段只翻译一次，可在译文中隐藏，0表示不检测
+SEGMENT_SPLIT_TOKENS = 600  # 超过该token数的段落在句子边界切分后并发翻译（每块附带相邻原文作为上下文），0表示不切分
+PRELOAD_PARSERS = False  # 启动时预加载PDF/Word/图片解析库；配合gunicorn预fork（gunicorn.conf.py）使用，默认首次使用时才加载
+TRANSLATION_CACHE_SIZE = 50000  # 进程内译文缓存的段落数（按原文、语言、模型缓存），0表示关闭
+SPECULATIVE_TRANSLATION = False  # 上传文档后立即在后台预翻译到当前选择/上次使用的语言，结果随文档保存，任一工作进程处理的翻译请求都能直接使用（会预先消耗API额度）
+SPECULATIVE_DEFAULT_LANG = 'zh-CN'  # 无法得知用户选择时预翻译的目标语言
+SPECULATIVE_DEFAULT_MODEL = 'gpt-4o'  # 无法得知用户选择时预翻译使用的模型
+
+# 性能分析（按需对单个请求采样，输出火焰图和各阶段耗时，见 profiling.py）
+PROFILE_TOKEN = ''  # 管理员令牌：请求头 X-Profile 或查询参数 profile 等于该值时分析该请求，留空则关闭
+PROFILE_SAMPLE_RATE = 0.0  # 随机采样分析的请求比例（如 0.001），0表示关闭
+PROFILE_INTERVAL = 0.005  # 调用栈采样间隔（秒）
+PROFILE_FOLDER = 'profiles'  # 分析结果目录
@@ -0,0 +1,296 @@
+"""
+文档存储模块 - 在服务端按页保存解析后的文档和译文
+
+目录结构：
+    <root>/<doc_id>/meta.json                    文档信息（文件名、类型、页数、创建时间、引用的资源）
+    <root>/<doc_id>/source/<页码>.json           原文：该页HTML和段落
+    <root>/<doc_id>/translated/<key>/<页码>.json 译文：该页HTML和带译文的段落
+    <root>/<doc_id>/pretranslated/<语言>.json    上传后预翻译的结果（原文 -> 译文）
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+import profiling
+from asset_store import ASSET_URL_PREFIX
+from segment import Segment
+
+DOC_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+KEY_PATTERN = re.compile(r'^[\w.-]+$')
+# 页面HTML中引用的资源（Word内嵌图片等）
+ASSET_REFERENCE_PATTERN = re.compile(re.escape(ASSET_URL_PREFIX) + r'([0-9a-f]{64}\.[a-z0-9]{1,5})')
+
+
+_NUMBER_PATTERN = re.compile(r'\d+')
+
+
+def fill_repeated_furniture(soup, translations: Dict[str, Segment]):
+    """
+    重复出现的页面装饰（data-repeat-of 指向首次出现的段落）使用首次出现时的译文
+
+    只有数字不同时（如 Page 2 of 5）把译文中的数字换成本页的数字
+    """
+    for element in soup.find_all(attrs={'data-repeat-of': True}):
+        segment = translations.get(element['data-repeat-of'])
+        if segment is not None and segment.translation is not None:
+            element.string = repeat_translation(segment.text, segment.translation, element.get_text())
+
+
+def repeat_translation(source: str, translation: str, text: str) -> str:
+    """
+    按首次出现的 原文/译文 生成重复文本 text 的译文
+
+    译文中的数字与原文顺序相同时按位置替换，否则按数值对应替换；无法对应时返回原文 text
+    """
+    if text == source:
+        return translation
+    source_numbers = _NUMBER_PATTERN.findall(source)
+    numbers = _NUMBER_PATTERN.findall(text)
+    if len(numbers) != len(source_numbers):
+        return text
+
+    translated_numbers = _NUMBER_PATTERN.findall(translation)
+    if translated_numbers == source_numbers:
+        replacements = iter(numbers)
+        return _NUMBER_PATTERN.sub(lambda match: next(replacements), translation)
+    mapping = dict(zip(source_numbers, numbers))
+    if len(mapping) == len(source_numbers) and sorted(translated_numbers) == sorted(source_numbers):
+        return _NUMBER_PATTERN.sub(lambda match: mapping[match.group()], translation)
+    return text
+
+
+class DocumentStore:
+    """按页分块的文档存储"""
+
+    def __init__(self, root: str, ttl: int = 24 * 3600, asset_store=None):
+        """
+        Args:
+            root: 存储目录
+            ttl: 文档保留时间（秒），自最后一次写入起算，超时的文档在创建新文档时清理
+            asset_store: 页面引用的资源所在的资源存储；文档保留时间延长时一并刷新其引用的资源
+        """
+        self.root = root
+        self.ttl = ttl
+        self.asset_store = asset_store
+        os.makedirs(root, exist_ok=True)
+
+    @profiling.traced('store.create')
+    def create(self, filename: str, file_type: str, pages: List[Dict]) -> str:
+        """
+        保存分页解析结果
+
+        Args:
+            filename: 原始文件名
+            file_type: 文件类型（pdf/word）
+            pages: 页面列表，每页包含 html 和 segments
+
+        Returns:
+            文档ID
+        """
+        self.cleanup()
+
+        doc_id = uuid.uuid4().hex
+        doc_dir = os.path.join(self.root, doc_id)
+        os.makedirs(os.path.join(doc_dir, 'source'))
+
+        assets = set()
+        for page_num, page in enumerate(pages, 1):
+            assets.update(ASSET_REFERENCE_PATTERN.findall(page['html']))
+            self._write_json(os.path.join(doc_dir, 'source', f'{page_num}.json'), {
+                'html': page['html'],
+                'segments': [segment.to_dict() for segment in page['segments']]
+            })
+
+        self._write_json(os.path.join(doc_dir, 'meta.json'), {
+            'doc_id': doc_id,
+            'filename': filename,
+            'file_type': file_type,
+            'page_count': len(pages),
+            'segment_count': sum(len(page['segments']) for page in pages),
+            'created': time.time(),
+            'assets': sorted(assets)
+        })
+        return doc_id
+
+    def get_meta(self, doc_id: str) -> Dict:
+        """获取文档信息（包含已有的译文版本）"""
+        meta = self._read_json(os.path.join(self._doc_dir(doc_id), 'meta.json'))
+        translated_dir = os.path.join(self._doc_dir(doc_id), 'translated')
+        meta['translations'] = sorted(os.listdir(translated_dir)) if os.path.isdir(translated_dir) else []
+        return meta
+
+    @profiling.traced('store.get_pages')
+    def get_pages(self, doc_id: str, start: int, end: int, key: Optional[str] = None) -> List[Dict]:
+        """
+        获取页码范围内的页面（包含首尾）
+
+        Args:
+            key: 译文版本（如目标语言代码），为None时返回原文
+
+        Returns:
+            页面列表，每页包含 page、html、segments；尚未翻译的页面返回原文
+        """
+        meta = self.get_meta(doc_id)
+        start = max(start, 1)
+        end = min(end, meta['page_count'])
+
+        pages = []
+        for page_num in range(start, end + 1):
+            page = self._load_page(doc_id, page_num, key)
+            page['page'] = page_num
+            pages.append(page)
+        return pages
+
+    def iter_pages(self, doc_id: str, key: Optional[str] = None) -> Iterator[Dict]:
+        """逐页读取文档（不会一次性加载整个文档）"""
+        page_count = self.get_meta(doc_id)['page_count']
+        for page_num in range(1, page_count + 1):
+            page = self._load_page(doc_id, page_num, key)
+            page['page'] = page_num
+            yield page
+
+    def iter_segments(self, doc_id: str) -> Iterator[Segment]:
+        """逐页读取原文段落"""
+        for page in self.iter_pages(doc_id):
+            yield from page['segments']
+
+    @profiling.traced('store.save_translation')
+    def save_translation(self, doc_id: str, key: str, translated_segments: List[Dict]):
+        """
+        按页保存译文，并生成每页的译文HTML
+
+        Args:
+            key: 译文版本（如目标语言代码）
+            translated_segments: 已写入 translation 的段落列表（需包含 id）
+        """
+        from bs4 import BeautifulSoup
+
+        self._check_key(key)
+        translations = {segment.id: segment for segment in translated_segments if segment.id}
+        target_dir = os.path.join(self._doc_dir(doc_id), 'translated', key)
+        os.makedirs(target_dir, exist_ok=True)
+
+        for page in self.iter_pages(doc_id):
+            page_segments = [translations.get(segment.id, segment) for segment in page['segments']]
+
+            # 每次只解析一页HTML，内存占用与页大小成正比
+            soup = BeautifulSoup(page['html'], 'html.parser')
+            for segment in page_segments:
+                if segment.translation is not None:
+                    element = soup.find(id=segment.id)
+                    if element:
+                        element.string = segment.translation
+            fill_repeated_furniture(soup, translations)
+
+            self._write_json(os.path.join(target_dir, f"{page['page']}.json"), {
+                'html': str(soup),
+                'segments': [segment.to_dict() for segment in page_segments]
+            })
+
+        self.touch(doc_id)
+
+    def save_pretranslation(self, doc_id: str, target_lang: str, ai_model: str, translations: Dict[str, str]):
+        """
+        保存上传后预翻译的结果（所有工作进程都能读取，点击翻译时不必再调用API）
+
+        Args:
+            translations: 原文 -> 译文
+        """
+        self._check_key(target_lang)
+        target_dir = os.path.join(self._doc_dir(doc_id), 'pretranslated')
+        os.makedirs(target_dir, exist_ok=True)
+        self._write_json(os.path.join(target_dir, f'{target_lang}.json'), {
+            'ai_model': ai_model,
+            'translations': translations
+        })
+
+    def load_pretranslation(self, doc_id: str, target_lang: str, ai_model: str) -> Dict[str, str]:
+        """读取预翻译的结果（原文 -> 译文），没有或模型不同时返回空dict"""
+        self._check_key(target_lang)
+        path = os.path.join(self._doc_dir(doc_id), 'pretranslated', f'{target_lang}.json')
+        if not os.path.exists(path):
+            return {}
+        data = self._read_json(path)
+        return data['translations'] if data.get('ai_model') == ai_model else {}
+
+    def touch(self, doc_id: str):
+        """刷新文档的保留时间，并刷新其引用的资源，避免文档仍在而图片已过期"""
+        os.utime(self._doc_dir(doc_id))
+        if self.asset_store is not None:
+            self.asset_store.touch(self.get_meta(doc_id).get('assets', []))
+
+    def has_translation(self, doc_id: str, key: str) -> bool:
+        """是否已有指定版本的译文"""
+        self._check_key(key)
+        return os.path.isdir(os.path.join(self._doc_dir(doc_id), 'translated', key))
+
+    def cleanup(self):
+        """删除超过保留时间的文档"""
+        now = time.time()
+        for doc_id in os.listdir(self.root):
+            doc_dir = os.path.join(self.root, doc_id)
+            if not DOC_ID_PATTERN.match(doc_id) or not os.path.isdir(doc_dir):
+                continue
+            if now - os.path.getmtime(doc_dir) > self.ttl:
+                shutil.rmtree(doc_dir, ignore_errors=True)
+
+    def content_digest(self, doc_id: str, key: Optional[str] = None) -> str:
+        """文档（指定译文版本）全部页面内容的摘要，内容不变时摘要不变，用于缓存导出结果"""
+        digest = hashlib.sha256()
+        digest.update(doc_id.encode('ascii'))
+        for page_num in range(1, self.get_meta(doc_id)['page_count'] + 1):
+            with open(self._page_path(doc_id, page_num, key), 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def _load_page(self, doc_id: str, page_num: int, key: Optional[str]) -> Dict:
+        """读取单页，有译文时返回译文版本（segments 转换为 Segment）"""
+        page = self._read_json(self._page_path(doc_id, page_num, key))
+        page['segments'] = [Segment.from_dict(item) for item in page['segments']]
+        return page
+
+    def _page_path(self, doc_id: str, page_num: int, key: Optional[str]) -> str:
+        """页面文件路径：有指定版本的译文时为译文页面，否则为原文页面"""
+        doc_dir = self._doc_dir(doc_id)
+        path = os.path.join(doc_dir, 'source', f'{page_num}.json')
+        if key is not None:
+            self._check_key(key)
+            translated_path = os.path.join(doc_dir, 'translated', key, f'{page_num}.json')
+            if os.path.exists(translated_path):
+                path = translated_path
+        return path
+
+    def _doc_dir(self, doc_id: str) -> str:
+        """文档目录（校验ID，防止路径穿越）"""
+        if not DOC_ID_PATTERN.match(doc_id or ''):
+            raise KeyError(f"文档不存在: {doc_id}")
+        doc_dir = os.path.join(self.root, doc_id)
+        if not os.path.isdir(doc_dir):
+            raise KeyError(f"文档不存在或已过期: {doc_id}")
+        return doc_dir
+
+    @staticmethod
+    def _check_key(key: str):
+        """校验译文版本名"""
+        if not KEY_PATTERN.match(key or ''):
+            raise ValueError(f"无效的译文版本: {key}")
+
+    @staticmethod
+    def _read_json(path: str) -> Dict:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path: str, data: Dict):
+        """先写临时文件再替换，避免并发读取到写了一半的文件"""
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
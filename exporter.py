@@ -0,0 +1,291 @@
+"""
+批量导出模块 - 直接从服务端保存的译文段落生成导出文件，以流式ZIP返回
+
+与 /export 不同，导出内容不需要浏览器回传，也不解析译文HTML：
+1. 按页读取保存的译文段落（段落中同时有原文和译文），逐段写入临时文件
+2. 生成的文件按内容摘要缓存（文档内容、译文版本和导出选项不变时直接复用）
+3. 发送前先生成（或从缓存取得）全部导出文件，任何一个失败都能返回错误状态码，而不是发出截断的ZIP
+4. 多个文档、多种语言的导出文件逐个写入ZIP，边压缩边发送，不在内存中拼接整个压缩包
+
+缓存目录结构：
+    <root>/<摘要>.<格式>
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+import zipfile
+from typing import Iterator, List, Tuple
+
+import config
+import profiling
+from document_store import DocumentStore
+from segment import Segment
+
+# 支持的导出格式
+EXPORT_FORMATS = ('txt', 'docx')
+
+# 生成逻辑变化时修改，使旧的缓存失效
+RENDER_VERSION = 1
+
+# 两次清理之间的最短间隔（秒）
+CLEANUP_INTERVAL = 600
+
+# 复制到ZIP时每次读取的字节数
+CHUNK_SIZE = 256 * 1024
+
+
+class ZipStream:
+    """只能追加写入的输出流：zipfile 写入的数据暂存在这里，由生成器逐块取走"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        """取出目前已写入的数据"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class Exporter:
+    """从文档存储批量导出译文"""
+
+    def __init__(self, document_store: DocumentStore, root: str, ttl: int = 24 * 3600):
+        """
+        Args:
+            document_store: 文档存储
+            root: 导出文件缓存目录
+            ttl: 缓存保留时间（秒），自最后一次使用起算
+        """
+        self.document_store = document_store
+        self.root = root
+        self.ttl = ttl
+        self._last_cleanup = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def plan(self, doc_ids: List[str], langs: List[str] = None, formats: List[str] = ('txt',)) -> List[Tuple[str, str, str]]:
+        """
+        确定要导出的 (文档ID, 译文版本, 格式)，并校验参数
+
+        Args:
+            langs: 译文版本（目标语言），不传时导出每个文档已有的全部译文
+
+        Raises:
+            KeyError: 文档不存在
+            ValueError: 格式不支持，或文档没有指定语言的译文
+        """
+        for format_type in formats:
+            if format_type not in EXPORT_FORMATS:
+                raise ValueError(f"不支持的导出格式: {format_type}")
+
+        items = []
+        for doc_id in dict.fromkeys(doc_ids):
+            available = self.document_store.get_meta(doc_id)['translations']
+            doc_langs = available if langs is None else langs
+            missing = [lang for lang in doc_langs if lang not in available]
+            if missing:
+                raise ValueError(f"文档 {doc_id} 没有以下语言的译文: {', '.join(missing)}")
+            for lang in doc_langs:
+                for format_type in formats:
+                    items.append((doc_id, lang, format_type))
+        if not items:
+            raise ValueError("没有可导出的译文")
+        return items
+
+    def prepare(self, items: List[Tuple[str, str, str]], bilingual: bool = False, omit_furniture: bool = False) -> List[Tuple[str, str]]:
+        """
+        生成（或从缓存取得）全部导出文件，在开始发送ZIP之前调用
+
+        Args:
+            items: plan() 返回的 (文档ID, 译文版本, 格式) 列表
+            bilingual: 原文和译文对照导出
+            omit_furniture: 不导出页眉、页脚等页面装饰
+
+        Returns:
+            [(文件路径, ZIP中的文件名), ...]，文件名已去重
+        """
+        files = []
+        used_names = set()
+        for doc_id, lang, format_type in items:
+            path, name = self.render(doc_id, lang, format_type, bilingual, omit_furniture)
+            files.append((path, self._unique_name(name, used_names)))
+        return files
+
+    def stream_zip(self, files: List[Tuple[str, str]]) -> Iterator[bytes]:
+        """
+        把 prepare() 生成的文件逐个写入ZIP，边写边返回数据块
+
+        Args:
+            files: [(文件路径, ZIP中的文件名), ...]
+        """
+        stream = ZipStream()
+        with zipfile.ZipFile(stream, 'w') as archive:
+            for path, name in files:
+                # docx本身已压缩，不再重复压缩
+                compress_type = zipfile.ZIP_STORED if name.endswith('.docx') else zipfile.ZIP_DEFLATED
+                info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                info.compress_type = compress_type
+                with open(path, 'rb') as source, archive.open(info, 'w') as target:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                        target.write(chunk)
+                        data = stream.drain()
+                        if data:
+                            yield data
+                data = stream.drain()
+                if data:
+                    yield data
+        yield stream.drain()
+
+    def render(self, doc_id: str, lang: str, format_type: str, bilingual: bool = False, omit_furniture: bool = False) -> Tuple[str, str]:
+        """
+        生成（或从缓存获取）单个导出文件
+
+        Returns:
+            (文件路径, ZIP中的文件名)
+        """
+        self.cleanup()
+
+        meta = self.document_store.get_meta(doc_id)
+        stem = os.path.splitext(meta['filename'])[0]
+        name = f"{stem}/{stem}_{lang}_{'双译' if bilingual else '译文'}.{format_type}"
+
+        digest = hashlib.sha256(repr((
+            RENDER_VERSION, self.document_store.content_digest(doc_id, lang), lang, format_type, bilingual, omit_furniture
+        )).encode('utf-8')).hexdigest()
+        path = os.path.join(self.root, f'{digest}.{format_type}')
+        if os.path.exists(path):
+            # 命中缓存，刷新保留时间
+            os.utime(path)
+            return path, name
+
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with profiling.span('export.render', format=format_type, bilingual=bilingual):
+                segments = self._iter_segments(doc_id, lang, omit_furniture)
+                title = f"{meta['filename']}（{config.LANGUAGES.get(lang, lang)}）"
+                if format_type == 'txt':
+                    self._render_txt(tmp_path, title, segments, bilingual)
+                else:
+                    self._render_docx(tmp_path, title, segments, bilingual)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path, name
+
+    def cleanup(self, force: bool = False):
+        """删除超过保留时间的缓存文件（默认每 CLEANUP_INTERVAL 秒最多执行一次）"""
+        now = time.time()
+        if not force and now - self._last_cleanup < CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def _iter_segments(self, doc_id: str, lang: str, omit_furniture: bool) -> Iterator[Segment]:
+        """逐页读取译文段落"""
+        for page in self.document_store.iter_pages(doc_id, lang):
+            for segment in page['segments']:
+                if omit_furniture and segment.furniture:
+                    continue
+                yield segment
+
+    @staticmethod
+    def _render_txt(path: str, title: str, segments: Iterator[Segment], bilingual: bool):
+        """逐段写入TXT（使用BOM以支持中文）"""
+        with open(path, 'w', encoding='utf-8-sig') as f:
+            f.write(f"{'双语对照' if bilingual else '翻译结果'}：{title}\n")
+            f.write("=" * 80 + "\n\n")
+            for segment in segments:
+                translation = segment.translation if segment.translation is not None else segment.text
+                if bilingual:
+                    f.write(segment.text + "\n")
+                f.write(translation + "\n\n")
+
+    @staticmethod
+    def _render_docx(path: str, title: str, segments: Iterator[Segment], bilingual: bool):
+        """按段落标签生成Word文档（标题、列表、表格），双译时原文在前、译文在后"""
+        from docx import Document
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+        doc = Document()
+        doc.add_heading(title, 0).alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        def cell_text(segment):
+            translation = segment.translation if segment.translation is not None else segment.text
+            return f'{segment.text}\n{translation}' if bilingual else translation
+
+        table_cells = []
+
+        def flush_table():
+            """同一表格的单元格合并为一个表格"""
+            if not table_cells:
+                return
+            rows = max(segment.row or 0 for segment in table_cells) + 1
+            cols = max(segment.col or 0 for segment in table_cells) + 1
+            table = doc.add_table(rows=rows, cols=cols)
+            table.style = 'Table Grid'
+            filled = set()
+            for segment in table_cells:
+                position = (segment.row or 0, segment.col or 0)
+                cell = table.cell(*position)
+                # 单元格内有多个段落时逐段追加，不覆盖之前的内容
+                if position in filled:
+                    cell.add_paragraph(cell_text(segment))
+                else:
+                    cell.text = cell_text(segment)
+                    filled.add(position)
+            table_cells.clear()
+
+        for segment in segments:
+            if segment.is_table:
+                if table_cells and segment.table != table_cells[-1].table:
+                    flush_table()
+                table_cells.append(segment)
+                continue
+            flush_table()
+
+            translation = segment.translation if segment.translation is not None else segment.text
+            tag = segment.tag or 'p'
+            if bilingual:
+                doc.add_paragraph().add_run(segment.text).italic = True
+            if re.fullmatch(r'h[1-6]', tag):
+                doc.add_heading(translation, level=int(tag[1]))
+            elif tag == 'li':
+                doc.add_paragraph(translation, style='List Bullet')
+            else:
+                doc.add_paragraph(translation)
+        flush_table()
+
+        doc.save(path)
+
+    @staticmethod
+    def _unique_name(name: str, used_names: set) -> str:
+        """同名文档导出到ZIP时加序号区分"""
+        candidate = name
+        counter = 2
+        while candidate in used_names:
+            stem, ext = os.path.splitext(name)
+            candidate = f'{stem}({counter}){ext}'
+            counter += 1
+        used_names.add(candidate)
+        return candidate
@@ -2,17 +2,35 @@
 文件解析模块 - 支持PDF、Word、图片等文件类型
 """
 import os
+import importlib
+from collections import namedtuple
 from typing import List, Dict, Tuple
-import PyPDF2
-import fitz  # PyMuPDF
-from docx import Document
-from PIL import Image
-import mammoth
-from bs4 import BeautifulSoup
 import re
 import io
 import base64
-import requests
+from segment import Segment
+import profiling
+
+# 页面之间的分隔线
+PAGE_SEPARATOR = '\n<hr style="margin: 20px 0; border: none; border-top: 1px solid #E5E5E5;">\n'
+
+# Word文档XML命名空间
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+MC_NS = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+W_P = f'{{{W_NS}}}p'
+W_PPR = f'{{{W_NS}}}pPr'
+W_R = f'{{{W_NS}}}r'
+W_TBL = f'{{{W_NS}}}tbl'
+W_TR = f'{{{W_NS}}}tr'
+W_TC = f'{{{W_NS}}}tc'
+W_NUMPR = f'{{{W_NS}}}numPr'
+# 兼容性标记的备用内容（如文本框的VML版本），与 mc:Choice 中的内容重复
+MC_FALLBACK = f'{{{MC_NS}}}Fallback'
+
+# 各格式依赖的第三方库（PyMuPDF、PyPDF2、python-docx、lxml、requests）
+# 在首次解析对应格式时才导入，减少启动时间和只做翻译的工作进程的内存占用
 
 class FileParser:
     """文件解析器"""
@@ -20,6 +38,8 @@ class FileParser:
     @staticmethod
     def parse_pdf(file_path: str) -> List[Dict[str, str]]:
         """解析PDF文件（简单段落模式）"""
+        import PyPDF2
+        
         content = []
         try:
             with open(file_path, 'rb') as file:
@@ -40,27 +60,65 @@ class FileParser:
         return content
     
     @staticmethod
-    def parse_pdf_with_format(file_path: str) -> Tuple[str, List[Dict[str, str]]]:
+    def parse_pdf_with_format(file_path: str) -> Tuple[str, List[Segment]]:
         """
         解析PDF文件并保留格式（包括表格）
         返回: (HTML格式的完整文档, 段落列表用于翻译)
         """
+        return FileParser.join_pages(FileParser.parse_pdf_pages(file_path))
+    
+    @staticmethod
+    def join_pages(pages: List[Dict], separator: str = None) -> Tuple[str, List[Segment]]:
+        """将分页解析结果合并为 (完整HTML, 段落列表)，默认用分隔线连接各页"""
+        separator = PAGE_SEPARATOR if separator is None else separator
+        html_content = separator.join(page['html'] for page in pages)
+        paragraphs = [segment for page in pages for segment in page['segments']]
+        return html_content, paragraphs
+    
+    @staticmethod
+    @profiling.traced('pdf.parse_pages')
+    def parse_pdf_pages(file_path: str) -> List[Dict]:
+        """
+        按页解析PDF文件并保留格式（包括表格）
+        返回: 页面列表，每页包含 page（页码）、html（该页HTML）、segments（该页段落）
+        """
+        import fitz  # PyMuPDF
+        
         try:
             doc = fitz.open(file_path)
-            html_parts = []
-            paragraphs = []
-            para_index = 0
             
+            # 第一遍：提取每页的表格或文本行
+            raw_pages = []
             for page_num in range(len(doc)):
                 page = doc[page_num]
                 
                 # 尝试提取表格
-                tables = page.find_tables()
+                with profiling.span('pdf.find_tables', page=page_num + 1):
+                    tables = page.find_tables()
                 
                 if tables and len(tables.tables) > 0:
+                    raw_pages.append({'tables': [table.extract() for table in tables]})
+                else:
+                    raw_pages.append({'lines': FileParser._pdf_page_lines(page, page_num), 'height': page.rect.height})
+            
+            doc.close()
+            
+            # 跨页分析：多数页面相同位置重复出现的文本（页眉、页脚、保密声明、水印等）
+            furniture = FileParser._find_page_furniture([raw for raw in raw_pages if 'lines' in raw])
+            furniture_ids = {}  # 页面装饰的比较文本（页码等数字已归一）-> 首次出现时的段落ID
+            
+            # 第二遍：生成每页的HTML和段落
+            pages = []
+            para_index = 0
+            table_index = 0
+            
+            for page_num, raw in enumerate(raw_pages):
+                html_parts = []
+                paragraphs = []
+                
+                if 'tables' in raw:
                     # 页面包含表格
-                    for table in tables:
-                        table_data = table.extract()
+                    for table_data in raw['tables']:
                         if table_data:
                             # 生成HTML表格
                             html_parts.append('<table class="pdf-table" style="width: 100%; border-collapse: collapse; margin: 20px 0;">')
@@ -89,96 +147,306 @@ class FileParser:
                                         html_parts.append(f'<td id="{para_id}" class="translatable" style="border: 1px solid #ddd; padding: 12px;">{cell_text}</td>')
                                     
                                     if cell_text:
-                                        paragraphs.append({
-                                            'id': para_id,
-                                            'text': cell_text,
-                                            'tag': 'th' if row_idx == 0 else 'td',
-                                            'index': para_index,
-                                            'page': page_num + 1,
-                                            'is_table': True,
-                                            'row': row_idx,
-                                            'col': cell_idx
-                                        })
+                                        paragraphs.append(Segment(
+                                            id=para_id,
+                                            text=cell_text,
+                                            tag='th' if row_idx == 0 else 'td',
+                                            index=para_index,
+                                            page=page_num + 1,
+                                            is_table=True,
+                                            table=table_index,
+                                            row=row_idx,
+                                            col=cell_idx
+                                        ))
                                         para_index += 1
                                 
                                 html_parts.append('</tr>')
                             
                             html_parts.append('</table>')
+                            table_index += 1
                 else:
-                    # 没有表格，按常规文本处理
-                    blocks = page.get_text("dict")["blocks"]
+                    # 页面装饰单独成段，不与正文合并；页眉在正文之前，页脚在正文之后
+                    # 与正文同在一个文本块的行不算页面装饰（正文中恰好在相同位置重复的行不从段落中拆出）
+                    line_keys = [FileParser._furniture_key(line, raw['height']) for line in raw['lines']]
+                    body_blocks = {line['block'] for line, key in zip(raw['lines'], line_keys) if key not in furniture}
+                    page_lines = []
+                    header_lines = []
+                    footer_lines = []
+                    for line, key in zip(raw['lines'], line_keys):
+                        if key in furniture and line['block'] not in body_blocks:
+                            (header_lines if line['bbox'][1] < raw['height'] / 2 else footer_lines).append((line, key[0]))
+                        else:
+                            page_lines.append(line)
                     
-                    for block in blocks:
-                        if block.get("type") == 0:  # 文本块
-                            for line in block.get("lines", []):
-                                # 提取每一行的文本
-                                line_text = ""
-                                font_size = 12
-                                is_bold = False
-                                
-                                for span in line.get("spans", []):
-                                    line_text += span.get("text", "")
-                                    font_size = span.get("size", 12)
-                                    font_flags = span.get("flags", 0)
-                                    # 检测是否为粗体 (flag & 16)
-                                    is_bold = (font_flags & 16) != 0
-                                
-                                line_text = line_text.strip()
-                                if not line_text:
-                                    continue
-                                
-                                # 过滤掉只包含符号或过短的文本
-                                if len(line_text) <= 2 and line_text in ['•', '●', '○', '■', '□', '▪', '▫', '-', '*', '·', '.', ',']:
-                                    continue
-                                
-                                # 过滤掉只包含数字的行（如页码）
-                                if line_text.isdigit() and len(line_text) <= 3:
-                                    continue
-                                
-                                # 根据字体大小判断是否为标题
-                                para_id = f'para-{para_index}'
-                                if font_size > 16:
-                                    html_parts.append(f'<h1 id="{para_id}" class="translatable">{line_text}</h1>')
-                                    tag = 'h1'
-                                elif font_size > 14:
-                                    html_parts.append(f'<h2 id="{para_id}" class="translatable">{line_text}</h2>')
-                                    tag = 'h2'
-                                elif font_size > 13:
-                                    html_parts.append(f'<h3 id="{para_id}" class="translatable">{line_text}</h3>')
-                                    tag = 'h3'
-                                else:
-                                    if is_bold:
-                                        html_parts.append(f'<p id="{para_id}" class="translatable"><strong>{line_text}</strong></p>')
-                                    else:
-                                        html_parts.append(f'<p id="{para_id}" class="translatable">{line_text}</p>')
-                                    tag = 'p'
-                                
-                                paragraphs.append({
-                                    'id': para_id,
-                                    'text': line_text,
-                                    'tag': tag,
-                                    'index': para_index,
-                                    'page': page_num + 1
-                                })
-                                para_index += 1
+                    for line, key in header_lines:
+                        para_index = FileParser._append_furniture(line['text'], key, page_num, para_index, furniture_ids, html_parts, paragraphs)
+                    
+                    # 将行合并为逻辑段落，减少段落数量并避免句子被拆断
+                    # 行号为该行在本页全部文本行（raw['lines']，含页面装饰）中的序号
+                    line_numbers = {id(line): number for number, line in enumerate(raw['lines'])}
+                    for group in FileParser._merge_pdf_lines(page_lines):
+                        line_text = FileParser._join_pdf_lines([line['text'] for line in group])
+                        font_size = group[0]['size']
+                        is_bold = all(line['bold'] for line in group)
+                        
+                        # 根据字体大小判断是否为标题
+                        para_id = f'para-{para_index}'
+                        if font_size > 16:
+                            html_parts.append(f'<h1 id="{para_id}" class="translatable">{line_text}</h1>')
+                            tag = 'h1'
+                        elif font_size > 14:
+                            html_parts.append(f'<h2 id="{para_id}" class="translatable">{line_text}</h2>')
+                            tag = 'h2'
+                        elif font_size > 13:
+                            html_parts.append(f'<h3 id="{para_id}" class="translatable">{line_text}</h3>')
+                            tag = 'h3'
+                        else:
+                            if is_bold:
+                                html_parts.append(f'<p id="{para_id}" class="translatable"><strong>{line_text}</strong></p>')
+                            else:
+                                html_parts.append(f'<p id="{para_id}" class="translatable">{line_text}</p>')
+                            tag = 'p'
+                        
+                        paragraphs.append(Segment(
+                            id=para_id,
+                            text=line_text,
+                            tag=tag,
+                            index=para_index,
+                            page=page_num + 1,
+                            # 段落首行在本页全部文本行中的序号和段落行数，便于回溯渲染
+                            line_start=line_numbers[id(group[0])],
+                            line_count=len(group)
+                        ))
+                        para_index += 1
+                    
+                    for line, key in footer_lines:
+                        para_index = FileParser._append_furniture(line['text'], key, page_num, para_index, furniture_ids, html_parts, paragraphs)
                 
-                # 页面分隔
-                if page_num < len(doc) - 1:
-                    html_parts.append('<hr style="margin: 20px 0; border: none; border-top: 1px solid #E5E5E5;">')
-            
-            doc.close()
-            
-            # 组合HTML
-            html_content = '\n'.join(html_parts)
+                pages.append({
+                    'page': page_num + 1,
+                    'html': '\n'.join(html_parts),
+                    'segments': paragraphs
+                })
             
-            return html_content, paragraphs
+            return pages
             
         except Exception as e:
             raise Exception(f"PDF格式解析错误: {str(e)}")
     
+    @staticmethod
+    def _pdf_page_lines(page, page_num: int) -> List[Dict]:
+        """提取一页的文本行（保留位置和字体信息），过滤项目符号和页码"""
+        with profiling.span('pdf.get_text', page=page_num + 1):
+            blocks = page.get_text("dict")["blocks"]
+        
+        # 先收集本页所有文本行（保留位置和字体信息）
+        page_lines = []
+        for block_no, block in enumerate(blocks):
+            if block.get("type") == 0:  # 文本块
+                for line in block.get("lines", []):
+                    # 提取每一行的文本
+                    line_text = ""
+                    font_size = 12
+                    is_bold = False
+
+                    for span in line.get("spans", []):
+                        line_text += span.get("text", "")
+                        font_size = span.get("size", 12)
+                        font_flags = span.get("flags", 0)
+                        # 检测是否为粗体 (flag & 16)
+                        is_bold = (font_flags & 16) != 0
+
+                    line_text = line_text.strip()
+                    if not line_text:
+                        continue
+
+                    # 过滤掉只包含符号或过短的文本
+                    if len(line_text) <= 2 and line_text in ['•', '●', '○', '■', '□', '▪', '▫', '-', '*', '·', '.', ',']:
+                        continue
+
+                    # 过滤掉只包含数字的行（如页码）
+                    if line_text.isdigit() and len(line_text) <= 3:
+                        continue
+
+                    page_lines.append({
+                        'text': line_text,
+                        'size': font_size,
+                        'bold': is_bold,
+                        'bbox': line.get('bbox', (0, 0, 0, 0)),
+                        'block': block_no
+                    })
+        return page_lines
+    
+    # 页面装饰：至少出现在该比例的文本页（且不少于 FURNITURE_MIN_PAGES 页）的相同位置
+    FURNITURE_MIN_PAGES = 3
+    # 位置比较的粒度（占页面高度的比例）
+    FURNITURE_POSITION_STEP = 0.02
+    # 页面上下边距区域（占页面高度的比例），其中的数字（页码、日期）不参与比较
+    FURNITURE_MARGIN = 0.15
+    
+    @staticmethod
+    def _furniture_key(line: Dict, page_height: float) -> Tuple[str, int]:
+        """页面装饰的比较键：文本 + 纵向位置；上下边距中的文本忽略数字（页码不同也视为相同）"""
+        relative = line['bbox'][1] / max(page_height, 1)
+        text = ' '.join(line['text'].lower().split())
+        if relative < FileParser.FURNITURE_MARGIN or relative > 1 - FileParser.FURNITURE_MARGIN:
+            text = re.sub(r'\d+', '#', text)
+        return text, round(relative / FileParser.FURNITURE_POSITION_STEP)
+    
+    @staticmethod
+    def _find_page_furniture(text_pages: List[Dict]) -> set:
+        """
+        跨页找出重复的页面装饰（页眉、页脚、保密声明、水印等）
+        
+        Args:
+            text_pages: 文本页列表，每页包含 lines（文本行）和 height（页面高度）
+        
+        Returns:
+            页面装饰的比较键集合（见 _furniture_key）
+        """
+        import config
+        
+        min_ratio = getattr(config, 'PDF_FURNITURE_MIN_RATIO', 0.5)
+        if not min_ratio or len(text_pages) < FileParser.FURNITURE_MIN_PAGES:
+            return set()
+        
+        counts = {}
+        for page in text_pages:
+            for key in {FileParser._furniture_key(line, page['height']) for line in page['lines']}:
+                counts[key] = counts.get(key, 0) + 1
+        
+        # 位置相差一格（行高的细微差别）也算同一位置
+        threshold = max(FileParser.FURNITURE_MIN_PAGES, min_ratio * len(text_pages))
+        furniture = set()
+        for (text, position), count in counts.items():
+            nearby = count + counts.get((text, position - 1), 0) + counts.get((text, position + 1), 0)
+            if nearby >= threshold:
+                furniture.add((text, position))
+        return furniture
+    
+    @staticmethod
+    def _append_furniture(text: str, key: str, page_num: int, para_index: int, furniture_ids: Dict[str, str], html_parts: List[str], paragraphs: List[Segment]) -> int:
+        """
+        输出一行页面装饰：比较文本相同（只有页码等数字不同）的装饰只在首次出现时生成待翻译段落，
+        之后的页面通过 data-repeat-of 引用其译文（数字按本页文本替换，见 document_store.fill_repeated_furniture）
+        
+        Args:
+            key: 比较文本（_furniture_key 的文本部分）
+        
+        Returns:
+            更新后的段落序号
+        """
+        if key in furniture_ids:
+            html_parts.append(f'<div class="pdf-furniture" data-repeat-of="{furniture_ids[key]}">{text}</div>')
+            return para_index
+        
+        para_id = f'para-{para_index}'
+        furniture_ids[key] = para_id
+        html_parts.append(f'<div id="{para_id}" class="translatable pdf-furniture">{text}</div>')
+        paragraphs.append(Segment(
+            id=para_id,
+            text=text,
+            tag='div',
+            index=para_index,
+            page=page_num + 1,
+            furniture=True
+        ))
+        return para_index + 1
+    
+    # 列表项开头（项目符号、编号），这类行总是开始新段落
+    # 标记后须有空白（“、”除外），“3.5 billion”“U.S. dollars”“e.g. the”等续行不算列表项
+    _LIST_ITEM_PATTERN = re.compile(r'^(?:(?:[•●○■□▪▫·\-\*–]|\(?\d{1,3}(?:\.(?!\d)|\))|\([a-zA-Z]\)|[a-zA-Z][\.\)])\s+|\(?\d{1,3}、)')
+    # 句末标点
+    _SENTENCE_END = ('.', '!', '?', ':', ';', '。', '！', '？', '：', '；', '…', '"', '”', ')', '）')
+    
+    @staticmethod
+    def _is_cjk(char: str) -> bool:
+        """判断字符是否为中日韩文字或全角标点"""
+        code = ord(char)
+        return (0x3000 <= code <= 0x9FFF or 0xAC00 <= code <= 0xD7AF or
+                0xF900 <= code <= 0xFAFF or 0xFF00 <= code <= 0xFFEF)
+    
+    @staticmethod
+    def _merge_pdf_lines(lines: List[Dict]) -> List[List[Dict]]:
+        """
+        根据版面信息把PDF文本行合并为逻辑段落
+        
+        依据：所在文本块、行间距、首行缩进、字体大小/粗细、句末标点和行长度
+        
+        Args:
+            lines: 按阅读顺序排列的行，每行包含 text/size/bold/bbox/block
+        
+        Returns:
+            段落列表，每个段落是连续的若干行
+        """
+        # 计算每个文本块的左右边界
+        block_bounds = {}
+        for line in lines:
+            x0, _, x1, _ = line['bbox']
+            left, right = block_bounds.get(line['block'], (x0, x1))
+            block_bounds[line['block']] = (min(left, x0), max(right, x1))
+        
+        groups = []
+        for line in lines:
+            if groups and FileParser._continues_paragraph(groups[-1][-1], line, block_bounds[line['block']]):
+                groups[-1].append(line)
+            else:
+                groups.append([line])
+        return groups
+    
+    @staticmethod
+    def _continues_paragraph(prev: Dict, cur: Dict, block_bound: Tuple[float, float]) -> bool:
+        """判断当前行是否是上一行所在段落的延续"""
+        if prev['block'] != cur['block']:
+            return False
+        
+        # 字体大小或粗细变化（标题、强调段）
+        if abs(prev['size'] - cur['size']) > 0.5 or prev['bold'] != cur['bold']:
+            return False
+        
+        # 列表项总是新段落
+        if FileParser._LIST_ITEM_PATTERN.match(cur['text']) and not FileParser._is_cjk(cur['text'][0]):
+            return False
+        
+        px0, py0, px1, py1 = prev['bbox']
+        cx0, cy0, cx1, cy1 = cur['bbox']
+        line_height = max(py1 - py0, 1)
+        
+        # 行间距过大或行序倒退（分栏）
+        if cy0 - py1 > line_height * 0.8 or cy0 < py0:
+            return False
+        
+        # 首行缩进：当前行明显比上一行更靠右
+        if cx0 - px0 > cur['size']:
+            return False
+        
+        # 上一行以句末标点结束且明显短于文本块宽度，视为段落结束
+        left, right = block_bound
+        short_line = right - px1 > max(cur['size'] * 4, (right - left) * 0.15)
+        if short_line and prev['text'].endswith(FileParser._SENTENCE_END):
+            return False
+        
+        return True
+    
+    @staticmethod
+    def _join_pdf_lines(texts: List[str]) -> str:
+        """拼接同一段落的多行文本，处理断词连字符和中日韩文字间距"""
+        result = texts[0]
+        for text in texts[1:]:
+            if len(result) > 1 and result.endswith('-') and result[-2].isalpha() and text[0].islower():
+                # 行尾断词：去掉连字符直接拼接
+                result = result[:-1] + text
+            elif FileParser._is_cjk(result[-1]) or FileParser._is_cjk(text[0]):
+                result += text
+            else:
+                result += ' ' + text
+        return result
+    
     @staticmethod
     def parse_docx(file_path: str) -> List[Dict[str, str]]:
         """解析Word文档（简单段落模式）"""
+        from docx import Document
+        
         content = []
         try:
             doc = Document(file_path)
@@ -195,50 +463,347 @@ class FileParser:
         return content
     
     @staticmethod
-    def parse_docx_with_format(file_path: str) -> Tuple[str, List[Dict[str, str]]]:
+    def parse_docx_with_format(file_path: str) -> Tuple[str, List[Segment]]:
         """
         解析Word文档并保留格式
         返回: (HTML格式的完整文档, 段落列表用于翻译)
         """
+        return FileParser.join_pages(FileParser.parse_docx_pages(file_path), separator='')
+    
+    @staticmethod
+    @profiling.traced('docx.parse_pages')
+    def parse_docx_pages(file_path: str, segments_per_page: int = 50, asset_store=None) -> List[Dict]:
+        """
+        流式解析Word文档（直接读取 word/document.xml，一次遍历生成段落和HTML）
+        
+        Word没有固定分页，在顶层元素边界处每约 segments_per_page 段切分为一页。
+        段落ID按文档中段落（w:p）的顺序编号，同一文档多次解析结果一致；mc:Fallback 中的备用内容（文本框的重复副本）跳过。
+        编号列表输出为<ol>，项目符号列表输出为<ul>；嵌套表格结束后恢复外层表格的行列位置。
+        传入 asset_store 时内嵌图片保存为资源并以URL引用，HTML中只有文字和标记；否则内嵌为data URI。
+        返回: 页面列表，每页包含 page（页码）、html（该页HTML）、segments（该页段落）
+        """
+        import zipfile
+        from lxml import etree
+        
         try:
-            # 使用mammoth将Word转换为HTML
-            with open(file_path, 'rb') as docx_file:
-                result = mammoth.convert_to_html(docx_file)
-                html_content = result.value
-            
-            # 解析HTML提取文本段落
-            soup = BeautifulSoup(html_content, 'html.parser')
-            paragraphs = []
-            
-            # 提取所有段落
-            for idx, element in enumerate(soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])):
-                text = element.get_text().strip()
-                if text:
-                    # 为每个元素添加唯一ID，方便后续替换
-                    element_id = f'para-{idx}'
-                    element['id'] = element_id
-                    element['class'] = element.get('class', []) + ['translatable']
-                    
-                    paragraphs.append({
-                        'id': element_id,
-                        'text': text,
-                        'tag': element.name,
-                        'index': idx
-                    })
-            
-            # 返回更新后的HTML和段落列表
-            formatted_html = str(soup)
-            
-            return formatted_html, paragraphs
+            with zipfile.ZipFile(file_path) as docx_zip:
+                with profiling.span('docx.styles'):
+                    numbering = FileParser._docx_numbering_formats(docx_zip)
+                    paragraph_styles, numbered_styles = FileParser._docx_paragraph_styles(docx_zip, numbering)
+                    images = FileParser._docx_image_relationships(docx_zip)
+                
+                pages = []
+                html_parts = []
+                page_segments = []
+                para_index = 0
+                table_stack = []  # 每层打开的表格进入前的 (表格序号, 行号, 列号)，嵌套表格结束时恢复外层位置
+                table_count = 0
+                table_idx = row_idx = col_idx = 0
+                list_tag = None  # 当前打开的列表（ul/ol）
+                fallback_depth = 0
+                
+                with docx_zip.open('word/document.xml') as xml_file:
+                    for event, element in etree.iterparse(xml_file, events=('start', 'end'), tag=(W_P, W_TBL, W_TR, W_TC, MC_FALLBACK)):
+                        if element.tag == MC_FALLBACK:
+                            fallback_depth += 1 if event == 'start' else -1
+                            if event == 'end':
+                                element.clear(keep_tail=True)
+                            continue
+                        if fallback_depth:
+                            # 备用内容与 mc:Choice 重复，不输出
+                            if event == 'end':
+                                element.clear(keep_tail=True)
+                            continue
+                        if event == 'start':
+                            if element.tag == W_P:
+                                continue
+                            if list_tag:
+                                html_parts.append(f'</{list_tag}>')
+                                list_tag = None
+                            if element.tag == W_TBL:
+                                table_stack.append((table_idx, row_idx, col_idx))
+                                table_idx = table_count
+                                table_count += 1
+                                row_idx = col_idx = 0
+                                html_parts.append('<table class="docx-table">')
+                            elif element.tag == W_TR:
+                                col_idx = 0
+                                html_parts.append('<tr>')
+                            else:
+                                html_parts.append('<td>')
+                            continue
+                        
+                        if element.tag == W_P:
+                            tag, inner_html, text = FileParser._docx_paragraph(element, paragraph_styles, images, docx_zip, asset_store)
+                            
+                            # 相邻的同类列表项合并到同一个<ul>/<ol>中
+                            item_list_tag = None
+                            if tag == 'li':
+                                item_list_tag = 'ol' if FileParser._docx_is_numbered(element, numbering, numbered_styles) else 'ul'
+                            if list_tag != item_list_tag:
+                                if list_tag:
+                                    html_parts.append(f'</{list_tag}>')
+                                if item_list_tag:
+                                    html_parts.append(f'<{item_list_tag}>')
+                                list_tag = item_list_tag
+                            
+                            if text:
+                                para_id = f'para-{para_index}'
+                                html_parts.append(f'<{tag} id="{para_id}" class="translatable">{inner_html}</{tag}>')
+                                page_segments.append(Segment(
+                                    id=para_id,
+                                    text=text,
+                                    tag=tag,
+                                    index=para_index,
+                                    page=len(pages) + 1,
+                                    is_table=bool(table_stack),
+                                    table=table_idx if table_stack else None,
+                                    row=row_idx if table_stack else None,
+                                    col=col_idx if table_stack else None
+                                ))
+                            elif inner_html:
+                                # 只有图片等非文字内容的段落，只显示不翻译
+                                html_parts.append(f'<{tag}>{inner_html}</{tag}>')
+                            para_index += 1
+                        else:
+                            if list_tag:
+                                html_parts.append(f'</{list_tag}>')
+                                list_tag = None
+                            if element.tag == W_TBL:
+                                table_idx, row_idx, col_idx = table_stack.pop()
+                                html_parts.append('</table>')
+                            elif element.tag == W_TR:
+                                row_idx += 1
+                                html_parts.append('</tr>')
+                            else:
+                                col_idx += 1
+                                html_parts.append('</td>')
+                        
+                        # 释放已处理的节点，内存占用不随文档长度增长
+                        element.clear(keep_tail=True)
+                        while element.getprevious() is not None:
+                            del element.getparent()[0]
+                        
+                        # 在顶层元素边界处分页
+                        if not table_stack and not list_tag and not fallback_depth and len(page_segments) >= segments_per_page:
+                            pages.append({'page': len(pages) + 1, 'html': ''.join(html_parts), 'segments': page_segments})
+                            html_parts = []
+                            page_segments = []
+                
+                if list_tag:
+                    html_parts.append(f'</{list_tag}>')
+                if html_parts or not pages:
+                    pages.append({'page': len(pages) + 1, 'html': ''.join(html_parts), 'segments': page_segments})
+                
+                return pages
             
         except Exception as e:
             raise Exception(f"Word文档格式解析错误: {str(e)}")
     
+    @staticmethod
+    def _docx_paragraph_styles(docx_zip, numbering: Dict[str, Dict[str, str]] = None) -> Tuple[Dict[str, str], set]:
+        """
+        读取 styles.xml（样式ID可能是本地化的，需按样式名判断）
+        
+        Returns:
+            (样式ID -> HTML标签（标题为h1-h6，列表为li）, 编号列表样式ID集合)
+        """
+        from lxml import etree
+        
+        tags = {}
+        numbered = set()
+        if 'word/styles.xml' not in docx_zip.namelist():
+            return tags, numbered
+        
+        with docx_zip.open('word/styles.xml') as styles_file:
+            root = etree.parse(styles_file).getroot()
+        for style in root.iter(f'{{{W_NS}}}style'):
+            style_id = style.get(f'{{{W_NS}}}styleId')
+            name = style.find(f'{{{W_NS}}}name')
+            name = (name.get(f'{{{W_NS}}}val') if name is not None else style_id or '').lower()
+            match = re.match(r'^heading\s*(\d)$', name)
+            if match:
+                tags[style_id] = f'h{min(int(match.group(1)), 6)}'
+            elif name == 'title':
+                tags[style_id] = 'h1'
+            elif name.startswith('list') or style.find(f'{W_PPR}/{W_NUMPR}') is not None:
+                tags[style_id] = 'li'
+                num_pr = style.find(f'{W_PPR}/{W_NUMPR}')
+                if num_pr is not None:
+                    if FileParser._docx_numbering_is_ordered(num_pr, numbering or {}):
+                        numbered.add(style_id)
+                elif name.startswith('list number'):
+                    numbered.add(style_id)
+        return tags, numbered
+    
+    @staticmethod
+    def _docx_numbering_formats(docx_zip) -> Dict[str, Dict[str, str]]:
+        """读取 numbering.xml，返回 编号ID -> {级别: 编号格式（decimal、bullet等）}"""
+        from lxml import etree
+        
+        formats = {}
+        if 'word/numbering.xml' not in docx_zip.namelist():
+            return formats
+        
+        with docx_zip.open('word/numbering.xml') as numbering_file:
+            root = etree.parse(numbering_file).getroot()
+        abstract_formats = {}
+        for abstract in root.iter(f'{{{W_NS}}}abstractNum'):
+            levels = {}
+            for level in abstract.iter(f'{{{W_NS}}}lvl'):
+                num_fmt = level.find(f'{{{W_NS}}}numFmt')
+                levels[level.get(f'{{{W_NS}}}ilvl', '0')] = num_fmt.get(f'{{{W_NS}}}val') if num_fmt is not None else 'decimal'
+            abstract_formats[abstract.get(f'{{{W_NS}}}abstractNumId')] = levels
+        for num in root.iter(f'{{{W_NS}}}num'):
+            abstract_id = num.find(f'{{{W_NS}}}abstractNumId')
+            if abstract_id is not None:
+                formats[num.get(f'{{{W_NS}}}numId')] = abstract_formats.get(abstract_id.get(f'{{{W_NS}}}val'), {})
+        return formats
+    
+    @staticmethod
+    def _docx_numbering_is_ordered(num_pr, numbering: Dict[str, Dict[str, str]]) -> bool:
+        """w:numPr 指向的编号格式是否为有序编号（非项目符号）"""
+        num_id = num_pr.find(f'{{{W_NS}}}numId')
+        if num_id is None:
+            return False
+        level = num_pr.find(f'{{{W_NS}}}ilvl')
+        levels = numbering.get(num_id.get(f'{{{W_NS}}}val'), {})
+        num_fmt = levels.get(level.get(f'{{{W_NS}}}val', '0') if level is not None else '0')
+        return num_fmt not in (None, 'bullet', 'none')
+    
+    @staticmethod
+    def _docx_is_numbered(paragraph, numbering: Dict[str, Dict[str, str]], numbered_styles: set) -> bool:
+        """列表段落是否为编号列表：段落自身的 w:numPr 优先，否则看段落样式"""
+        p_pr = paragraph.find(W_PPR)
+        if p_pr is None:
+            return False
+        num_pr = p_pr.find(W_NUMPR)
+        if num_pr is not None and num_pr.find(f'{{{W_NS}}}numId') is not None:
+            return FileParser._docx_numbering_is_ordered(num_pr, numbering)
+        style = p_pr.find(f'{{{W_NS}}}pStyle')
+        return style is not None and style.get(f'{{{W_NS}}}val') in numbered_styles
+    
+    @staticmethod
+    def _docx_image_relationships(docx_zip) -> Dict[str, str]:
+        """读取文档关系，返回 关系ID -> 图片在压缩包中的路径"""
+        from lxml import etree
+        
+        images = {}
+        rels_path = 'word/_rels/document.xml.rels'
+        if rels_path not in docx_zip.namelist():
+            return images
+        
+        with docx_zip.open(rels_path) as rels_file:
+            root = etree.parse(rels_file).getroot()
+        for rel in root:
+            if rel.get('Type', '').endswith('/image') and rel.get('TargetMode') != 'External':
+                target = rel.get('Target', '')
+                images[rel.get('Id')] = target.lstrip('/') if target.startswith('/') else f'word/{target}'
+        return images
+    
+    @staticmethod
+    def _docx_paragraph(paragraph, paragraph_styles: Dict[str, str], images: Dict[str, str], docx_zip, asset_store=None) -> Tuple[str, str, str]:
+        """
+        转换单个 w:p 段落
+        
+        Returns:
+            (HTML标签, 段落内部HTML（保留粗体/斜体/下划线）, 纯文本)
+        """
+        import html
+        
+        tag = 'p'
+        p_pr = paragraph.find(W_PPR)
+        if p_pr is not None:
+            style = p_pr.find(f'{{{W_NS}}}pStyle')
+            if style is not None:
+                tag = paragraph_styles.get(style.get(f'{{{W_NS}}}val'), 'p')
+            if tag == 'p' and p_pr.find(W_NUMPR) is not None:
+                tag = 'li'
+        
+        html_parts = []
+        text_parts = []
+        current_format = None
+        current_text = []
+        
+        def flush():
+            """输出一组格式相同的相邻run"""
+            if not current_text:
+                return
+            run_html = html.escape(''.join(current_text))
+            bold, italic, underline = current_format
+            if underline:
+                run_html = f'<u>{run_html}</u>'
+            if italic:
+                run_html = f'<em>{run_html}</em>'
+            if bold:
+                run_html = f'<strong>{run_html}</strong>'
+            html_parts.append(run_html)
+            current_text.clear()
+        
+        for run in paragraph.iter(W_R):
+            r_pr = run.find(f'{{{W_NS}}}rPr')
+            run_format = (
+                FileParser._docx_toggle(r_pr, 'b'),
+                FileParser._docx_toggle(r_pr, 'i'),
+                FileParser._docx_toggle(r_pr, 'u')
+            )
+            for child in run:
+                if child.tag == f'{{{W_NS}}}t':
+                    text = child.text or ''
+                elif child.tag == f'{{{W_NS}}}tab':
+                    text = '\t'
+                elif child.tag in (f'{{{W_NS}}}br', f'{{{W_NS}}}cr'):
+                    text = '\n'
+                elif child.tag == f'{{{W_NS}}}drawing':
+                    flush()
+                    for blip in child.iter(f'{{{A_NS}}}blip'):
+                        image_path = images.get(blip.get(f'{{{R_NS}}}embed'))
+                        if image_path:
+                            html_parts.append(FileParser._docx_image_html(docx_zip, image_path, asset_store))
+                    continue
+                else:
+                    continue
+                
+                if run_format != current_format:
+                    flush()
+                    current_format = run_format
+                current_text.append(text)
+                text_parts.append(text)
+        flush()
+        
+        return tag, ''.join(html_parts).replace('\n', '<br>'), ''.join(text_parts).strip()
+    
+    @staticmethod
+    def _docx_toggle(r_pr, name: str) -> bool:
+        """读取run的开关属性（粗体、斜体、下划线）"""
+        if r_pr is None:
+            return False
+        prop = r_pr.find(f'{{{W_NS}}}{name}')
+        if prop is None:
+            return False
+        return prop.get(f'{{{W_NS}}}val', 'true') not in ('0', 'false', 'none')
+    
+    @staticmethod
+    def _docx_image_html(docx_zip, image_path: str, asset_store=None) -> str:
+        """内嵌图片转为<img>标签（有资源存储时引用资源URL，同一图片只保存一份）"""
+        if image_path not in docx_zip.namelist():
+            return ''
+        ext = image_path.rsplit('.', 1)[-1].lower()
+        if asset_store is not None:
+            try:
+                return f'<img src="{asset_store.url(asset_store.put(docx_zip.read(image_path), ext))}" loading="lazy">'
+            except ValueError:
+                pass  # 扩展名无法作为资源类型，退回data URI
+        mime_type = f'image/{"jpeg" if ext in ("jpg", "jpeg") else ext}'
+        data = base64.b64encode(docx_zip.read(image_path)).decode('utf-8')
+        return f'<img src="data:{mime_type};base64,{data}">'
+    
     @staticmethod
     def parse_image(file_path: str, api_key: str = None, api_base_url: str = None, model: str = None, max_retries: int = 3) -> List[Dict[str, str]]:
         """使用AI识别图片文字（支持失败重试）"""
         import config
         import time
+        import requests
         
         content = []
         last_error = None
@@ -354,3 +919,44 @@ class FileParser:
             return FileParser.parse_image(file_path)
         else:
             raise Exception(f"不支持的文件类型: {file_type}")
+    
+    @staticmethod
+    def get_handler(file_type: str) -> 'ParserHandler':
+        """根据扩展名获取上传解析器"""
+        handler = PARSER_REGISTRY.get(file_type.lower())
+        if handler is None:
+            raise Exception(f"不支持的文件类型: {file_type}")
+        return handler
+    
+    @staticmethod
+    def preload(file_types: List[str] = None):
+        """
+        预先导入解析器依赖的库（预fork部署时在主进程调用，工作进程共享已加载的模块）
+        
+        Args:
+            file_types: 要预加载的扩展名列表，默认全部
+        """
+        file_types = file_types or list(PARSER_REGISTRY.keys())
+        for file_type in file_types:
+            for module_name in FileParser.get_handler(file_type).modules:
+                importlib.import_module(module_name)
+
+
+# 上传解析器：parse 为解析函数；has_format 为True时返回 (HTML, 段落列表)，否则返回段落列表
+# parse_pages 为分页解析函数（仅格式化文档），返回页面列表
+ParserHandler = namedtuple('ParserHandler', ['parse', 'has_format', 'file_type', 'modules', 'parse_pages', 'extracts_assets'])
+
+# 解析器注册表：扩展名 -> 解析器
+PARSER_REGISTRY = {}
+
+
+def register_parser(extensions: List[str], parse, has_format: bool, file_type: str = None, modules: List[str] = (), parse_pages=None,
+                    extracts_assets: bool = False):
+    """注册上传解析器（modules为该解析器依赖、可预加载的模块；extracts_assets 表示 parse_pages 接受 asset_store 参数）"""
+    for ext in extensions:
+        PARSER_REGISTRY[ext] = ParserHandler(parse, has_format, file_type, tuple(modules), parse_pages, extracts_assets)
+
+
+register_parser(['pdf'], FileParser.parse_pdf_with_format, True, 'pdf', ['fitz'], FileParser.parse_pdf_pages)
+register_parser(['docx', 'doc'], FileParser.parse_docx_with_format, True, 'word', ['lxml.etree'], FileParser.parse_docx_pages, extracts_assets=True)
+register_parser(['png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'], FileParser.parse_image, False, 'image', ['requests'])
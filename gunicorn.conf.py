@@ -0,0 +1,22 @@
+"""
+Gunicorn 配置（预fork部署）
+
+用法：
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py app:app
+
+config.PRELOAD_PARSERS 为 True 时，在主进程中加载应用并预导入解析库，
+工作进程fork后共享这些模块的内存页，首个上传请求无需再等待导入。
+为 False 时每个工作进程单独加载应用，解析库在首次使用时才导入。
+"""
+import multiprocessing
+
+import config
+
+bind = '0.0.0.0:5001'
+workers = multiprocessing.cpu_count() * 2 + 1
+# 翻译请求主要在等待API返回，使用线程处理并发
+worker_class = 'gthread'
+threads = 4
+timeout = 300
+preload_app = getattr(config, 'PRELOAD_PARSERS', False)
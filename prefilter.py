@@ -0,0 +1,149 @@
+"""
+本地预过滤模块 - 识别无需调用API翻译的段落，并在本地检测源语言
+"""
+import re
+from typing import List, Optional
+
+# 网址、邮箱
+URL_PATTERN = re.compile(r'^(https?://|ftp://|www\.)\S+$', re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r'^[\w.+-]+@[\w-]+(\.[\w-]+)+$')
+# 带货币代码的金额，如 USD 1,200.50、1.5 bn EUR
+CURRENCY_CODE_PATTERN = re.compile(
+    r'^(?:(?:USD|EUR|GBP|JPY|CNY|RMB|HKD|KRW|CHF|CAD|AUD|SGD)\s*)?'
+    r'[\(\-+−]?[$€£¥￥₩₹]?\s*\d[\d,.\s]*\s*(?:%|‰|bp|bps|k|m|mn|bn|K|M|B)?\)?'
+    r'(?:\s*(?:USD|EUR|GBP|JPY|CNY|RMB|HKD|KRW|CHF|CAD|AUD|SGD))?$'
+)
+# 编号、代码，如 ISO-9001、A1.2.3、ABC_123
+CODE_PATTERN = re.compile(r'^(?=[^\s]*\d)[A-Z0-9][A-Z0-9\-_./#:]*$')
+
+# 简繁体区分字：不含日文中写法相同的汉字（如 会、国、務、報），只有这些字时无法区分中文和日文汉字
+SIMPLIFIED_CHARS = set('们这个说为于对时后经过还开关发现实话问题长书东车门见间页认气电业历费资产负债务报价营额应权证')
+TRADITIONAL_CHARS = set('們這說與會學國對來經關體點發實氣區歷灣產價營應權證')
+
+# 拉丁字母语言的常用词
+STOPWORDS = {
+    'en': {'the', 'and', 'of', 'to', 'in', 'is', 'for', 'that', 'with', 'as', 'on', 'by', 'are', 'this', 'be', 'from', 'at', 'or', 'an', 'which', 'was', 'were', 'has', 'have', 'not', 'it', 'its'},
+    'fr': {'le', 'la', 'les', 'des', 'et', 'est', 'du', 'une', 'un', 'dans', 'pour', 'que', 'qui', 'sur', 'au', 'aux', 'pas', 'par', 'avec', 'sont', 'ce', 'cette'},
+    'de': {'der', 'die', 'das', 'und', 'ist', 'von', 'zu', 'den', 'mit', 'nicht', 'ein', 'eine', 'für', 'auf', 'im', 'dem', 'des', 'sich', 'auch', 'werden', 'wird', 'sind'},
+    'es': {'el', 'la', 'los', 'las', 'de', 'y', 'que', 'en', 'es', 'por', 'con', 'para', 'una', 'del', 'se', 'al', 'como', 'más', 'su', 'sus', 'está', 'son'},
+    'pt': {'o', 'os', 'as', 'de', 'e', 'que', 'em', 'é', 'do', 'da', 'dos', 'das', 'para', 'com', 'uma', 'não', 'por', 'no', 'na', 'ao', 'são', 'está'},
+    'it': {'il', 'lo', 'la', 'gli', 'le', 'di', 'e', 'che', 'è', 'per', 'con', 'non', 'una', 'del', 'della', 'dei', 'sono', 'nel', 'nella', 'al', 'alla', 'anche'},
+}
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+class PreFilter:
+    """段落预过滤器"""
+
+    @staticmethod
+    def should_skip(text: str, target_lang: str) -> bool:
+        """
+        判断段落是否无需翻译（原样保留）
+
+        包括：纯数字/日期/金额/符号、网址、邮箱、编号代码，以及已经是目标语言的文本
+        """
+        text = text.strip()
+        if not text:
+            return True
+
+        # 不含任何文字（数字、日期、百分比、符号等）
+        if not any(char.isalpha() for char in text):
+            return True
+
+        if (URL_PATTERN.match(text) or EMAIL_PATTERN.match(text) or
+                CURRENCY_CODE_PATTERN.match(text) or CODE_PATTERN.match(text)):
+            return True
+
+        # 已经是目标语言
+        detected = PreFilter.detect_language(text)
+        return detected is not None and detected == target_lang
+
+    @staticmethod
+    def detect_language(text: str) -> Optional[str]:
+        """
+        基于文字脚本和常用词的轻量语言检测
+
+        Returns:
+            config.LANGUAGES 中的语言代码；无法确定时返回 None
+            （只有汉字、没有假名和简繁区分字时可能是日文汉字或简繁通用写法，也返回 None）
+        """
+        han = kana = hangul = cyrillic = arabic = latin = 0
+        for char in text:
+            code = ord(char)
+            if 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+                han += 1
+            elif 0x3040 <= code <= 0x30FF:
+                kana += 1
+            elif 0xAC00 <= code <= 0xD7AF or 0x1100 <= code <= 0x11FF:
+                hangul += 1
+            elif 0x0400 <= code <= 0x04FF:
+                cyrillic += 1
+            elif 0x0600 <= code <= 0x06FF:
+                arabic += 1
+            elif char.isalpha() and code < 0x0250:
+                latin += 1
+
+        letters = han + kana + hangul + cyrillic + arabic + latin
+        if letters == 0:
+            return None
+
+        if kana and kana >= (han + kana) * 0.1 and han + kana > letters * 0.5:
+            return 'ja'
+        if hangul > letters * 0.5:
+            return 'ko'
+        if han > letters * 0.5 and not kana:
+            simplified = sum(1 for char in text if char in SIMPLIFIED_CHARS)
+            traditional = sum(1 for char in text if char in TRADITIONAL_CHARS)
+            if simplified > traditional:
+                return 'zh-CN'
+            if traditional > simplified:
+                return 'zh-TW'
+            return None
+        if cyrillic > letters * 0.5:
+            return 'ru'
+        if arabic > letters * 0.5:
+            return 'ar'
+        if latin > letters * 0.5:
+            return PreFilter._detect_latin_language(text)
+        return None
+
+    @staticmethod
+    def _detect_latin_language(text: str) -> Optional[str]:
+        """根据常用词判断拉丁字母语言，证据不足时返回None"""
+        words = [word.lower() for word in WORD_PATTERN.findall(text)]
+        if len(words) < 3:
+            return None
+
+        scores = sorted(
+            ((sum(1 for word in words if word in stopwords), lang) for lang, stopwords in STOPWORDS.items()),
+            reverse=True
+        )
+        best_score, best_lang = scores[0]
+        second_score = scores[1][0]
+        if best_score >= 2 and best_score >= second_score * 1.5:
+            return best_lang
+        return None
+
+    @staticmethod
+    def resolve_source_lang(texts: List[str], source_lang: str = 'auto', sample_chars: int = 5000) -> str:
+        """
+        在本地解析 source_lang='auto'
+
+        取文档开头的一部分文本检测语言，无法确定时仍返回 'auto' 交给模型判断
+        """
+        if source_lang != 'auto':
+            return source_lang
+
+        sample = []
+        length = 0
+        for text in texts:
+            sample.append(text)
+            length += len(text)
+            if length >= sample_chars:
+                break
+
+        detected = PreFilter.detect_language('\n'.join(sample))
+        if detected is None:
+            return 'auto'
+        return detected
@@ -0,0 +1,229 @@
+"""
+请求性能分析模块 - 按需对单个请求采样，输出火焰图文件和各阶段耗时
+
+开启方式（无需重新部署）：
+1. 管理员在请求头 X-Profile 或查询参数 profile 中带上 config.PROFILE_TOKEN
+2. 按 config.PROFILE_SAMPLE_RATE 的比例随机采样
+
+被分析的请求（以及调度器中为它执行的翻译任务）所在线程会被定期采样调用栈，输出到 PROFILE_FOLDER：
+    <id>.wall.folded   墙钟时间火焰图（包含等待翻译API的时间），折叠栈格式，可用 flamegraph.pl / speedscope 打开
+    <id>.cpu.folded    CPU时间火焰图（权重为微秒，仅Linux等支持线程CPU时钟的平台）
+    <id>.trace.json    各阶段耗时（Chrome Trace格式，可用 chrome://tracing / Perfetto / speedscope 打开）
+"""
+import functools
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import config
+
+_local = threading.local()
+
+
+class Profile:
+    """一次请求的性能分析数据"""
+
+    def __init__(self, name: str, interval: float):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{name.strip('/').replace('/', '_') or 'index'}-{uuid.uuid4().hex[:8]}"
+        self.name = name
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.wall = Counter()  # 折叠栈 -> 采样次数
+        self.cpu = Counter()  # 折叠栈 -> CPU微秒
+        self.spans = []
+        self._threads = {}  # 线程ID -> 线程名（正在为该请求工作的线程）
+        self._cpu_clocks = {}  # 线程ID -> 上次采样时的CPU时间
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f'profiler-{self.id}', daemon=True)
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def attach_thread(self):
+        """当前线程开始为该请求工作"""
+        with self._lock:
+            self._threads[threading.get_ident()] = threading.current_thread().name
+
+    def detach_thread(self):
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+            self._cpu_clocks.pop(threading.get_ident(), None)
+
+    def add_span(self, name: str, start: float, end: float, cpu: float, args: Dict):
+        with self._lock:
+            self.spans.append((name, threading.get_ident(), threading.current_thread().name, start, end, cpu, args))
+
+    def _sample_loop(self):
+        """定期采样相关线程的调用栈"""
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, thread_name in threads:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = _fold_stack(thread_name, frame)
+                self.wall[stack] += 1
+                cpu_delta = self._cpu_delta(ident)
+                if cpu_delta:
+                    self.cpu[stack] += cpu_delta
+
+    def _cpu_delta(self, ident: int) -> int:
+        """线程自上次采样以来消耗的CPU时间（微秒），平台不支持时返回0"""
+        try:
+            now = time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            return 0
+        previous = self._cpu_clocks.get(ident)
+        self._cpu_clocks[ident] = now
+        return int((now - previous) * 1e6) if previous is not None else 0
+
+    def write(self, folder: str) -> str:
+        """写出火焰图和阶段耗时文件，返回文件名前缀"""
+        os.makedirs(folder, exist_ok=True)
+        prefix = os.path.join(folder, self.id)
+        for suffix, counter in (('wall', self.wall), ('cpu', self.cpu)):
+            with open(f'{prefix}.{suffix}.folded', 'w', encoding='utf-8') as f:
+                for stack, weight in counter.most_common():
+                    f.write(f'{stack} {weight}\n')
+
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': self.name}}]
+        seen_threads = set()
+        for name, ident, thread_name, start, end, cpu, args in self.spans:
+            if ident not in seen_threads:
+                seen_threads.add(ident)
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': ident, 'args': {'name': thread_name}})
+            events.append({
+                'name': name, 'ph': 'X', 'pid': pid, 'tid': ident,
+                'ts': (start - self.started) * 1e6, 'dur': (end - start) * 1e6,
+                'args': dict(args, cpu_ms=round(cpu * 1000, 3)),
+            })
+        with open(f'{prefix}.trace.json', 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        return prefix
+
+
+def _fold_stack(thread_name: str, frame) -> str:
+    """把调用栈转为折叠格式：线程;外层函数;...;内层函数"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    names.append(thread_name)
+    return ';'.join(reversed(names))
+
+
+def requested(token: Optional[str]) -> bool:
+    """
+    是否对当前请求进行性能分析
+
+    Args:
+        token: 请求中携带的管理员令牌（请求头 X-Profile 或查询参数 profile）
+    """
+    admin_token = getattr(config, 'PROFILE_TOKEN', '')
+    if token and admin_token and hmac.compare_digest(token, admin_token):
+        return True
+    sample_rate = getattr(config, 'PROFILE_SAMPLE_RATE', 0.0)
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def start(name: str) -> Profile:
+    """开始分析当前线程处理的请求"""
+    profile = Profile(name, getattr(config, 'PROFILE_INTERVAL', 0.005))
+    profile.attach_thread()
+    _local.profile = profile
+    profile.start()
+    return profile
+
+
+def stop() -> Optional[Profile]:
+    """结束当前请求的分析并写出文件（未在分析时返回None）"""
+    profile = release()
+    if profile is not None:
+        finish(profile)
+    return profile
+
+
+def release() -> Optional[Profile]:
+    """
+    当前线程不再为请求工作，但不结束分析（未在分析时返回None）
+
+    流式响应在视图函数返回后才执行实际工作：视图中先 release()，由执行工作的线程 attached()，
+    响应结束时再调用 finish()，避免 after_request 提前写出空的分析结果
+    """
+    profile = current()
+    if profile is None:
+        return None
+    _local.profile = None
+    profile.detach_thread()
+    return profile
+
+
+def finish(profile: Profile):
+    """停止采样并写出文件"""
+    profile.stop()
+    path = profile.write(getattr(config, 'PROFILE_FOLDER', 'profiles'))
+    print(f"性能分析已写入: {path}.*")
+
+
+def current() -> Optional[Profile]:
+    """当前线程所属请求的分析对象"""
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def attached(profile: Optional[Profile]):
+    """在其他线程（调度器工作线程）中为被分析的请求执行任务"""
+    if profile is None:
+        yield
+        return
+    previous = current()
+    _local.profile = profile
+    profile.attach_thread()
+    try:
+        yield
+    finally:
+        profile.detach_thread()
+        _local.profile = previous
+
+
+@contextmanager
+def span(name: str, **args):
+    """记录一个阶段的耗时（未在分析时几乎没有开销）"""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    start_time = time.perf_counter()
+    start_cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        profile.add_span(name, start_time, time.perf_counter(), time.thread_time() - start_cpu, args)
+
+
+def traced(name: str):
+    """装饰器：记录整个函数的耗时"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
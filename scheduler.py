@@ -0,0 +1,170 @@
+"""
+翻译调度模块 - 进程级共享的翻译任务调度器
+
+所有对外的翻译API调用都通过同一个调度器执行：
+1. 全局并发上限，避免多个请求各自开线程池导致并发失控
+2. 同一优先级内按用户轮询，大文档不会独占所有并发；单个用户的并发上限按优先级分别计算
+3. 交互式请求（单段翻译、整图翻译）优先于文档批量翻译，上传后的预翻译优先级最低
+"""
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Iterable, List, Optional
+
+import config
+import profiling
+
+PRIORITY_INTERACTIVE = 0  # 单段翻译、整图翻译
+PRIORITY_BULK = 1  # 文档批量翻译
+PRIORITY_SPECULATIVE = 2  # 上传后的后台预翻译
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BULK, PRIORITY_SPECULATIVE)
+
+
+class TranslationScheduler:
+    """公平调度的共享工作线程池"""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._condition = threading.Condition()
+        # 每个优先级一个有序字典：tenant -> 任务队列，字典顺序即轮询顺序
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}
+        # 并发上限按 (tenant, 优先级) 分别计算：用户的批量翻译占满名额时，其交互式请求不必排在后面
+        self._running = {}  # (tenant, 优先级) -> 正在执行的任务数
+        self._limits = {}  # (tenant, 优先级) -> 单个用户在该优先级的并发上限
+        self._workers = []
+        self._local = threading.local()
+
+    def submit(self, fn: Callable, *args, priority: int = PRIORITY_BULK, tenant: str = None,
+               limit: Optional[int] = None, **kwargs) -> Future:
+        """
+        提交任务
+
+        Args:
+            fn: 要执行的函数
+            priority: PRIORITY_INTERACTIVE、PRIORITY_BULK 或 PRIORITY_SPECULATIVE
+            tenant: 用户/请求标识，同优先级内按tenant轮询
+            limit: 该tenant在该优先级的最大并发数（None表示只受全局上限约束）
+
+        Returns:
+            Future对象
+        """
+        future = Future()
+        tenant = tenant or 'default'
+        with self._condition:
+            self._ensure_workers()
+            if limit:
+                self._limits[(tenant, priority)] = limit
+            # 记录提交时所属的请求分析，工作线程执行时一并采样
+            self._queues[priority].setdefault(tenant, deque()).append((future, fn, args, kwargs, profiling.current()))
+            self._condition.notify()
+        return future
+
+    def run(self, fn: Callable, *args, priority: int = PRIORITY_BULK, tenant: str = None, **kwargs):
+        """
+        同步执行任务并返回结果
+
+        在调度器工作线程内调用时直接执行（已占用一个并发名额），避免嵌套提交导致死锁
+        """
+        if getattr(self._local, 'is_worker', False):
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, priority=priority, tenant=tenant, **kwargs).result()
+
+    def map(self, fn: Callable, items: Iterable, priority: Optional[int] = None, tenant: Optional[str] = None) -> List:
+        """
+        并发执行 fn(item)，按原顺序返回结果
+
+        在工作线程内调用时沿用当前任务的优先级和用户，并由当前线程直接执行尚未被其他线程取走的任务，
+        只等待已经开始执行的任务，嵌套调用不会占满工作线程导致死锁
+        """
+        current = getattr(self._local, 'task', None)
+        if priority is None:
+            priority = current[0] if current else PRIORITY_BULK
+        if tenant is None and current:
+            tenant = current[1]
+
+        items = list(items)
+        futures = [self.submit(fn, item, priority=priority, tenant=tenant) for item in items]
+        if not getattr(self._local, 'is_worker', False):
+            return [future.result() for future in futures]
+
+        results = [None] * len(items)
+        for idx, future in enumerate(futures):
+            # 取消成功说明任务还在队列中，由当前线程执行（工作线程取到已取消的任务会直接跳过）
+            if future.cancel():
+                results[idx] = fn(items[idx])
+        for idx, future in enumerate(futures):
+            if not future.cancelled():
+                results[idx] = future.result()
+        return results
+
+    def _ensure_workers(self):
+        """按需启动工作线程（首次提交时启动，兼容预fork的服务器）"""
+        while len(self._workers) < self.max_concurrency:
+            worker = threading.Thread(target=self._worker_loop, name=f'translate-worker-{len(self._workers)}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _next_task(self):
+        """按优先级、用户轮询取出下一个可执行的任务，没有则返回None（需持有锁）"""
+        for priority in PRIORITIES:
+            queues = self._queues[priority]
+            for tenant in list(queues.keys()):
+                key = (tenant, priority)
+                limit = self._limits.get(key)
+                if limit and self._running.get(key, 0) >= limit:
+                    continue
+                tasks = queues[tenant]
+                task = tasks.popleft()
+                if tasks:
+                    # 轮到的用户移到队尾
+                    queues.move_to_end(tenant)
+                else:
+                    del queues[tenant]
+                return priority, tenant, task
+        return None
+
+    def _worker_loop(self):
+        """工作线程主循环"""
+        self._local.is_worker = True
+        while True:
+            with self._condition:
+                next_task = self._next_task()
+                while next_task is None:
+                    self._condition.wait()
+                    next_task = self._next_task()
+                priority, tenant, (future, fn, args, kwargs, profile) = next_task
+                key = (tenant, priority)
+                self._running[key] = self._running.get(key, 0) + 1
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        self._local.task = (priority, tenant)
+                        with profiling.attached(profile):
+                            result = fn(*args, **kwargs)
+                        future.set_result(result)
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._running[key] -= 1
+                    if not self._running[key]:
+                        del self._running[key]
+                        if tenant not in self._queues[priority]:
+                            self._limits.pop(key, None)
+                    # 该用户的并发名额释放后，可能有等待中的任务可以执行
+                    self._condition.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> TranslationScheduler:
+    """获取进程级共享调度器"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = TranslationScheduler(getattr(config, 'MAX_CONCURRENT_REQUESTS', 8))
+    return _scheduler
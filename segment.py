@@ -0,0 +1,81 @@
+"""
+段落模型 - 解析、翻译、导出过程中使用的紧凑段落对象
+
+使用 __slots__ 代替每段一个dict，并对标签名做字符串驻留；
+只在HTTP边界通过 to_dict / from_dict 与原有的JSON结构互相转换。
+"""
+import sys
+from typing import Dict, Optional
+
+
+class Segment:
+    """待翻译段落"""
+
+    __slots__ = ('id', 'text', 'tag', 'index', 'page', 'is_table', 'table', 'row', 'col',
+                 'line_start', 'line_count', 'translation', 'furniture', 'extra')
+
+    # 与JSON对应的字段（按原有JSON的键顺序）
+    FIELDS = ('id', 'text', 'tag', 'index', 'page', 'is_table', 'table', 'row', 'col',
+              'line_start', 'line_count', 'translation', 'furniture')
+
+    def __init__(self, text: str, id: str = None, tag: str = None, index: int = None, page: int = None,
+                 is_table: bool = False, table: int = None, row: int = None, col: int = None, line_start: int = None,
+                 line_count: int = None, translation: str = None, furniture: bool = False, extra: Optional[Dict] = None):
+        self.id = id
+        self.text = text
+        # 标签名只有少数几种，驻留后所有段落共享同一个字符串对象
+        self.tag = sys.intern(tag) if tag else None
+        self.index = index
+        self.page = page
+        self.is_table = is_table
+        self.table = table  # 所属表格在文档中的序号（导出时按序号把单元格归入同一个表格）
+        self.row = row
+        self.col = col
+        self.line_start = line_start
+        self.line_count = line_count
+        self.translation = translation
+        self.furniture = furniture  # 页眉、页脚等跨页重复的页面装饰（可在译文视图和导出中隐藏）
+        self.extra = extra  # 前端附加的其他字段（如 source_image），原样保留
+
+    def to_dict(self) -> Dict:
+        """转换为JSON结构（省略空字段，与原有的段落dict一致）"""
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None and value is not False:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Segment':
+        """从JSON结构创建段落"""
+        known = {}
+        extra = None
+        for key, value in data.items():
+            if key in cls.FIELDS:
+                known[key] = value
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        known.setdefault('text', '')
+        return cls(extra=extra, **known)
+
+    def copy(self) -> 'Segment':
+        """复制段落（多语言翻译时每种语言一份，译文互不影响）"""
+        clone = Segment.__new__(Segment)
+        for field in self.__slots__:
+            setattr(clone, field, getattr(self, field))
+        if self.extra:
+            clone.extra = dict(self.extra)
+        return clone
+
+    @classmethod
+    def coerce(cls, item) -> 'Segment':
+        """接受Segment或dict，统一为Segment"""
+        return item if isinstance(item, cls) else cls.from_dict(item)
+
+    def __repr__(self):
+        return f'Segment(id={self.id!r}, text={self.text[:30]!r})'
@@ -0,0 +1,158 @@
+"""
+长段落切分模块 - 在句子边界切分超长段落，分块并发翻译后按顺序拼接
+
+超长段落（法律条款、图片识别合并出的长文本）作为一次请求发送时既慢又容易超时或被截断。
+切分规则：
+1. 中日文句末标点（。！？；…）后直接切分，无需空格
+2. 西文句末标点（. ! ? ;）后须有空格，且不在常见缩写、首字母缩写之后，下一句不以小写字母开头
+3. 换行处总是可以切分
+4. 单句仍超长时依次按分句标点（，、,：:）和固定长度切分
+"""
+import math
+import re
+from typing import List, Tuple
+
+# 句子边界：匹配到的结尾（含后面的空白）即为一句的结束
+_SENTENCE_BOUNDARY = re.compile(
+    r'(?:[。！？；…؟।]+[」』”’）》】"\')\]]*'
+    r'|[.!?;]+[”’"\')\]]*(?=\s)'
+    r'|\n)\s*'
+)
+# 分句边界（单句超长时使用）
+_CLAUSE_BOUNDARY = re.compile(r'(?:[，、：,:]|——)\s*')
+# 句点前的单词
+_WORD_BEFORE = re.compile(r'([\w.]+)$')
+
+# 句点后不表示句子结束的常见缩写（小写，不含末尾句点）
+ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'inc', 'ltd', 'co', 'corp', 'no', 'nos',
+    'vs', 'etc', 'e.g', 'i.e', 'cf', 'al', 'fig', 'figs', 'art', 'sec', 'para', 'p', 'pp',
+    'vol', 'approx', 'u.s', 'u.k', 'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep',
+    'sept', 'oct', 'nov', 'dec', 'z.b', 'bzw', 'ca', 'nr', 'mme', 'mlle', 'sra',
+}
+
+# 句子之间不加空格的目标语言
+NO_SPACE_LANGS = ('zh', 'ja')
+
+
+class Segmenter:
+    """长段落切分"""
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """估算token数量：中日韩字符约1个token，其余约4个字符1个token"""
+        cjk = sum(1 for char in text if ord(char) >= 0x3000)
+        return cjk + (len(text) - cjk + 3) // 4
+
+    @staticmethod
+    def split(text: str, max_tokens: int) -> List[Tuple[str, str]]:
+        """
+        在句子边界把长文本切分为若干块，各块token数尽量均衡且不超过 max_tokens
+
+        Returns:
+            [(块文本, 块后的分隔空白), ...]，依次拼接 块文本+分隔 即为原文
+        """
+        sentences = Segmenter.split_sentences(text)
+        units = []
+        for sentence in sentences:
+            if Segmenter.estimate_tokens(sentence) > max_tokens:
+                units.extend(Segmenter._split_oversized(sentence, max_tokens))
+            else:
+                units.append(sentence)
+
+        # 按总长度均分块数，避免出现一大块加一小块
+        total = sum(Segmenter.estimate_tokens(unit) for unit in units)
+        target = total / max(1, math.ceil(total / max_tokens))
+
+        chunks = []
+        current = ''
+        current_tokens = 0
+        for unit in units:
+            tokens = Segmenter.estimate_tokens(unit)
+            if current and (current_tokens + tokens > max_tokens or current_tokens + tokens / 2 > target):
+                chunks.append(current)
+                current, current_tokens = '', 0
+            current += unit
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+
+        result = []
+        for chunk in chunks:
+            body = chunk.rstrip()
+            result.append((body, chunk[len(body):]))
+        return result
+
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+        """切分为句子（每句保留其后的空白，拼接后与原文一致）"""
+        sentences = []
+        start = 0
+        for match in _SENTENCE_BOUNDARY.finditer(text):
+            end = match.end()
+            if end >= len(text):
+                break
+            if not Segmenter._is_sentence_end(text, match):
+                continue
+            sentences.append(text[start:end])
+            start = end
+        if start < len(text):
+            sentences.append(text[start:])
+        return sentences
+
+    @staticmethod
+    def join(translations: List[str], separators: List[str], target_lang: str) -> str:
+        """
+        按顺序拼接各块译文
+
+        原文块之间有换行时保留换行，否则按目标语言决定是否加空格
+        """
+        no_space = target_lang.split('-')[0].lower() in NO_SPACE_LANGS
+        parts = []
+        for idx, translation in enumerate(translations):
+            parts.append(translation.strip())
+            if idx + 1 < len(translations):
+                separator = separators[idx]
+                if '\n' in separator:
+                    parts.append('\n' * separator.count('\n'))
+                elif not no_space:
+                    parts.append(' ')
+        return ''.join(parts)
+
+    @staticmethod
+    def _is_sentence_end(text: str, match) -> bool:
+        """西文句点是否真正表示句子结束（排除缩写、首字母、小写开头的下一句）"""
+        boundary = match.group(0)
+        if boundary.startswith('\n') or not boundary.startswith('.'):
+            return True
+        next_char = text[match.end()]
+        if next_char.islower():
+            return False
+        word = _WORD_BEFORE.search(text, 0, match.start())
+        if word:
+            token = word.group(1).lower()
+            # 单个字母（姓名首字母）或常见缩写
+            if (len(token) == 1 and token.isalpha()) or token in ABBREVIATIONS:
+                return False
+        return True
+
+    @staticmethod
+    def _split_oversized(sentence: str, max_tokens: int) -> List[str]:
+        """单句超长：先按分句标点切分，仍超长时按固定长度切分"""
+        pieces = []
+        start = 0
+        for match in _CLAUSE_BOUNDARY.finditer(sentence):
+            pieces.append(sentence[start:match.end()])
+            start = match.end()
+        if start < len(sentence):
+            pieces.append(sentence[start:])
+
+        result = []
+        for piece in pieces:
+            tokens = Segmenter.estimate_tokens(piece)
+            if tokens <= max_tokens:
+                result.append(piece)
+                continue
+            chars = max(1, len(piece) * max_tokens // tokens)
+            result.extend(piece[pos:pos + chars] for pos in range(0, len(piece), chars))
+        return result
@@ -0,0 +1,100 @@
+"""
+请求合并模块 - 相同的翻译请求同时只调用一次API
+
+多个用户翻译同一文档、或浏览器超时重试时，会同时发出完全相同的批次。
+以请求内容为键登记正在进行的调用，后到的相同请求等待并共享第一个调用的结果（或异常）。
+流式调用（do_streaming）过程中产生的事件（如逐段译文）转发给所有等待者，后到的等待者先补收已产生的事件。
+"""
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable, Iterable
+
+
+class _Call:
+    """一次正在进行的调用"""
+
+    def __init__(self):
+        self.future = Future()
+        self.events = []  # 已产生的事件参数
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, listener: Callable):
+        """登记事件回调，并补发已产生的事件"""
+        with self.lock:
+            for event in self.events:
+                listener(*event)
+            self.listeners.append(listener)
+
+    def publish(self, *event):
+        """记录事件并转发给所有等待者"""
+        with self.lock:
+            self.events.append(event)
+            for listener in self.listeners:
+                listener(*event)
+
+
+class SingleFlight:
+    """正在进行的请求登记表"""
+
+    def __init__(self):
+        self._calls = {}  # key -> _Call
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        """
+        执行fn并返回结果；已有相同key的调用在进行时，直接等待其结果
+
+        Args:
+            key: 请求标识（相同key视为相同请求）
+        """
+        return self._do(key, lambda publish: fn(*args, **kwargs))
+
+    def do_streaming(self, key: Hashable, fn: Callable, *args, on_event: Callable = None):
+        """
+        同 do，fn 的最后一个参数为事件回调：调用过程中的每个事件转发给所有相同请求的 on_event
+
+        Args:
+            on_event: 本请求的事件回调（加入时已产生的事件会先补发）
+        """
+        return self._do(key, lambda publish: fn(*args, publish), on_event)
+
+    def _do(self, key: Hashable, run: Callable, on_event: Callable = None):
+        """登记或加入调用；run(publish) 执行实际调用"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        if on_event is not None:
+            call.subscribe(on_event)
+
+        if not leader:
+            return call.future.result()
+
+        try:
+            result = run(call.publish)
+        except BaseException as e:
+            call.future.set_exception(e)
+            raise
+        else:
+            call.future.set_result(result)
+            return result
+        finally:
+            # 调用结束即移除，之后的请求重新调用（结果缓存由译文缓存负责）
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self):
+        return len(self._calls)
+
+    @staticmethod
+    def make_key(kind: str, contents: Iterable[str], *params) -> tuple:
+        """由请求类型、内容摘要和其他参数（语言、模型等）组成key"""
+        digest = hashlib.sha1()
+        for content in contents:
+            digest.update(content.encode('utf-8'))
+            digest.update(b'\x00')
+        return (kind, digest.hexdigest()) + params
@@ -0,0 +1,122 @@
+"""
+预翻译模块 - 上传文档后立即在后台翻译到用户最可能选择的语言
+
+预翻译结果随文档保存（DocumentStore.save_pretranslation），多进程部署时任一工作进程处理的翻译请求
+都能读取；用户点击翻译时已完成的段落直接使用，只需等待剩余段落。
+预翻译使用最低调度优先级，不影响用户主动发起的翻译。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import config
+from scheduler import PRIORITY_SPECULATIVE
+
+# 记录最近使用语言的用户数上限
+MAX_REMEMBERED_TENANTS = 1000
+
+# 预翻译进行中保存已完成译文的间隔（秒），用户在预翻译完成前点击翻译时也能使用已完成的部分
+SAVE_INTERVAL = 5
+
+
+class SpeculativeTranslator:
+    """上传后的后台预翻译"""
+
+    def __init__(self, translator, document_store):
+        self.translator = translator
+        self.document_store = document_store
+        self._last_used = OrderedDict()  # tenant -> (目标语言, 模型)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        """是否启用预翻译"""
+        return getattr(config, 'SPECULATIVE_TRANSLATION', False)
+
+    def load(self, doc_id: str, target_lang: str, ai_model: str) -> Dict[str, str]:
+        """读取文档已完成的预翻译（原文 -> 译文）"""
+        if not self.enabled():
+            return {}
+        return self.document_store.load_pretranslation(doc_id, target_lang, ai_model)
+
+    def remember(self, tenant: str, target_lang: str, ai_model: str):
+        """记录用户最近一次翻译使用的语言和模型"""
+        with self._lock:
+            self._last_used[tenant] = (target_lang, ai_model)
+            self._last_used.move_to_end(tenant)
+            while len(self._last_used) > MAX_REMEMBERED_TENANTS:
+                self._last_used.popitem(last=False)
+
+    def choose_target(self, tenant: str, target_lang: Optional[str] = None, ai_model: Optional[str] = None) -> Tuple[str, str]:
+        """
+        选择预翻译的目标语言和模型
+
+        优先使用上传时前端传来的当前选择，其次是该用户上次使用的，最后是配置的默认值
+        """
+        with self._lock:
+            last_lang, last_model = self._last_used.get(tenant, (None, None))
+        target_lang = target_lang or last_lang or getattr(config, 'SPECULATIVE_DEFAULT_LANG', 'zh-CN')
+        ai_model = ai_model or last_model or getattr(config, 'SPECULATIVE_DEFAULT_MODEL', 'gpt-4o')
+        if target_lang not in config.LANGUAGES:
+            target_lang = getattr(config, 'SPECULATIVE_DEFAULT_LANG', 'zh-CN')
+        if ai_model not in config.AI_MODELS:
+            ai_model = 'gpt-4o'
+        return target_lang, ai_model
+
+    def start(self, doc_id: str, tenant: str, target_lang: Optional[str] = None, ai_model: Optional[str] = None) -> Tuple[str, str]:
+        """
+        在后台线程中预翻译文档
+
+        Returns:
+            (目标语言, 模型)
+        """
+        target_lang, ai_model = self.choose_target(tenant, target_lang, ai_model)
+        # 使用独立线程等待各批次完成，避免占用调度器的工作线程
+        thread = threading.Thread(
+            target=self._run,
+            args=(doc_id, tenant, target_lang, ai_model),
+            name=f'speculative-{doc_id[:8]}',
+            daemon=True
+        )
+        thread.start()
+        return target_lang, ai_model
+
+    def _run(self, doc_id: str, tenant: str, target_lang: str, ai_model: str):
+        """执行预翻译，已完成的译文定期保存到文档存储"""
+        translations = {}
+        lock = threading.Lock()
+        last_save = time.monotonic()
+
+        def on_segment(segment):
+            nonlocal last_save
+            if segment.translation == "[翻译失败]":
+                return
+            with lock:
+                translations[segment.text] = segment.translation
+                if time.monotonic() - last_save < SAVE_INTERVAL:
+                    return
+                last_save = time.monotonic()
+                snapshot = dict(translations)
+            try:
+                self.document_store.save_pretranslation(doc_id, target_lang, ai_model, snapshot)
+            except (KeyError, OSError) as e:
+                print(f"预翻译保存失败: {doc_id}: {str(e)}")
+
+        try:
+            segments = list(self.document_store.iter_segments(doc_id))
+            self.translator.translate_batch(
+                segments,
+                target_lang,
+                'auto',
+                batch_size=config.BATCH_SIZE,
+                max_workers=config.MAX_WORKERS,
+                model_config=config.AI_MODELS[ai_model],
+                tenant=tenant,
+                priority=PRIORITY_SPECULATIVE,
+                on_segment=on_segment
+            )
+            self.document_store.save_pretranslation(doc_id, target_lang, ai_model, translations)
+            print(f"预翻译完成: {doc_id} -> {target_lang} ({ai_model})")
+        except Exception as e:
+            print(f"预翻译失败: {doc_id}: {str(e)}")
@@ -5,6 +5,9 @@
         let hasFormat = false;  // 是否是格式化文档
         let pendingFiles = null;  // 待上传的文件（仅用于图片）
         let imageTranslateMode = 'segment';  // 图片翻译模式：segment(分段) or whole(整图)
+        let currentDocId = null;  // 服务端保存的文档ID（格式化文档按页加载）
+        let currentPageCount = 0;  // 文档页数
+        let currentTranslationKey = null;  // 服务端译文版本（目标语言）
 
         // 获取元素
         const dropZone = document.getElementById('dropZone');
@@ -214,6 +217,8 @@
                     currentFileName = `${imageFiles.length}张图片`;
                     hasFormat = false;
                     originalHtmlContent = null;
+                    currentDocId = null;
+                    currentTranslationKey = null;
                     
                     displayOriginalContent(allContent);
                     document.getElementById('translateBtn').disabled = false;
@@ -241,6 +246,9 @@
 
             const formData = new FormData();
             formData.append('file', file);
+            // 当前选择的语言和模型（服务端开启预翻译时据此在后台提前翻译）
+            formData.append('target_lang', document.getElementById('targetLang').value);
+            formData.append('ai_model', document.getElementById('aiModel').value);
 
             try {
                 const response = await fetch('/upload', {
@@ -251,13 +259,20 @@
                 const data = await response.json();
 
                 if (data.success) {
-                    currentContent = data.content;
+                    // 服务端文档只返回文档信息，段落按页存在服务端
+                    currentContent = data.content || null;
                     currentFileName = file.name.replace(/\.[^/.]+$/, '');
                     hasFormat = data.has_format || false;
                     originalHtmlContent = data.html_content || null;
+                    currentDocId = data.doc_id || null;
+                    currentPageCount = data.page_count || 0;
+                    currentTranslationKey = null;
                     
                     // 根据是否有格式化内容选择显示方式
-                    if (hasFormat && originalHtmlContent) {
+                    if (currentDocId) {
+                        // 服务端分页文档，按需加载可见页面
+                        displayPagedDocument('originalContent', null);
+                    } else if (hasFormat && originalHtmlContent) {
                         displayFormattedContent(originalHtmlContent, 'originalContent');
                     } else {
                         displayOriginalContent(data.content);
@@ -265,7 +280,8 @@
                     
                     document.getElementById('translateBtn').disabled = false;
                     document.getElementById('exportActions').style.display = 'none';
-                    showStatus(`文件解析成功！共 ${data.content.length} 段内容`, 'success');
+                    const segmentCount = currentDocId ? data.segment_count : data.content.length;
+                    showStatus(`文件解析成功！共 ${segmentCount} 段内容`, 'success');
                 } else {
                     showStatus('文件解析失败: ' + data.error, 'error');
                     selectedFileName.textContent = '';  // 清空内容即自动隐藏
@@ -285,10 +301,16 @@
             container.innerHTML = '';
             container.appendChild(wrapper);
             
-            // 为格式化文档中的可翻译元素添加交互事件
-            const translatableElements = wrapper.querySelectorAll('.translatable');
+            bindTranslatableEvents(wrapper);
+        }
+
+        // 为格式化文档中的可翻译元素添加交互事件
+        function bindTranslatableEvents(root) {
+            const translatableElements = root.querySelectorAll('.translatable');
             translatableElements.forEach(element => {
                 const paraId = element.id;
+                const pageDiv = element.closest('.doc-page');
+                const page = pageDiv ? pageDiv.dataset.page : null;
                 
                 // 鼠标悬停高亮
                 element.addEventListener('mouseenter', function() {
@@ -300,11 +322,137 @@
                 
                 // 点击同步滚动
                 element.addEventListener('click', function() {
-                    syncScrollToElement(paraId);
+                    syncScrollToElement(paraId, page);
                 });
             });
         }
 
+        // 分页文档查看器：只渲染可视区域附近的页面，远离可视区域的页面释放DOM
+        const PAGE_PLACEHOLDER_HEIGHT = 800;  // 未加载页面的占位高度（px）
+        const PAGE_FETCH_LIMIT = 10;  // 单次请求的最大页数
+        const pagedViewers = {};
+
+        function displayPagedDocument(containerId, translationKey) {
+            const container = document.getElementById(containerId);
+            if (pagedViewers[containerId]) {
+                pagedViewers[containerId].observer.disconnect();
+            }
+            
+            const wrapper = document.createElement('div');
+            wrapper.className = 'document-preview paged-document';
+            for (let page = 1; page <= currentPageCount; page++) {
+                const pageDiv = document.createElement('div');
+                pageDiv.className = 'doc-page';
+                pageDiv.dataset.page = page;
+                pageDiv.style.minHeight = PAGE_PLACEHOLDER_HEIGHT + 'px';
+                wrapper.appendChild(pageDiv);
+            }
+            container.innerHTML = '';
+            container.appendChild(wrapper);
+            
+            const viewer = {
+                docId: currentDocId,
+                translationKey: translationKey,
+                wrapper: wrapper,
+                pending: new Set(),
+                loading: new Set(),
+                timer: null,
+                observer: null
+            };
+            
+            // 以面板为滚动根，提前加载上下各1500px范围内的页面
+            viewer.observer = new IntersectionObserver(entries => {
+                entries.forEach(entry => {
+                    const pageDiv = entry.target;
+                    const page = Number(pageDiv.dataset.page);
+                    if (entry.isIntersecting) {
+                        if (!pageDiv.dataset.loaded) {
+                            viewer.pending.add(page);
+                        }
+                    } else {
+                        viewer.pending.delete(page);
+                        unloadPage(pageDiv);
+                    }
+                });
+                clearTimeout(viewer.timer);
+                viewer.timer = setTimeout(() => loadPendingPages(viewer), 50);
+            }, { root: container.parentElement, rootMargin: '1500px 0px' });
+            
+            wrapper.querySelectorAll('.doc-page').forEach(pageDiv => viewer.observer.observe(pageDiv));
+            pagedViewers[containerId] = viewer;
+        }
+
+        // 批量加载待显示的页面（连续页合并为一个请求）
+        function loadPendingPages(viewer) {
+            const pages = [...viewer.pending].filter(page => !viewer.loading.has(page)).sort((a, b) => a - b);
+            viewer.pending.clear();
+            
+            let rangeStart = null;
+            let rangeEnd = null;
+            pages.forEach(page => {
+                if (rangeStart !== null && page === rangeEnd + 1 && page - rangeStart < PAGE_FETCH_LIMIT) {
+                    rangeEnd = page;
+                } else {
+                    if (rangeStart !== null) {
+                        fetchPages(viewer, rangeStart, rangeEnd);
+                    }
+                    rangeStart = page;
+                    rangeEnd = page;
+                }
+            });
+            if (rangeStart !== null) {
+                fetchPages(viewer, rangeStart, rangeEnd);
+            }
+        }
+
+        // 获取页面HTML并渲染
+        async function fetchPages(viewer, start, end) {
+            for (let page = start; page <= end; page++) {
+                viewer.loading.add(page);
+            }
+            
+            try {
+                let url = `/documents/${viewer.docId}/pages?start=${start}&end=${end}`;
+                if (viewer.translationKey) {
+                    url += `&lang=${encodeURIComponent(viewer.translationKey)}`;
+                }
+                const response = await fetch(url);
+                const data = await response.json();
+                
+                if (data.success) {
+                    data.pages.forEach(pageData => {
+                        const pageDiv = viewer.wrapper.querySelector(`.doc-page[data-page="${pageData.page}"]`);
+                        if (!pageDiv || pageDiv.dataset.loaded) return;
+                        
+                        pageDiv.innerHTML = pageData.html;
+                        pageDiv.dataset.loaded = '1';
+                        pageDiv.style.minHeight = '';
+                        bindTranslatableEvents(pageDiv);
+                        
+                        // 重新观察：若加载期间页面已离开可视区域，会立即触发释放
+                        viewer.observer.unobserve(pageDiv);
+                        viewer.observer.observe(pageDiv);
+                    });
+                } else {
+                    showStatus('页面加载失败: ' + data.error, 'error');
+                }
+            } catch (error) {
+                showStatus('页面加载失败: ' + error.message, 'error');
+            } finally {
+                for (let page = start; page <= end; page++) {
+                    viewer.loading.delete(page);
+                }
+            }
+        }
+
+        // 释放页面DOM，保留实际高度避免滚动位置跳动
+        function unloadPage(pageDiv) {
+            if (!pageDiv.dataset.loaded) return;
+            pageDiv.style.minHeight = pageDiv.offsetHeight + 'px';
+            pageDiv.innerHTML = '';
+            delete pageDiv.dataset.loaded;
+        }
+
         // 显示原文内容
         function displayOriginalContent(content) {
             const container = document.getElementById('originalContent');
@@ -467,20 +615,16 @@
                     const imageUrl = URL.createObjectURL(file);
                     imageUrls.push(imageUrl);
                     
-                    // 读取图片为base64
-                    const base64Image = await readFileAsBase64(file);
+                    // 直接以二进制上传图片（服务端发送给AI时再编码）
+                    const formData = new FormData();
+                    formData.append('image', file);
+                    formData.append('target_lang', targetLang);
+                    formData.append('ai_model', aiModel);
                     
                     // 调用AI进行整图翻译
                     const response = await fetch('/translate_image', {
                         method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json'
-                        },
-                        body: JSON.stringify({
-                            image_base64: base64Image,
-                            target_lang: targetLang,
-                            ai_model: aiModel
-                        })
+                        body: formData
                     });
                     
                     const data = await response.json();
@@ -511,6 +655,8 @@
                 }));
                 translatedContent = allTranslations;
                 currentFileName = `${imageCount}张图片`;
+                currentDocId = null;
+                currentTranslationKey = null;
                 
                 displayOriginalContentWithImages(currentContent);
                 displayTranslatedContent(translatedContent);
@@ -540,20 +686,6 @@
             }
         }
         
-        // 读取文件为base64
-        function readFileAsBase64(file) {
-            return new Promise((resolve, reject) => {
-                const reader = new FileReader();
-                reader.onload = function(e) {
-                    // 提取base64部分（去掉data:image/...;base64,前缀）
-                    const base64 = e.target.result.split(',')[1];
-                    resolve(base64);
-                };
-                reader.onerror = reject;
-                reader.readAsDataURL(file);
-            });
-        }
-        
         // 翻译内容
         async function translateContent() {
             const translateBtn = document.getElementById('translateBtn');
@@ -564,7 +696,7 @@
                 return;
             }
             
-            if (!currentContent) return;
+            if (!currentContent && !currentDocId) return;
 
             const aiModel = document.getElementById('aiModel').value;
             const targetLang = document.getElementById('targetLang').value;
@@ -578,27 +710,45 @@
             showStatus('正在翻译，请稍候...', 'info');
 
             try {
+                // 服务端文档只需传文档ID，无需回传全部段落和HTML
+                const requestBody = currentDocId ? {
+                    doc_id: currentDocId,
+                    target_lang: targetLang,
+                    source_lang: 'auto',
+                    ai_model: aiModel,
+                    stream: true
+                } : {
+                    content: currentContent,
+                    target_lang: targetLang,
+                    source_lang: 'auto',
+                    html_content: originalHtmlContent,
+                    ai_model: aiModel,
+                    stream: true
+                };
+                
                 const response = await fetch('/translate', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json'
                     },
-                    body: JSON.stringify({
-                        content: currentContent,
-                        target_lang: targetLang,
-                        source_lang: 'auto',
-                        html_content: originalHtmlContent,
-                        ai_model: aiModel
-                    })
+                    body: JSON.stringify(requestBody)
                 });
 
-                const data = await response.json();
+                // 流式响应：段落译完即显示进度（纯文本模式直接显示已完成的译文）
+                const contentType = response.headers.get('Content-Type') || '';
+                const data = contentType.includes('ndjson')
+                    ? await readTranslationStream(response, !currentDocId && !hasFormat)
+                    : await response.json();
 
                 if (data.success) {
-                    translatedContent = data.translated_content;
+                    // 服务端文档的译文按页保存在服务端，响应中不含译文段落
+                    translatedContent = data.translated_content || null;
                     
                     // 根据是否有格式化内容选择显示方式
-                    if (hasFormat && data.translated_html) {
+                    if (currentDocId && data.translation_key) {
+                        currentTranslationKey = data.translation_key;
+                        displayPagedDocument('translatedContent', currentTranslationKey);
+                    } else if (hasFormat && data.translated_html) {
                         displayFormattedContent(data.translated_html, 'translatedContent');
                     } else {
                         displayTranslatedContent(data.translated_content);
@@ -625,6 +775,57 @@
             }
         }
 
+        // 读取 /translate 的NDJSON流，返回最终的 done 或 error 事件
+        async function readTranslationStream(response, showPartial) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let total = 0;
+            let completed = 0;
+            let partial = [];
+            let renderTimer = null;
+
+            const render = () => {
+                renderTimer = null;
+                displayTranslatedContent(partial);
+            };
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let newline;
+                while ((newline = buffer.indexOf('\n')) >= 0) {
+                    const line = buffer.slice(0, newline).trim();
+                    buffer = buffer.slice(newline + 1);
+                    if (!line) continue;
+
+                    const event = JSON.parse(line);
+                    if (event.type === 'start') {
+                        total = event.total;
+                        partial = Array.from({ length: total }, () => ({ translation: '' }));
+                    } else if (event.type === 'segment') {
+                        completed++;
+                        showStatus(`正在翻译... 已完成 ${completed}/${total} 段`, 'info');
+                        if (showPartial && event.index !== null && event.index < total) {
+                            partial[event.index] = { id: event.id, translation: event.translation };
+                            // 合并短时间内的多次更新
+                            if (!renderTimer) {
+                                renderTimer = setTimeout(render, 200);
+                            }
+                        }
+                    } else {
+                        if (renderTimer) clearTimeout(renderTimer);
+                        return event;
+                    }
+                }
+            }
+
+            if (renderTimer) clearTimeout(renderTimer);
+            return { success: false, error: '连接中断' };
+        }
+
         // 显示翻译内容
         function displayTranslatedContent(content) {
             const container = document.getElementById('translatedContent');
@@ -767,25 +968,35 @@
         }
 
         // 滚动同步功能（格式化文档模式）
-        function syncScrollToElement(paraId) {
-            const originalElement = document.querySelector('#originalContent .document-preview #' + paraId);
-            const translatedElement = document.querySelector('#translatedContent .document-preview #' + paraId);
-            
-            if (originalElement) {
-                originalElement.scrollIntoView({ behavior: 'smooth', block: 'center' });
-            }
-            if (translatedElement) {
-                translatedElement.scrollIntoView({ behavior: 'smooth', block: 'center' });
-            }
+        function syncScrollToElement(paraId, page) {
+            ['originalContent', 'translatedContent'].forEach(containerId => {
+                const element = document.querySelector(`#${containerId} .document-preview #${paraId}`);
+                if (element) {
+                    element.scrollIntoView({ behavior: 'smooth', block: 'center' });
+                } else if (page) {
+                    // 分页文档中对应页面尚未加载，先滚动到该页，进入可视区域后自动加载
+                    const pageDiv = document.querySelector(`#${containerId} .doc-page[data-page="${page}"]`);
+                    if (pageDiv) {
+                        pageDiv.scrollIntoView({ behavior: 'smooth', block: 'start' });
+                    }
+                }
+            });
             
             // 高亮一下点击的元素
             highlightFormattedParagraph(paraId);
             setTimeout(() => clearFormattedHighlight(), 2000);
         }
 
+        // 隐藏/显示译文中的页眉、页脚等页面装饰
+        function toggleFurniture() {
+            const hidden = document.getElementById('hideFurniture').checked;
+            document.getElementById('translatedContent').classList.toggle('hide-furniture', hidden);
+        }
+
         // 导出翻译结果
         async function exportTranslation(format, bilingual = false) {
-            if (!translatedContent || translatedContent.length === 0) {
+            const storedTranslation = currentDocId && currentTranslationKey;
+            if (!storedTranslation && (!translatedContent || translatedContent.length === 0)) {
                 showStatus('没有可导出的翻译内容', 'error');
                 return;
             }
@@ -793,13 +1004,37 @@
             const modeText = bilingual ? '双译' : '译文';
             showStatus(`正在生成${modeText}${format === 'txt' ? 'TXT' : 'Word'}文件...`, 'info');
 
-            // 获取译文HTML（如果是格式化文档）
-            let translatedHtml = null;
-            if (hasFormat) {
-                const translatedContainer = document.querySelector('#translatedContent .document-preview');
-                if (translatedContainer) {
-                    translatedHtml = translatedContainer.innerHTML;
+            const omitFurniture = document.getElementById('hideFurniture').checked;  // 不导出页眉页脚
+            let requestBody;
+            if (storedTranslation) {
+                // 服务端文档：由服务端从保存的译文段落生成，无需回传内容
+                requestBody = {
+                    doc_id: currentDocId,
+                    translation_key: currentTranslationKey,
+                    format: format,
+                    filename: currentFileName,
+                    bilingual: bilingual,
+                    omit_furniture: omitFurniture
+                };
+            } else {
+                // 获取译文HTML（如果是格式化文档）
+                let translatedHtml = null;
+                if (hasFormat) {
+                    const translatedContainer = document.querySelector('#translatedContent .document-preview');
+                    if (translatedContainer) {
+                        translatedHtml = translatedContainer.innerHTML;
+                    }
                 }
+                requestBody = {
+                    content: translatedContent,
+                    original_content: bilingual ? currentContent : null,  // 双译时包含原文
+                    format: format,
+                    filename: currentFileName,
+                    has_format: hasFormat,
+                    translated_html: translatedHtml,
+                    bilingual: bilingual,  // 是否双译
+                    omit_furniture: omitFurniture
+                };
             }
 
             try {
@@ -808,15 +1043,7 @@
                     headers: {
                         'Content-Type': 'application/json'
                     },
-                    body: JSON.stringify({
-                        content: translatedContent,
-                        original_content: bilingual ? currentContent : null,  // 双译时包含原文
-                        format: format,
-                        filename: currentFileName,
-                        has_format: hasFormat,
-                        translated_html: translatedHtml,
-                        bilingual: bilingual  // 是否双译
-                    })
+                    body: JSON.stringify(requestBody)
                 });
 
                 if (response.ok) {
@@ -841,6 +1068,24 @@
                 showStatus('导出失败: ' + error.message, 'error');
             }
         }
+
+        // 批量导出服务端文档的全部译文（ZIP由服务端边生成边下载）
+        function exportBatch() {
+            if (!currentDocId || !currentTranslationKey) {
+                showStatus('仅支持导出已翻译的服务端文档', 'error');
+                return;
+            }
+
+            const params = new URLSearchParams();
+            params.append('doc_id', currentDocId);
+            params.append('format', 'txt');
+            params.append('format', 'docx');
+            if (document.getElementById('hideFurniture').checked) {
+                params.append('omit_furniture', '1');
+            }
+            window.location.href = `/export/batch?${params.toString()}`;
+            showStatus('正在下载ZIP文件...', 'info');
+        }
         // 窗口大小改变时重新同步高度
         let resizeTimer;
         window.addEventListener('resize', function() {
@@ -0,0 +1,75 @@
+"""
+测试公共设置：把项目根目录加入导入路径；没有 config.py 时使用 config.example.py
+
+fake_provider：替换翻译API的模拟服务（译文为 "语言代码:原文"，便于断言每段译成了哪种语言）
+"""
+import importlib.util
+import os
+import re
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:
+    import config  # noqa: F401
+except ImportError:
+    spec = importlib.util.spec_from_file_location('config', os.path.join(ROOT, 'config.example.py'))
+    config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config)
+    sys.modules['config'] = config
+
+# 紧凑格式请求中的一段原文：[[编号]]原文
+COMPACT_LINE = re.compile(r'^\[\[(\d+)\]\](.*)$', re.MULTILINE)
+
+
+class FakeProvider:
+    """
+    模拟翻译API：按请求格式（紧凑批量、多语言批量、单段）返回 "语言代码:原文"
+
+    drop 中的原文不输出（模拟模型漏掉段落）；chunk_size 为流式输出时每次回调的字符数
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.drop = set()
+        self.chunk_size = 5
+        self._lock = threading.Lock()
+        self._codes = {name: code for code, name in config.LANGUAGES.items()}
+
+    def __call__(self, api_base, payload, model_config=None, timeout=60, on_text=None):
+        content = payload['messages'][-1]['content']
+        with self._lock:
+            self.requests.append(content)
+        header = content.split('\n', 1)[0]
+        lines = COMPACT_LINE.findall(content)
+        if lines and '=' in header:
+            langs = [item.split('=')[0] for item in header.split('：', 1)[1].split('；')]
+            output = ''.join(f'[[{idx}:{lang}]]{lang}:{text}\n' for idx, text in lines for lang in langs if text not in self.drop)
+        elif lines:
+            lang = self._codes[header.split('：', 1)[1]]
+            output = ''.join(f'[[{idx}]]{lang}:{text}\n' for idx, text in lines if text not in self.drop)
+        else:
+            lang = self._codes[re.search(r'翻译成(.+?)。', content).group(1)]
+            output = f'{lang}:' + content.rsplit('原文：\n', 1)[1]
+        if on_text:
+            for start in range(0, len(output), self.chunk_size):
+                on_text(output[start:start + self.chunk_size])
+        return output
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    """Translator 调用的API替换为 FakeProvider，并使用空的译文缓存"""
+    import translator
+    from translation_cache import TranslationCache
+
+    provider = FakeProvider()
+    cache = TranslationCache(1000)
+    monkeypatch.setattr(translator.Translator, '_chat_completion', lambda self, *args, **kwargs: provider(*args, **kwargs))
+    monkeypatch.setattr(translator, 'get_translation_cache', lambda: cache)
+    return provider
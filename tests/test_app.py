@@ -0,0 +1,110 @@
+"""HTTP接口（Flask测试客户端）"""
+import base64
+import io
+import os
+
+import pytest
+
+pytest.importorskip('flask')
+
+import config
+
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    # 存储目录指向临时目录后再导入应用
+    root = tmp_path_factory.mktemp('app')
+    for name in ('UPLOAD_FOLDER', 'ASSET_FOLDER', 'DOCUMENT_FOLDER', 'EXPORT_CACHE_FOLDER'):
+        setattr(config, name, str(root / name.lower()))
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def no_translation(app_module, monkeypatch):
+    """调用翻译API即失败"""
+    def fail(*args, **kwargs):
+        raise AssertionError('translation should not run')
+
+    monkeypatch.setattr(app_module.translator, 'translate_batch', fail)
+
+
+@pytest.mark.parametrize('target_lang', ['../x', 'xx', None, ['ja']])
+def test_translate_rejects_unsupported_language_before_translating(client, no_translation, target_lang):
+    response = client.post('/translate', json={'content': [{'id': 'para-0', 'text': 'Hello'}], 'target_lang': target_lang})
+    assert response.status_code == 400
+    assert '不支持的目标语言' in response.get_json()['error']
+
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+@pytest.fixture
+def image_requests(app_module, monkeypatch):
+    """整图翻译不调用API，记录发送给AI的图片"""
+    sent = []
+
+    def translate_image(image_base64, target_lang, model_config=None, mime_type='image/jpeg'):
+        sent.append((base64.b64decode(image_base64), target_lang, mime_type))
+        return f'{target_lang}:translated'
+
+    monkeypatch.setattr(app_module.translator, 'translate_image', translate_image)
+    return sent
+
+
+def test_translate_image_multipart(client, image_requests):
+    response = client.post('/translate_image', data={'image': (io.BytesIO(PNG), 'scan.png'), 'target_lang': 'ja'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['translation'] == 'ja:translated'
+    assert image_requests == [(PNG, 'ja', 'image/png')]
+
+    # 返回的 image_id 可再次引用，无需重新上传
+    response = client.post('/translate_image', json={'image_id': data['image_id'], 'target_lang': 'fr'})
+    assert response.status_code == 200
+    assert image_requests[-1] == (PNG, 'fr', 'image/png')
+
+
+def test_translate_image_rejects_unsupported_file(client, image_requests):
+    response = client.post('/translate_image', data={'image': (io.BytesIO(b'text'), 'notes.txt')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert image_requests == []
+
+
+@pytest.mark.parametrize('image_id', ['0' * 64 + '.png', '../config.py'])
+def test_translate_image_unknown_asset(client, image_requests, image_id):
+    response = client.post('/translate_image', json={'image_id': image_id})
+    assert response.status_code == 404
+    assert image_requests == []
+
+
+def test_translate_image_missing_image(client, image_requests):
+    assert client.post('/translate_image', json={'target_lang': 'ja'}).status_code == 400
+
+
+def test_translate_image_oversized_upload(app_module, client, image_requests, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'MAX_CONTENT_LENGTH', 1024)
+    response = client.post('/translate_image', data={'image': (io.BytesIO(PNG * 100), 'scan.png')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert image_requests == []
+
+
+def test_profiling_requires_admin_token(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'PROFILE_TOKEN', 'secret-token', raising=False)
+    monkeypatch.setattr(config, 'PROFILE_SAMPLE_RATE', 0.0, raising=False)
+    monkeypatch.setattr(config, 'PROFILE_FOLDER', str(tmp_path), raising=False)
+    for headers in ({}, {'X-Profile': 'wrong'}):
+        assert 'X-Profile-Id' not in client.get('/', headers=headers).headers
+    assert 'X-Profile-Id' not in client.get('/?profile=wrong').headers
+    assert os.listdir(tmp_path) == []
+
+    profile_id = client.get('/', headers={'X-Profile': 'secret-token'}).headers['X-Profile-Id']
+    assert sorted(os.listdir(tmp_path)) == [f'{profile_id}.cpu.folded', f'{profile_id}.trace.json', f'{profile_id}.wall.folded']
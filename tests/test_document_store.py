@@ -0,0 +1,94 @@
+"""文档存储与资源存储"""
+import os
+import time
+
+import pytest
+
+from asset_store import AssetStore
+from document_store import DocumentStore
+from segment import Segment
+
+OLD = time.time() - 10 * 24 * 3600
+
+
+@pytest.fixture
+def stores(tmp_path):
+    assets = AssetStore(str(tmp_path / 'assets'), ttl=3600)
+    documents = DocumentStore(str(tmp_path / 'documents'), ttl=3600, asset_store=assets)
+    return documents, assets
+
+
+def create_document(documents, assets):
+    asset_id = assets.put(b'\x89PNG image', 'png')
+    pages = [
+        {'html': f'<p id="para-0" class="translatable">Hello</p><p><img src="{assets.url(asset_id)}"></p>',
+         'segments': [Segment(id='para-0', text='Hello', tag='p', index=0, page=1)]},
+        {'html': '<p id="para-1" class="translatable">World</p>',
+         'segments': [Segment(id='para-1', text='World', tag='p', index=1, page=2)]},
+    ]
+    return documents.create('test.docx', 'word', pages), asset_id
+
+
+def test_pages_and_translations(stores):
+    pytest.importorskip('bs4')
+    documents, assets = stores
+    doc_id, _ = create_document(documents, assets)
+    meta = documents.get_meta(doc_id)
+    assert (meta['page_count'], meta['segment_count'], meta['translations']) == (2, 2, [])
+
+    segments = list(documents.iter_segments(doc_id))
+    for segment in segments:
+        segment.translation = f'T:{segment.text}'
+    documents.save_translation(doc_id, 'ja', segments)
+
+    page = documents.get_pages(doc_id, 2, 5, 'ja')
+    assert [p['page'] for p in page] == [2]
+    assert 'T:World' in page[0]['html'] and page[0]['segments'][0].translation == 'T:World'
+    assert documents.get_meta(doc_id)['translations'] == ['ja']
+    with pytest.raises(KeyError):
+        documents.get_meta('0' * 32)
+    with pytest.raises(ValueError):
+        documents.save_translation(doc_id, '../x', segments)
+
+
+def test_content_digest_changes_with_translation(stores):
+    pytest.importorskip('bs4')
+    documents, assets = stores
+    doc_id, _ = create_document(documents, assets)
+    before = documents.content_digest(doc_id, 'ja')
+    assert before == documents.content_digest(doc_id)
+    segments = list(documents.iter_segments(doc_id))
+    segments[0].translation = 'T'
+    documents.save_translation(doc_id, 'ja', segments)
+    assert documents.content_digest(doc_id, 'ja') != before
+
+
+def test_saving_translation_refreshes_referenced_assets(stores):
+    pytest.importorskip('bs4')
+    documents, assets = stores
+    doc_id, asset_id = create_document(documents, assets)
+    assert documents.get_meta(doc_id)['assets'] == [asset_id]
+
+    # 文档和图片都已接近过期，保存译文后两者的保留时间一起延长
+    os.utime(documents._doc_dir(doc_id), (OLD, OLD))
+    os.utime(assets.path(asset_id), (OLD, OLD))
+    documents.save_translation(doc_id, 'ja', list(documents.iter_segments(doc_id)))
+
+    assets.cleanup(force=True)
+    documents.cleanup()
+    assert documents.get_meta(doc_id)
+    assert assets.read(asset_id) == b'\x89PNG image'
+
+
+def test_asset_store_is_content_addressed(stores):
+    _, assets = stores
+    first = assets.put(b'data', 'PNG')
+    assert first == assets.put(b'data', 'png')
+    assert first.endswith('.png') and assets.mime_type(first) == 'image/png'
+    for bad in ('../etc/passwd', first.replace('.png', '.exe/x')):
+        with pytest.raises(KeyError):
+            assets.path(bad)
+    os.utime(assets.path(first), (OLD, OLD))
+    assets.cleanup(force=True)
+    with pytest.raises(KeyError):
+        assets.path(first)
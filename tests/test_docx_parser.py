@@ -0,0 +1,106 @@
+"""Word文档流式解析"""
+import zipfile
+
+import pytest
+
+from file_parser import FileParser
+
+pytest.importorskip('lxml')
+
+NS = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+    'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+    'xmlns:v="urn:schemas-microsoft-com:vml"'
+)
+
+NUMBERING = f"""<w:numbering {NS}>
+<w:abstractNum w:abstractNumId="0"><w:lvl w:ilvl="0"><w:numFmt w:val="bullet"/></w:lvl></w:abstractNum>
+<w:abstractNum w:abstractNumId="1"><w:lvl w:ilvl="0"><w:numFmt w:val="decimal"/></w:lvl></w:abstractNum>
+<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>
+<w:num w:numId="2"><w:abstractNumId w:val="1"/></w:num>
+</w:numbering>"""
+
+
+def para(text, num_id=None, style=None):
+    p_pr = ''
+    if num_id or style:
+        p_pr = '<w:pPr>'
+        if style:
+            p_pr += f'<w:pStyle w:val="{style}"/>'
+        if num_id:
+            p_pr += f'<w:numPr><w:ilvl w:val="0"/><w:numId w:val="{num_id}"/></w:numPr>'
+        p_pr += '</w:pPr>'
+    return f'<w:p>{p_pr}<w:r><w:t>{text}</w:t></w:r></w:p>'
+
+
+def table(rows):
+    cells = ''.join('<w:tr>' + ''.join(f'<w:tc>{cell}</w:tc>' for cell in row) + '</w:tr>' for row in rows)
+    return f'<w:tbl>{cells}</w:tbl>'
+
+
+def write_docx(path, body, numbering=None):
+    with zipfile.ZipFile(path, 'w') as docx:
+        docx.writestr('word/document.xml', f'<w:document {NS}><w:body>{body}</w:body></w:document>')
+        if numbering:
+            docx.writestr('word/numbering.xml', numbering)
+    return str(path)
+
+
+def parse(tmp_path, body, **kwargs):
+    pages = FileParser.parse_docx_pages(write_docx(tmp_path / 'test.docx', body, NUMBERING), **kwargs)
+    return pages, [segment for page in pages for segment in page['segments']]
+
+
+def test_paragraph_ids_and_pages(tmp_path):
+    pages, segments = parse(tmp_path, ''.join(para(f'Paragraph {n}') for n in range(5)), segments_per_page=2)
+    assert [segment.id for segment in segments] == [f'para-{n}' for n in range(5)]
+    assert [len(page['segments']) for page in pages] == [2, 2, 1]
+    assert [segment.page for segment in segments] == [1, 1, 2, 2, 3]
+
+
+def test_textbox_fallback_is_not_duplicated(tmp_path):
+    textbox = (
+        '<w:p><w:r><mc:AlternateContent>'
+        '<mc:Choice Requires="wps"><w:drawing><wps:txbx><w:txbxContent>'
+        f'{para("Text box")}'
+        '</w:txbxContent></wps:txbx></w:drawing></mc:Choice>'
+        '<mc:Fallback><w:pict><v:textbox><w:txbxContent>'
+        f'{para("Text box")}'
+        '</w:txbxContent></v:textbox></w:pict></mc:Fallback>'
+        '</mc:AlternateContent></w:r></w:p>'
+    )
+    _, segments = parse(tmp_path, para('Before') + textbox + para('After'))
+    assert [segment.text for segment in segments] == ['Before', 'Text box', 'After']
+
+
+def test_numbered_and_bulleted_lists(tmp_path):
+    body = para('One', num_id=2) + para('Two', num_id=2) + para('Dot', num_id=1) + para('Plain')
+    pages, segments = parse(tmp_path, body)
+    html = pages[0]['html']
+    assert '<ol><li id="para-0" class="translatable">One</li><li id="para-1" class="translatable">Two</li></ol>' in html
+    assert '<ul><li id="para-2" class="translatable">Dot</li></ul><p id="para-3"' in html
+    assert [segment.tag for segment in segments] == ['li', 'li', 'li', 'p']
+
+
+def test_nested_table_keeps_outer_position(tmp_path):
+    nested = table([[para('N00'), para('N01')], [para('N10'), para('N11')]])
+    body = table([
+        [para('A00'), para('A01') + nested + para('A01b'), para('A02')],
+        [para('A10'), para('A11')],
+    ]) + para('After')
+    _, segments = parse(tmp_path, body)
+    positions = {segment.text: (segment.table, segment.row, segment.col) for segment in segments}
+    assert positions['N11'] == (1, 1, 1)
+    assert positions['A01b'] == (0, 0, 1)
+    assert positions['A02'] == (0, 0, 2)
+    assert positions['A10'] == (0, 1, 0)
+    assert positions['A11'] == (0, 1, 1)
+    assert positions['After'] == (None, None, None)
+    assert not segments[-1].is_table
+
+
+def test_adjacent_tables_get_separate_indexes(tmp_path):
+    body = table([[para('First')]]) + table([[para('Second')]])
+    _, segments = parse(tmp_path, body)
+    assert [(segment.table, segment.row, segment.col) for segment in segments] == [(0, 0, 0), (1, 0, 0)]
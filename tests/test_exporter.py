@@ -0,0 +1,115 @@
+"""从保存的译文批量导出"""
+import io
+import os
+import zipfile
+
+import pytest
+
+pytest.importorskip('bs4')
+
+from document_store import DocumentStore
+from exporter import Exporter
+from segment import Segment
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    return Exporter(DocumentStore(str(tmp_path / 'documents')), str(tmp_path / 'exports'))
+
+
+def create_translated(store, filename='report.pdf', langs=('ja',)):
+    pages = [{
+        'html': '<div id="para-0" class="translatable pdf-furniture">Header</div><p id="para-1" class="translatable">Hello</p>',
+        'segments': [
+            Segment(id='para-0', text='Header', tag='div', index=0, page=1, furniture=True),
+            Segment(id='para-1', text='Hello', tag='p', index=1, page=1),
+        ],
+    }]
+    doc_id = store.create(filename, 'pdf', pages)
+    for lang in langs:
+        segments = list(store.iter_segments(doc_id))
+        for segment in segments:
+            segment.translation = f'{lang}:{segment.text}'
+        store.save_translation(doc_id, lang, segments)
+    return doc_id
+
+
+def read_zip(exporter, files):
+    return zipfile.ZipFile(io.BytesIO(b''.join(exporter.stream_zip(files))))
+
+
+def test_plan_validates_before_streaming(exporter):
+    doc_id = create_translated(exporter.document_store)
+    assert exporter.plan([doc_id], None, ['txt', 'docx']) == [(doc_id, 'ja', 'txt'), (doc_id, 'ja', 'docx')]
+    with pytest.raises(ValueError):
+        exporter.plan([doc_id], ['fr'], ['txt'])
+    with pytest.raises(ValueError):
+        exporter.plan([doc_id], None, ['pdf'])
+    with pytest.raises(KeyError):
+        exporter.plan(['0' * 32], None, ['txt'])
+    with pytest.raises(ValueError):
+        exporter.plan([create_translated(exporter.document_store, langs=())], None, ['txt'])
+
+
+def test_zip_entries_and_content(exporter):
+    store = exporter.document_store
+    first = create_translated(store, langs=('ja', 'fr'))
+    second = create_translated(store)  # 同名文档
+    files = exporter.prepare(exporter.plan([first, second], None, ['txt']), omit_furniture=True)
+    archive = read_zip(exporter, files)
+    assert archive.testzip() is None
+    assert archive.namelist() == ['report/report_fr_译文.txt', 'report/report_ja_译文.txt', 'report/report_ja_译文(2).txt']
+    text = archive.read('report/report_ja_译文.txt').decode('utf-8-sig')
+    assert 'ja:Hello' in text and 'Header' not in text
+
+
+def test_bilingual_docx(exporter):
+    docx = pytest.importorskip('docx')
+    doc_id = create_translated(exporter.document_store)
+    files = exporter.prepare(exporter.plan([doc_id], ['ja'], ['docx']), bilingual=True)
+    archive = read_zip(exporter, files)
+    document = docx.Document(io.BytesIO(archive.read('report/report_ja_双译.docx')))
+    texts = [paragraph.text for paragraph in document.paragraphs]
+    assert texts[-4:] == ['Header', 'ja:Header', 'Hello', 'ja:Hello']
+
+
+def test_rendered_files_are_cached_until_content_changes(exporter):
+    store = exporter.document_store
+    doc_id = create_translated(store)
+    items = exporter.plan([doc_id], ['ja'], ['txt'])
+    path, _ = exporter.prepare(items)[0]
+    assert exporter.prepare(items)[0][0] == path
+    assert len(os.listdir(exporter.root)) == 1
+
+    segments = list(store.iter_segments(doc_id))
+    for segment in segments:
+        segment.translation = 'changed'
+    store.save_translation(doc_id, 'ja', segments)
+    assert exporter.prepare(items)[0][0] != path
+
+
+def test_render_failure_is_raised_before_streaming(exporter, monkeypatch):
+    doc_id = create_translated(exporter.document_store)
+
+    def broken(*args):
+        raise RuntimeError('docx build failed')
+
+    monkeypatch.setattr(Exporter, '_render_docx', staticmethod(broken))
+    with pytest.raises(RuntimeError):
+        exporter.prepare(exporter.plan([doc_id], ['ja'], ['txt', 'docx']))
+    assert not any(name.endswith('.tmp') for name in os.listdir(exporter.root))
+
+
+def test_docx_tables_keep_every_paragraph_and_table(tmp_path):
+    docx = pytest.importorskip('docx')
+    segments = [
+        Segment(id='para-0', text='Line one', tag='p', is_table=True, table=0, row=0, col=0, translation='一'),
+        Segment(id='para-1', text='Line two', tag='p', is_table=True, table=0, row=0, col=0, translation='二'),
+        Segment(id='para-2', text='Other', tag='p', is_table=True, table=1, row=0, col=0, translation='他'),
+    ]
+    path = str(tmp_path / 'tables.docx')
+    Exporter._render_docx(path, 'tables', iter(segments), False)
+    tables = docx.Document(path).tables
+    assert len(tables) == 2
+    assert [paragraph.text for paragraph in tables[0].cell(0, 0).paragraphs] == ['一', '二']
+    assert tables[1].cell(0, 0).text == '他'
@@ -0,0 +1,102 @@
+"""PDF页面装饰（页眉、页脚、水印等）检测"""
+import pytest
+
+import config
+from document_store import repeat_translation
+from file_parser import FileParser
+
+PAGE_HEIGHT = 800.0
+
+
+def text_line(text, y, block=0):
+    return {'text': text, 'size': 9.0, 'bold': False, 'bbox': (72.0, y, 300.0, y + 10), 'block': block}
+
+
+def test_find_page_furniture_ignores_numbers_in_margins(monkeypatch):
+    monkeypatch.setattr(config, 'PDF_FURNITURE_MIN_RATIO', 0.5, raising=False)
+    pages = [{
+        'height': PAGE_HEIGHT,
+        'lines': [
+            text_line('ACME Annual Report', 30),
+            text_line(f'Body text number {n}', 300, block=1),
+            text_line(f'Page {n} of 5', 770, block=2),
+        ],
+    } for n in range(1, 6)]
+    furniture = FileParser._find_page_furniture(pages)
+    texts = {text for text, _ in furniture}
+    assert texts == {'acme annual report', 'page # of #'}
+
+
+def test_find_page_furniture_needs_enough_pages(monkeypatch):
+    monkeypatch.setattr(config, 'PDF_FURNITURE_MIN_RATIO', 0.5, raising=False)
+    pages = [{'height': PAGE_HEIGHT, 'lines': [text_line('Header', 30)]} for _ in range(FileParser.FURNITURE_MIN_PAGES - 1)]
+    assert FileParser._find_page_furniture(pages) == set()
+    monkeypatch.setattr(config, 'PDF_FURNITURE_MIN_RATIO', 0, raising=False)
+    assert FileParser._find_page_furniture(pages * 3) == set()
+
+
+@pytest.mark.parametrize('source, translation, text, expected', [
+    ('Page 1 of 5', '第1页，共5页', 'Page 3 of 5', '第3页，共5页'),
+    ('Page 1 of 5', '共5页 第1页', 'Page 3 of 5', '共5页 第3页'),
+    ('Page 5 of 5', '第5页，共5页', 'Page 5 of 5', '第5页，共5页'),
+    ('Page 1 of 5', 'Seite eins von fünf', 'Page 3 of 5', 'Page 3 of 5'),
+    ('CONFIDENTIAL', '机密', 'CONFIDENTIAL', '机密'),
+])
+def test_repeat_translation(source, translation, text, expected):
+    assert repeat_translation(source, translation, text) == expected
+
+
+def build_pdf(path, pages=5):
+    fitz = pytest.importorskip('fitz')
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 40), 'ACME Corp Annual Report', fontsize=9)
+        # 每页相同位置的标题行与正文在同一个文本块中
+        page.insert_textbox(fitz.Rect(72, 200, 540, 400),
+                            f'Notes to the accounts\nthe balance for period {n} increased by {n * 7} percent',
+                            fontsize=11)
+        page.insert_text((72, 770), f'Page {n + 1} of {pages}', fontsize=9)
+    doc.save(str(path))
+    return str(path)
+
+
+def test_parse_pdf_pages_translates_furniture_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'PDF_FURNITURE_MIN_RATIO', 0.5, raising=False)
+    pages = FileParser.parse_pdf_pages(build_pdf(tmp_path / 'furniture.pdf'))
+    segments = [segment for page in pages for segment in page['segments']]
+
+    furniture = [segment.text for segment in segments if segment.furniture]
+    assert furniture == ['ACME Corp Annual Report', 'Page 1 of 5']
+    assert 'data-repeat-of="para-2">Page 3 of 5</div>' in pages[2]['html']
+
+    # 与正文同块的重复行不从段落中拆出
+    body = [segment.text for segment in segments if not segment.furniture]
+    assert len(body) == 5
+    assert all(text.startswith('Notes to the accounts the balance') for text in body)
+
+
+def test_translated_pages_fill_repeated_numbers(tmp_path, monkeypatch):
+    pytest.importorskip('bs4')
+    from document_store import DocumentStore
+
+    monkeypatch.setattr(config, 'PDF_FURNITURE_MIN_RATIO', 0.5, raising=False)
+    pages = FileParser.parse_pdf_pages(build_pdf(tmp_path / 'furniture.pdf'))
+    store = DocumentStore(str(tmp_path / 'documents'))
+    doc_id = store.create('furniture.pdf', 'pdf', pages)
+    segments = list(store.iter_segments(doc_id))
+    for segment in segments:
+        segment.translation = '第1页，共5页' if segment.text == 'Page 1 of 5' else '译:' + segment.text
+    store.save_translation(doc_id, 'zh-CN', segments)
+
+    html = store.get_pages(doc_id, 4, 4, 'zh-CN')[0]['html']
+    assert '第4页，共5页' in html
+    assert '译:ACME Corp Annual Report' in html
+
+
+def test_line_start_indexes_raw_page_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'PDF_FURNITURE_MIN_RATIO', 0.5, raising=False)
+    pages = FileParser.parse_pdf_pages(build_pdf(tmp_path / 'furniture.pdf'))
+    # 每页文本行：页眉、正文两行、页脚；正文段落从第1行（页眉之后）开始
+    body = [segment for segment in pages[1]['segments'] if not segment.furniture]
+    assert [(segment.line_start, segment.line_count) for segment in body] == [(1, 2)]
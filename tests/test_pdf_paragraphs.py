@@ -0,0 +1,64 @@
+"""PDF 文本行合并为段落"""
+import pytest
+
+from file_parser import FileParser
+
+BLOCK = (72.0, 520.0)
+
+
+def line(text, y, x0=72.0, x1=520.0, size=11.0, bold=False, block=0):
+    return {'text': text, 'size': size, 'bold': bold, 'bbox': (x0, y, x1, y + 12), 'block': block}
+
+
+def continues(prev_text, cur_text, **cur):
+    return FileParser._continues_paragraph(line(prev_text, 100), line(cur_text, 114, **cur), BLOCK)
+
+
+@pytest.mark.parametrize('text', [
+    '3.5 billion in the previous fiscal year',
+    'U.S. dollars at the prevailing rate',
+    'e.g. the cost of goods sold',
+    '2023 results were in line with guidance',
+    '-5% compared with the prior year',
+])
+def test_continuation_lines_are_not_list_items(text):
+    assert continues('Revenue for the group reached', text)
+
+
+@pytest.mark.parametrize('text', [
+    '• Revenue grew',
+    '- Revenue grew',
+    '1. Revenue grew',
+    '12) Revenue grew',
+    '(3) Revenue grew',
+    '(b) Revenue grew',
+    'a. Revenue grew',
+    '1、营业收入增长',
+])
+def test_list_items_start_new_paragraph(text):
+    assert not continues('Highlights of the year', text)
+
+
+def test_new_block_font_change_and_indent_break_paragraph():
+    assert not continues('Revenue for the group', 'reached a record', block=1)
+    assert not continues('Revenue for the group', 'reached a record', size=14.0)
+    assert not continues('Revenue for the group', 'reached a record', bold=True)
+    assert not continues('Revenue for the group', 'reached a record', x0=100.0)
+
+
+def test_short_line_ending_sentence_breaks_paragraph():
+    prev = line('The year ended well.', 100, x1=200.0)
+    assert not FileParser._continues_paragraph(prev, line('Next paragraph starts', 114), BLOCK)
+    prev = line('The year ended with', 100, x1=200.0)
+    assert FileParser._continues_paragraph(prev, line('record revenue.', 114), BLOCK)
+
+
+def test_merge_and_join_lines():
+    lines = [
+        line('Revenue for the group reached a re-', 100),
+        line('cord high of 3.5 billion.', 114, x1=300.0),
+        line('1. Costs declined', 128),
+    ]
+    groups = FileParser._merge_pdf_lines(lines)
+    assert [len(group) for group in groups] == [2, 1]
+    assert FileParser._join_pdf_lines([l['text'] for l in groups[0]]) == 'Revenue for the group reached a record high of 3.5 billion.'
@@ -0,0 +1,39 @@
+"""本地预过滤和语言检测"""
+import pytest
+
+from prefilter import PreFilter
+
+
+@pytest.mark.parametrize('text', ['2023-12-31', 'USD 1,200.50', '12.5%', 'https://example.com/a', 'ISO-9001', 'a@b.com'])
+def test_skip_non_translatable(text):
+    assert PreFilter.should_skip(text, 'zh-CN')
+
+
+@pytest.mark.parametrize('text, lang', [
+    ('财务报表', 'zh-CN'),
+    ('資產負債表', 'zh-TW'),
+    ('これは日本語の文章です', 'ja'),
+    ('The company and its subsidiaries are listed', 'en'),
+])
+def test_skip_text_already_in_target_language(text, lang):
+    assert PreFilter.detect_language(text) == lang
+    assert PreFilter.should_skip(text, lang)
+
+
+@pytest.mark.parametrize('text', ['財務諸表', '目次', '会社概要', '問題'])
+def test_han_only_text_without_markers_is_not_skipped(text):
+    # 可能是日文汉字或简繁通用写法，交给模型翻译
+    assert PreFilter.detect_language(text) is None
+    for lang in ('zh-CN', 'zh-TW', 'ja'):
+        assert not PreFilter.should_skip(text, lang)
+
+
+def test_simplified_text_is_translated_to_traditional():
+    assert not PreFilter.should_skip('财务报表', 'zh-TW')
+    assert not PreFilter.should_skip('資產負債表', 'zh-CN')
+
+
+def test_resolve_source_lang():
+    assert PreFilter.resolve_source_lang(['The results of the year are in line with the plan']) == 'en'
+    assert PreFilter.resolve_source_lang(['財務諸表']) == 'auto'
+    assert PreFilter.resolve_source_lang(['財務諸表'], 'ja') == 'ja'
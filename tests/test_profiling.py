@@ -0,0 +1,71 @@
+"""按需性能分析：管理员令牌检查、调用栈采样和输出文件"""
+import json
+import os
+import time
+
+import pytest
+
+import config
+import profiling
+
+
+@pytest.fixture
+def profile_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'PROFILE_TOKEN', 'secret-token', raising=False)
+    monkeypatch.setattr(config, 'PROFILE_SAMPLE_RATE', 0.0, raising=False)
+    monkeypatch.setattr(config, 'PROFILE_INTERVAL', 0.001, raising=False)
+    monkeypatch.setattr(config, 'PROFILE_FOLDER', str(tmp_path), raising=False)
+    return tmp_path
+
+
+@pytest.mark.parametrize('token, expected', [
+    (None, False),
+    ('', False),
+    ('wrong', False),
+    ('secret-token', True),
+])
+def test_token_check(profile_config, token, expected):
+    assert profiling.requested(token) is expected
+
+
+def test_empty_admin_token_disables_profiling(profile_config, monkeypatch):
+    monkeypatch.setattr(config, 'PROFILE_TOKEN', '')
+    assert not profiling.requested('')
+    assert not profiling.requested('anything')
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+def test_sampled_call_writes_folded_stacks_and_trace(profile_config):
+    profile = profiling.start('/translate')
+    with profiling.span('work', segments=3):
+        busy_loop(0.1)
+    assert profiling.stop() is profile
+    assert profiling.current() is None
+
+    prefix = os.path.join(str(profile_config), profile.id)
+    with open(f'{prefix}.wall.folded', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines and any('busy_loop (test_profiling.py' in line for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert os.path.exists(f'{prefix}.cpu.folded')
+
+    with open(f'{prefix}.trace.json', encoding='utf-8') as f:
+        trace = json.load(f)
+    spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert [event['name'] for event in spans] == ['work']
+    assert spans[0]['dur'] >= 100000 and spans[0]['args']['segments'] == 3
+    assert any(event['ph'] == 'M' and event['args']['name'] == '/translate' for event in trace['traceEvents'])
+
+
+def test_span_without_profile_records_nothing():
+    assert profiling.current() is None
+    with profiling.span('idle'):
+        pass
+    assert profiling.stop() is None
@@ -0,0 +1,96 @@
+"""共享翻译调度器：优先级、用户轮询和单用户并发上限"""
+import threading
+
+from scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, PRIORITY_SPECULATIVE, TranslationScheduler
+
+TIMEOUT = 5
+
+
+def block_worker(scheduler, tenant='blocker'):
+    """占住一个工作线程，返回释放用的事件"""
+    started, release = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(TIMEOUT)
+
+    future = scheduler.submit(hold, tenant=tenant)
+    assert started.wait(TIMEOUT)
+    return release, future
+
+
+def test_higher_priority_runs_first():
+    scheduler = TranslationScheduler(1)
+    release, blocker = block_worker(scheduler)
+    order = []
+    futures = [
+        scheduler.submit(order.append, 'speculative', priority=PRIORITY_SPECULATIVE),
+        scheduler.submit(order.append, 'bulk', priority=PRIORITY_BULK),
+        scheduler.submit(order.append, 'interactive', priority=PRIORITY_INTERACTIVE),
+    ]
+    release.set()
+    for future in [blocker] + futures:
+        future.result(TIMEOUT)
+    assert order == ['interactive', 'bulk', 'speculative']
+
+
+def test_tenants_are_served_round_robin():
+    scheduler = TranslationScheduler(1)
+    release, blocker = block_worker(scheduler)
+    order = []
+    futures = [scheduler.submit(order.append, f'a{n}', tenant='a') for n in range(3)]
+    futures += [scheduler.submit(order.append, f'b{n}', tenant='b') for n in range(2)]
+    release.set()
+    for future in [blocker] + futures:
+        future.result(TIMEOUT)
+    assert order == ['a0', 'b0', 'a1', 'b1', 'a2']
+
+
+def test_tenant_limit_caps_concurrency():
+    scheduler = TranslationScheduler(4)
+    lock = threading.Lock()
+    running = peak = 0
+    release = threading.Event()
+
+    def task():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        release.wait(0.05)
+        with lock:
+            running -= 1
+
+    futures = [scheduler.submit(task, tenant='a', limit=2) for _ in range(8)]
+    for future in futures:
+        future.result(TIMEOUT)
+    assert peak == 2
+
+
+def test_bulk_limit_does_not_block_own_interactive_requests():
+    scheduler = TranslationScheduler(3)
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def bulk():
+        started.release()
+        release.wait(TIMEOUT)
+
+    bulk_futures = [scheduler.submit(bulk, tenant='a', limit=2) for _ in range(4)]
+    for _ in range(2):
+        assert started.acquire(timeout=TIMEOUT)
+
+    # 批量任务已占满该用户的名额，交互式请求仍可使用空闲的工作线程
+    interactive = scheduler.submit(lambda: 'done', priority=PRIORITY_INTERACTIVE, tenant='a')
+    assert interactive.result(1) == 'done'
+    assert sum(future.running() for future in bulk_futures) == 2
+
+    release.set()
+    for future in bulk_futures:
+        future.result(TIMEOUT)
+
+
+def test_nested_map_in_worker_does_not_deadlock():
+    scheduler = TranslationScheduler(1)
+    outer = scheduler.submit(lambda: scheduler.map(lambda x: x * 2, range(5)))
+    assert outer.result(TIMEOUT) == [0, 2, 4, 6, 8]
@@ -0,0 +1,47 @@
+"""段落模型与文档存储之间的序列化"""
+import pytest
+
+from document_store import DocumentStore
+from segment import Segment
+
+
+def test_to_dict_omits_empty_fields_and_keeps_extra():
+    segment = Segment.from_dict({'id': 'para-0', 'text': 'Hello', 'tag': 'p', 'index': 0, 'source_image': 'a.png'})
+    assert segment.extra == {'source_image': 'a.png'}
+    assert segment.to_dict() == {'id': 'para-0', 'text': 'Hello', 'tag': 'p', 'index': 0, 'source_image': 'a.png'}
+
+
+def test_optional_fields_round_trip():
+    data = {'id': 'para-3', 'text': 'Cell', 'tag': 'td', 'index': 3, 'page': 2, 'is_table': True, 'table': 0,
+            'row': 0, 'col': 0, 'line_start': 4, 'line_count': 2, 'translation': 'セル', 'furniture': True}
+    segment = Segment.from_dict(data)
+    assert (segment.row, segment.col, segment.table, segment.furniture) == (0, 0, 0, True)
+    assert segment.to_dict() == data
+    clone = segment.copy()
+    clone.translation = None
+    assert segment.translation == 'セル'
+
+
+def test_round_trip_through_document_store(tmp_path):
+    pytest.importorskip('bs4')
+    store = DocumentStore(str(tmp_path))
+    segments = [
+        Segment(id='para-0', text='Header', tag='div', index=0, page=1, furniture=True),
+        Segment(id='para-1', text='Body', tag='p', index=1, page=1, line_start=0, line_count=3),
+        Segment(id='para-2', text='Cell', tag='td', index=2, page=1, is_table=True, table=0, row=1, col=0,
+                extra={'source_image': 'scan.png'}),
+    ]
+    html = ''.join(f'<p id="{segment.id}" class="translatable">{segment.text}</p>' for segment in segments)
+    doc_id = store.create('test.pdf', 'pdf', [{'html': html, 'segments': segments}])
+
+    loaded = list(store.iter_segments(doc_id))
+    assert [segment.to_dict() for segment in loaded] == [segment.to_dict() for segment in segments]
+    assert all(isinstance(segment, Segment) for segment in loaded)
+    assert loaded[2].row == 1 and loaded[2].col == 0 and not loaded[1].furniture
+
+    for segment in loaded:
+        segment.translation = f'ja:{segment.text}'
+    store.save_translation(doc_id, 'ja', loaded)
+    translated = store.get_pages(doc_id, 1, 1, 'ja')[0]['segments']
+    assert [segment.to_dict() for segment in translated] == [segment.to_dict() for segment in loaded]
+    assert translated[0].furniture and translated[2].extra == {'source_image': 'scan.png'}
@@ -0,0 +1,43 @@
+"""长段落在句子边界切分"""
+import pytest
+
+from segmenter import Segmenter
+
+
+@pytest.mark.parametrize('text, sentences', [
+    ('First sentence. Second one! Third?', ['First sentence. ', 'Second one! ', 'Third?']),
+    ('Mr. Smith paid 3.5 million U.S. dollars. Then he left.', ['Mr. Smith paid 3.5 million U.S. dollars. ', 'Then he left.']),
+    ('See e.g. the notes. Fine.', ['See e.g. the notes. ', 'Fine.']),
+    ('第一句。第二句！第三句', ['第一句。', '第二句！', '第三句']),
+    ('Line one\nLine two', ['Line one\n', 'Line two']),
+    ('He said "stop." She agreed.', ['He said "stop." ', 'She agreed.']),
+])
+def test_split_sentences(text, sentences):
+    assert Segmenter.split_sentences(text) == sentences
+    assert ''.join(sentences) == text
+
+
+def test_split_respects_limit_and_round_trips():
+    text = ' '.join(f'Sentence number {n} describes the quarterly results in detail.' for n in range(40))
+    chunks = Segmenter.split(text, 100)
+    assert len(chunks) > 1
+    assert all(Segmenter.estimate_tokens(body) <= 100 for body, _ in chunks)
+    assert ''.join(body + separator for body, separator in chunks) == text
+    # 各块大小均衡
+    sizes = [Segmenter.estimate_tokens(body) for body, _ in chunks]
+    assert max(sizes) - min(sizes) < 40
+
+
+def test_oversized_sentence_is_split_at_clauses_then_fixed_length():
+    text = '，'.join(['这是一个很长的分句'] * 30)
+    chunks = Segmenter.split(text, 50)
+    assert all(Segmenter.estimate_tokens(body) <= 50 for body, _ in chunks)
+    assert ''.join(body + separator for body, separator in chunks) == text
+    chunks = Segmenter.split('x' * 1000, 50)
+    assert all(Segmenter.estimate_tokens(body) <= 50 for body, _ in chunks)
+
+
+def test_join_uses_target_language_spacing():
+    assert Segmenter.join(['First.', 'Second.'], [' ', ''], 'en') == 'First. Second.'
+    assert Segmenter.join(['第一。', '第二。'], [' ', ''], 'zh-CN') == '第一。第二。'
+    assert Segmenter.join(['A', 'B'], ['\n\n', ''], 'ja') == 'A\n\nB'
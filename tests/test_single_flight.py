@@ -0,0 +1,79 @@
+"""相同请求合并"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+TIMEOUT = 5
+
+
+def test_concurrent_identical_calls_share_one_result():
+    flight = SingleFlight()
+    calls = []
+    entered, release = threading.Event(), threading.Event()
+
+    def slow():
+        calls.append(1)
+        entered.set()
+        release.wait(TIMEOUT)
+        return 'result'
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, 'key', slow)
+        assert entered.wait(TIMEOUT)
+        followers = [pool.submit(flight.do, 'key', slow) for _ in range(3)]
+        time.sleep(0.2)  # 等后来的调用进入等待
+        assert len(flight) == 1
+        release.set()
+        results = [leader.result(TIMEOUT)] + [future.result(TIMEOUT) for future in followers]
+    assert results == ['result'] * 4
+    assert len(calls) == 1
+    assert len(flight) == 0
+
+
+def test_exception_is_shared_and_next_call_retries():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError('provider error')
+
+    with pytest.raises(RuntimeError):
+        flight.do('key', fail)
+    assert flight.do('key', lambda: 'ok') == 'ok'
+
+
+def test_make_key_separates_contents_and_params():
+    key = SingleFlight.make_key('batch', ['ab', 'c'], 'ja', 'gpt-4o')
+    assert key == SingleFlight.make_key('batch', ['ab', 'c'], 'ja', 'gpt-4o')
+    assert key != SingleFlight.make_key('batch', ['a', 'bc'], 'ja', 'gpt-4o')
+    assert key != SingleFlight.make_key('batch', ['ab', 'c'], 'fr', 'gpt-4o')
+    assert key != SingleFlight.make_key('single', ['ab', 'c'], 'ja', 'gpt-4o')
+
+
+def test_streaming_events_reach_every_waiter():
+    flight = SingleFlight()
+    halfway, release = threading.Event(), threading.Event()
+    leader_events, follower_events = [], []
+
+    def stream(count, publish):
+        for n in range(count):
+            publish(n, f'segment {n}')
+            if n == 1:
+                halfway.set()
+                release.wait(TIMEOUT)
+        return count
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do_streaming, 'key', stream, 4, on_event=lambda *event: leader_events.append(event))
+        assert halfway.wait(TIMEOUT)
+        # 中途加入：先补收已产生的事件，之后实时收到
+        follower = pool.submit(flight.do_streaming, 'key', stream, 4, on_event=lambda *event: follower_events.append(event))
+        while len(follower_events) < 2:
+            time.sleep(0.01)
+        release.set()
+        assert leader.result(TIMEOUT) == follower.result(TIMEOUT) == 4
+    expected = [(n, f'segment {n}') for n in range(4)]
+    assert leader_events == follower_events == expected
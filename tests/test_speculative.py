@@ -0,0 +1,53 @@
+"""上传后的预翻译：结果随文档保存，其他工作进程也能使用"""
+import pytest
+
+import config
+from document_store import DocumentStore
+from segment import Segment
+from speculative import SpeculativeTranslator
+from translator import Translator
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'SPECULATIVE_TRANSLATION', True, raising=False)
+    return DocumentStore(str(tmp_path / 'documents'))
+
+
+def create_document(store, texts):
+    segments = [Segment(id=f'para-{n}', text=text, tag='p', index=n, page=1) for n, text in enumerate(texts)]
+    html = ''.join(f'<p id="{segment.id}" class="translatable">{segment.text}</p>' for segment in segments)
+    return store.create('test.docx', 'word', [{'html': html, 'segments': segments}])
+
+
+def test_pretranslation_is_visible_to_another_worker(store, fake_provider):
+    doc_id = create_document(store, ['Hello', 'World'])
+    SpeculativeTranslator(Translator(), store)._run(doc_id, 'tenant', 'ja', 'gpt-4o')
+
+    # 另一个工作进程：独立的翻译器、文档存储对象和译文缓存
+    other = SpeculativeTranslator(Translator(), DocumentStore(store.root))
+    assert other.load(doc_id, 'ja', 'gpt-4o') == {'Hello': 'ja:Hello', 'World': 'ja:World'}
+    assert other.load(doc_id, 'ja', 'kimi') == {}
+    assert other.load(doc_id, 'fr', 'gpt-4o') == {}
+
+
+def test_known_translations_are_not_requested_again(store, fake_provider):
+    doc_id = create_document(store, ['Hello', 'World'])
+    known = {'Hello': 'ja:Hello'}
+    segments = Translator().translate_batch(list(store.iter_segments(doc_id)), 'ja', known_translations=known)
+    assert [segment.translation for segment in segments] == ['ja:Hello', 'ja:World']
+    assert len(fake_provider.requests) == 1
+    assert 'Hello' not in fake_provider.requests[0]
+
+
+def test_failed_segments_are_not_saved(store, fake_provider):
+    fake_provider.drop.add('World')
+    doc_id = create_document(store, ['Hello', 'World'])
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('provider down')
+
+    translator = Translator()
+    translator._request_text = fail
+    SpeculativeTranslator(translator, store)._run(doc_id, 'tenant', 'ja', 'gpt-4o')
+    assert store.load_pretranslation(doc_id, 'ja', 'gpt-4o') == {'Hello': 'ja:Hello'}
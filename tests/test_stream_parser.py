@@ -0,0 +1,58 @@
+"""紧凑格式流式输出的增量解析"""
+import pytest
+
+pytest.importorskip('requests')
+
+from translator import MULTI_LANG_MARKER_PATTERN, CompactStreamParser
+
+OUTPUT = '[[0]] 第一段\n[[1]] 第二段\n跨行内容\n[[2]] 第三段'
+
+
+def parse(chunks, pattern=None):
+    segments = []
+    parser = CompactStreamParser(lambda key, text: segments.append((key, text)),
+                                 **({'pattern': pattern} if pattern else {}))
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.finish()
+    return segments, parser
+
+
+def test_whole_output():
+    segments, parser = parse([OUTPUT])
+    assert segments == [(0, '第一段'), (1, '第二段\n跨行内容'), (2, '第三段')]
+    assert parser.marker_count == 3
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7])
+def test_markers_split_across_chunks(size):
+    segments, _ = parse([OUTPUT[pos:pos + size] for pos in range(0, len(OUTPUT), size)])
+    assert segments == [(0, '第一段'), (1, '第二段\n跨行内容'), (2, '第三段')]
+
+
+def test_segment_emitted_when_next_marker_arrives():
+    segments = []
+    parser = CompactStreamParser(lambda key, text: segments.append((key, text)))
+    parser.feed('[[0]] 第一')
+    assert segments == []
+    parser.feed('段\n[[1')
+    assert segments == []
+    parser.feed(']] 第二段')
+    assert segments == [(0, '第一段')]
+    parser.finish()
+    assert segments == [(0, '第一段'), (1, '第二段')]
+
+
+def test_duplicate_markers_keep_first_and_code_fence_is_stripped():
+    segments, _ = parse(['```\n[[0]] A\n[[0]] again\n[[1]] B\n```'])
+    assert segments == [(0, 'A'), (1, 'B')]
+
+
+def test_marker_in_middle_of_line_is_text():
+    segments, _ = parse(['[[0]] see [[1]] inline\n[[1]] B'])
+    assert segments == [(0, 'see [[1]] inline'), (1, 'B')]
+
+
+def test_multi_language_markers():
+    segments, _ = parse(['[[0:ja]] 一\n[[0:zh-CN]] 一段\n[[1:ja]] 二'], MULTI_LANG_MARKER_PATTERN)
+    assert segments == [((0, 'ja'), '一'), ((0, 'zh-CN'), '一段'), ((1, 'ja'), '二')]
@@ -0,0 +1,81 @@
+"""批量与多语言翻译：去重、预过滤、超长段落切分、多语言合并请求和逐段补译"""
+import threading
+
+import config
+from segment import Segment
+from translator import COMPACT_MARKER_PATTERN, Translator
+
+
+def segments(*texts):
+    return [Segment(id=f'para-{n}', text=text, index=n) for n, text in enumerate(texts)]
+
+
+def translate_multi(texts, langs, model_config=None, **kwargs):
+    events = []
+    lock = threading.Lock()
+
+    def on_segment(lang, idx, segment):
+        with lock:
+            events.append((lang, idx, segment.translation))
+
+    results = Translator().translate_multi(segments(*texts), langs, model_config=model_config, on_segment=on_segment, **kwargs)
+    translations = {lang: [segment.translation for segment in result] for lang, result in results.items()}
+    return translations, sorted(events)
+
+
+def test_languages_are_packed_into_one_request(fake_provider):
+    translations, events = translate_multi(['Hello', 'World'], ['ja', 'fr', 'de'], {'languages_per_request': 2})
+    assert translations == {
+        'ja': ['ja:Hello', 'ja:World'],
+        'fr': ['fr:Hello', 'fr:World'],
+        'de': ['de:Hello', 'de:World'],
+    }
+    headers = sorted(request.split('\n', 1)[0] for request in fake_provider.requests)
+    assert len(headers) == 2
+    assert any('ja=' in header and 'fr=' in header for header in headers)
+    # 每个段落每种语言恰好回调一次
+    assert len(events) == 6 and len(set((lang, idx) for lang, idx, _ in events)) == 6
+
+
+def test_duplicates_are_requested_once_per_language(fake_provider):
+    translations, events = translate_multi(['Hello', 'World', 'Hello'], ['ja', 'fr'])
+    assert translations['ja'] == ['ja:Hello', 'ja:World', 'ja:Hello']
+    assert translations['fr'] == ['fr:Hello', 'fr:World', 'fr:Hello']
+    for request in fake_provider.requests:
+        assert len(COMPACT_MARKER_PATTERN.findall(request)) == 2
+    assert ('ja', 2, 'ja:Hello') in events
+
+
+def test_prefiltered_segments_pass_through(fake_provider):
+    translations, events = translate_multi(['2024-01-01', 'https://example.com', 'Hello'], ['ja', 'fr'])
+    assert translations['ja'] == ['2024-01-01', 'https://example.com', 'ja:Hello']
+    assert all('example.com' not in request and '2024' not in request for request in fake_provider.requests)
+    assert ('fr', 0, '2024-01-01') in events
+
+
+def test_long_segments_are_split_and_rejoined(fake_provider, monkeypatch):
+    monkeypatch.setattr(config, 'SEGMENT_SPLIT_TOKENS', 20, raising=False)
+    long_text = ' '.join(f'Sentence number {n} is here.' for n in range(8))
+    translations, _ = translate_multi([long_text, 'Short'], ['fr'])
+    chunks = translations['fr'][0].split('fr:')[1:]
+    assert len(chunks) > 1
+    assert ' '.join(chunk.strip() for chunk in chunks) == long_text
+    assert translations['fr'][1] == 'fr:Short'
+    batch_requests = [request for request in fake_provider.requests if COMPACT_MARKER_PATTERN.search(request)]
+    assert len(batch_requests) == 1 and 'Sentence' not in batch_requests[0]
+
+
+def test_missing_markers_fall_back_to_single_segments(fake_provider):
+    fake_provider.drop.add('World')
+    translations, events = translate_multi(['Hello', 'World'], ['ja', 'fr'], {'languages_per_request': 2})
+    assert translations == {'ja': ['ja:Hello', 'ja:World'], 'fr': ['fr:Hello', 'fr:World']}
+    # 一个多语言请求，缺失的段落每种语言一个单段请求
+    assert len(fake_provider.requests) == 3
+    assert len(events) == 4
+
+
+def test_translate_batch_falls_back_for_missing_segment(fake_provider):
+    fake_provider.drop.add('World')
+    result = Translator().translate_batch(segments('Hello', 'World', 'Again'), 'ja')
+    assert [segment.translation for segment in result] == ['ja:Hello', 'ja:World', 'ja:Again']
+    assert len(fake_provider.requests) == 2
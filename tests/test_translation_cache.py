@@ -0,0 +1,32 @@
+"""进程内译文缓存"""
+from translation_cache import TranslationCache
+
+
+def test_get_and_put_are_keyed_by_language_and_model():
+    cache = TranslationCache(10)
+    cache.put('Hello', 'ja', 'auto', 'gpt-4o', 'こんにちは')
+    assert cache.get('Hello', 'ja', 'auto', 'gpt-4o') == 'こんにちは'
+    assert cache.get('Hello', 'zh-CN', 'auto', 'gpt-4o') is None
+    assert cache.get('Hello', 'ja', 'en', 'gpt-4o') is None
+    assert cache.get('Hello', 'ja', 'auto', 'kimi') is None
+    assert cache.get('hello', 'ja', 'auto', 'gpt-4o') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TranslationCache(2)
+    cache.put('a', 'ja', 'auto', 'm', 'A')
+    cache.put('b', 'ja', 'auto', 'm', 'B')
+    assert cache.get('a', 'ja', 'auto', 'm') == 'A'  # a 变为最近使用
+    cache.put('c', 'ja', 'auto', 'm', 'C')
+    assert len(cache) == 2
+    assert cache.get('b', 'ja', 'auto', 'm') is None
+    assert cache.get('a', 'ja', 'auto', 'm') == 'A'
+    assert cache.get('c', 'ja', 'auto', 'm') == 'C'
+
+
+def test_disabled_cache_stores_nothing():
+    cache = TranslationCache(0)
+    assert not cache.enabled
+    cache.put('a', 'ja', 'auto', 'm', 'A')
+    assert cache.get('a', 'ja', 'auto', 'm') is None
+    assert len(cache) == 0
@@ -0,0 +1,69 @@
+"""批量翻译报文：紧凑格式的请求构建和返回解析，以及JSON格式"""
+import json
+
+import pytest
+
+pytest.importorskip('requests')
+
+from translator import COMPACT_BATCH_INSTRUCTIONS, CompactStreamParser, Translator
+
+
+@pytest.fixture
+def translator():
+    return Translator()
+
+
+def test_compact_messages(translator):
+    messages = translator.build_batch_messages(['Hello', 'Two\nlines'], 'ja', 'en')
+    assert messages[0] == {'role': 'system', 'content': COMPACT_BATCH_INSTRUCTIONS}
+    lines = messages[1]['content'].split('\n')
+    assert lines[0].startswith('目标语言：') and lines[1].startswith('源语言：')
+    assert lines[2:] == ['[[0]]Hello', '[[1]]Two', 'lines']
+    # 固定指令与批次内容无关（可命中服务端前缀缓存）
+    assert translator.build_batch_messages(['Other'], 'fr')[0] == messages[0]
+
+
+def test_json_messages(translator):
+    messages = translator.build_batch_messages(['Hello'], 'ja', wire_format='json')
+    assert len(messages) == 1
+    assert '"index": 0' in messages[0]['content'] and '"text": "Hello"' in messages[0]['content']
+
+
+def test_decode_compact(translator):
+    text = '前言\n[[1]] B\n[[0]] A\n第二行\n[[1]] again\n[[5]] out of range'
+    assert translator.decode_batch_response(text, 3) == ['A\n第二行', 'B', None]
+
+
+def test_decode_compact_in_code_fence(translator):
+    assert translator.decode_batch_response('```\n[[0]] A\n[[1]] B\n```', 2) == ['A', 'B']
+
+
+def test_decode_compact_without_markers_fails(translator):
+    with pytest.raises(Exception):
+        translator.decode_batch_response('Just some text', 2)
+
+
+def test_decode_json(translator):
+    data = [{'index': 1, 'translation': 'B'}, {'index': 0, 'translation': 'A'}]
+    assert translator.decode_batch_response(json.dumps(data), 2, 'json') == ['A', 'B']
+    assert translator.decode_batch_response('```json\n' + json.dumps(data) + '\n```', 2, 'json') == ['A', 'B']
+
+
+def test_stream_parser_ignores_text_before_first_marker_and_reports_missing_indices():
+    segments = {}
+    parser = CompactStreamParser(segments.__setitem__)
+    for chunk in ['好的，以下是译文：\n[[', '0]] A\n[[2]] C']:
+        parser.feed(chunk)
+    parser.finish()
+    assert segments == {0: 'A', 2: 'C'}
+    assert parser.marker_count == 2
+
+
+def test_batch_request_fills_missing_index_and_falls_back_to_json_format(fake_provider, translator, monkeypatch):
+    fake_provider.drop.add('World')
+    assert translator.translate_batch_optimized(['Hello', 'World'], 'ja') == ['ja:Hello', 'ja:World']
+
+    # JSON格式按模型配置使用（不走流式解析）
+    monkeypatch.setattr(Translator, '_chat_completion',
+                        lambda self, api_base, payload, *args, **kwargs: json.dumps([{'index': 0, 'translation': 'J'}]))
+    assert translator.translate_batch_optimized(['Hello'], 'ja', model_config={'wire_format': 'json'}) == ['J']
@@ -0,0 +1,74 @@
+"""
+译文缓存模块 - 进程内共享的段落译文缓存
+
+按（原文、目标语言、源语言、模型）缓存单段译文，同一段落重复翻译（重试、多人翻译同一文档）不再调用API。
+缓存只在本进程内有效，多进程部署时预翻译结果另存于文档存储。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import config
+
+
+class TranslationCache:
+    """线程安全的LRU译文缓存"""
+
+    def __init__(self, max_entries: int):
+        """
+        Args:
+            max_entries: 最多缓存的段落数，超出时淘汰最久未使用的条目
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, text: str, target_lang: str, source_lang: str, model_key: str) -> Optional[str]:
+        """查询译文，未命中返回None"""
+        if not self.enabled:
+            return None
+        key = self._make_key(text, target_lang, source_lang, model_key)
+        with self._lock:
+            translation = self._entries.get(key)
+            if translation is not None:
+                self._entries.move_to_end(key)
+            return translation
+
+    def put(self, text: str, target_lang: str, source_lang: str, model_key: str, translation: str):
+        """写入译文"""
+        if not self.enabled:
+            return
+        key = self._make_key(text, target_lang, source_lang, model_key)
+        with self._lock:
+            self._entries[key] = translation
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _make_key(text: str, target_lang: str, source_lang: str, model_key: str) -> tuple:
+        # 原文取摘要，长段落不会在缓存中保存两份
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return digest, target_lang, source_lang, model_key
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> TranslationCache:
+    """获取进程级共享译文缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TranslationCache(getattr(config, 'TRANSLATION_CACHE_SIZE', 50000))
+    return _cache
@@ -2,10 +2,99 @@
 翻译服务模块 - 调用AI API进行翻译
 """
 import requests
-from typing import List, Dict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict
+from concurrent.futures import as_completed
 import config
 import json
+import re
+import threading
+from prefilter import PreFilter
+from segment import Segment
+from scheduler import get_scheduler, PRIORITY_BULK
+from translation_cache import get_translation_cache
+from single_flight import SingleFlight
+from segmenter import Segmenter
+import profiling
+
+# 紧凑批量格式的固定指令（作为system消息，各批次完全相同，可命中服务端前缀缓存）
+COMPACT_BATCH_INSTRUCTIONS = """你是专业翻译引擎。用户消息第一行给出目标语言，随后是若干段原文，每段以 [[编号]] 开头。
+翻译要求：
+1. 逐段翻译成目标语言，严格保持每段的格式和换行
+2. 保留专业术语、变量名、技术名词（如：ROA、GDP、crash_w、adj_ret等）
+3. 对于专业术语，可在首次出现时使用"术语(translation)"格式，之后保持原文
+4. 输出时每段译文以相同的 [[编号]] 开头，按原顺序输出，段数与原文一致
+5. 只输出编号和译文，不要添加任何其他文字"""
+
+# 匹配行首的段落编号，如 [[3]]
+COMPACT_MARKER_PATTERN = re.compile(r'^\[\[(\d+)\]\][ \t]*', re.MULTILINE)
+
+# 一个请求同时翻译多种语言时的固定指令
+MULTI_LANG_BATCH_INSTRUCTIONS = """你是专业翻译引擎。用户消息第一行给出若干目标语言（语言代码=语言名称），随后是若干段原文，每段以 [[编号]] 开头。
+翻译要求：
+1. 把每段分别翻译成每种目标语言，严格保持每段的格式和换行
+2. 保留专业术语、变量名、技术名词（如：ROA、GDP、crash_w、adj_ret等）
+3. 对于专业术语，可在首次出现时使用"术语(translation)"格式，之后保持原文
+4. 每段译文以 [[编号:语言代码]] 开头（如 [[0:en]]），按原文顺序输出，每段依次输出各目标语言的译文
+5. 只输出编号和译文，不要添加任何其他文字"""
+
+# 匹配行首的段落编号和语言，如 [[3:en]]
+MULTI_LANG_MARKER_PATTERN = re.compile(r'^\[\[(\d+):([A-Za-z-]+)\]\][ \t]*', re.MULTILINE)
+
+# 长段落分块翻译时，每块附带的相邻块上下文长度（字符）
+SPLIT_CONTEXT_CHARS = 200
+
+class CompactStreamParser:
+    """
+    增量解析紧凑格式的流式输出
+    
+    每段译文以 [[编号]]（多语言请求为 [[编号:语言代码]]）开头，出现下一个编号时上一段即已完整，立即回调
+    """
+    
+    def __init__(self, on_segment: Callable, pattern=COMPACT_MARKER_PATTERN):
+        """
+        Args:
+            on_segment: 每段完成时的回调 (编号, 译文)；多语言格式的编号为 (段落序号, 语言代码)
+            pattern: 段落编号的正则
+        """
+        self.on_segment = on_segment
+        self.pattern = pattern
+        self.marker_count = 0
+        self._buffer = ''
+        self._scan_pos = 0  # 下次查找编号的起始位置
+        self._current = None  # 正在接收的段落：(编号, 译文起始位置)
+        self._seen = set()
+    
+    def feed(self, text: str):
+        """接收一个增量片段"""
+        self._buffer += text
+        for marker in self.pattern.finditer(self._buffer, self._scan_pos):
+            self._close(marker.start())
+            groups = marker.groups()
+            key = int(groups[0]) if len(groups) == 1 else (int(groups[0]), groups[1])
+            self._current = (key, marker.end())
+            self._scan_pos = marker.end()
+            self.marker_count += 1
+        # 最后一行可能是还没收完的编号，从该行行首继续查找
+        self._scan_pos = max(self._scan_pos, self._buffer.rfind('\n') + 1)
+    
+    def finish(self):
+        """输出结束，最后一段即已完整"""
+        self._close(len(self._buffer))
+        self._current = None
+    
+    def _close(self, end: int):
+        if self._current is None:
+            return
+        key, start = self._current
+        translation = self._buffer[start:end].strip()
+        # 去掉结尾的markdown代码块标记
+        if translation.endswith('```'):
+            translation = translation[:-3].rstrip()
+        # 重复的编号以第一次出现的为准
+        if key not in self._seen:
+            self._seen.add(key)
+            self.on_segment(key, translation)
+
 
 class Translator:
     """AI翻译服务"""
@@ -14,6 +103,8 @@ class Translator:
         self.api_base_url = config.API_BASE_URL
         self.api_key = config.API_KEY
         self.model = config.MODEL
+        # 正在进行的API调用，相同的请求（内容、语言、模型）合并为一次调用
+        self._in_flight = SingleFlight()
     
     def translate_text(self, text: str, target_lang: str = 'zh-CN', source_lang: str = 'auto', model_config: dict = None) -> str:
         """
@@ -27,6 +118,42 @@ class Translator:
         Returns:
             翻译后的文本
         """
+        # 本地预过滤：数字、网址、已是目标语言等内容无需调用API
+        if self._prefilter_enabled():
+            if PreFilter.should_skip(text, target_lang):
+                return text
+            source_lang = PreFilter.resolve_source_lang([text], source_lang)
+        
+        # 超长段落在句子边界切分，分块并发翻译
+        split_tokens = self._split_tokens()
+        if split_tokens and Segmenter.estimate_tokens(text) > split_tokens:
+            return self._translate_long_text(text, target_lang, source_lang, model_config, split_tokens)
+        
+        key = SingleFlight.make_key('text', [text], target_lang, source_lang, self._model_key(model_config))
+        return self._in_flight.do(key, self._request_text, text, target_lang, source_lang, model_config)
+    
+    def _translate_long_text(self, text: str, target_lang: str, source_lang: str, model_config: dict, split_tokens: int) -> str:
+        """
+        切分超长段落，各块带上相邻块的原文作为上下文并发翻译，再按顺序拼接
+        """
+        chunks = Segmenter.split(text, split_tokens)
+        model_key = self._model_key(model_config)
+        
+        def translate_chunk(idx):
+            chunk = chunks[idx][0]
+            context_before = chunks[idx - 1][0][-SPLIT_CONTEXT_CHARS:] if idx > 0 else ''
+            context_after = chunks[idx + 1][0][:SPLIT_CONTEXT_CHARS] if idx + 1 < len(chunks) else ''
+            key = SingleFlight.make_key('text', [chunk, context_before, context_after], target_lang, source_lang, model_key)
+            return self._in_flight.do(key, self._request_text, chunk, target_lang, source_lang, model_config,
+                                      context_before, context_after)
+        
+        with profiling.span('translate.split', chunks=len(chunks)):
+            translations = get_scheduler().map(translate_chunk, range(len(chunks)))
+        return Segmenter.join(translations, [separator for _, separator in chunks], target_lang)
+    
+    def _request_text(self, text: str, target_lang: str, source_lang: str, model_config: dict = None,
+                      context_before: str = '', context_after: str = '') -> str:
+        """调用API翻译单段文本（context_before/context_after 为仅供参考的相邻原文）"""
         try:
             # 使用传入的模型配置，或使用默认配置
             if model_config is None:
@@ -39,6 +166,16 @@ class Translator:
             # 构建翻译提示
             lang_name = config.LANGUAGES.get(target_lang, '中文')
             
+            # 长段落分块翻译时附带上下文，保证术语和指代前后一致
+            context = ''
+            if context_before or context_after:
+                context = "以下原文是一个长段落中的一部分，上下文仅供理解，不要翻译上下文，只翻译原文部分。\n"
+                if context_before:
+                    context += f"上文：\n{context_before}\n"
+                if context_after:
+                    context += f"下文：\n{context_after}\n"
+                context += "\n"
+            
             if source_lang == 'auto':
                 prompt = f"""请将以下内容翻译成{lang_name}。
 翻译要求：
@@ -49,7 +186,7 @@ class Translator:
 5. 只返回翻译结果，不要添加任何解释或注释
 6. 如果原文有多个段落，译文也要保持相同的段落数量
 
-原文：
+{context}原文：
 {text}"""
             else:
                 source_lang_name = config.LANGUAGES.get(source_lang, '')
@@ -62,15 +199,10 @@ class Translator:
 5. 只返回翻译结果，不要添加任何解释或注释
 6. 如果原文有多个段落，译文也要保持相同的段落数量
 
-原文：
+{context}原文：
 {text}"""
             
             # 调用API
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
             payload = {
                 'model': model,
                 'messages': [
@@ -82,24 +214,14 @@ class Translator:
                 'temperature': 0.3
             }
             
-            response = requests.post(
-                f'{api_base}/v1/chat/completions',
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                translation = result['choices'][0]['message']['content'].strip()
-                return translation
-            else:
-                raise Exception(f"API请求失败: {response.status_code} - {response.text}")
+            with profiling.span('provider.request', kind='text', model=model):
+                return self._chat_completion(api_base, payload, model_config, timeout=30).strip()
                 
         except Exception as e:
             raise Exception(f"翻译错误: {str(e)}")
     
-    def translate_batch_optimized(self, texts_batch: List[str], target_lang: str = 'zh-CN', source_lang: str = 'auto', model_config: dict = None) -> List[str]:
+    def translate_batch_optimized(self, texts_batch: List[str], target_lang: str = 'zh-CN', source_lang: str = 'auto', model_config: dict = None,
+                                  on_segment: Callable[[int, str], None] = None) -> List[str]:
         """
         批量翻译多段文本（一次API请求）
         
@@ -107,10 +229,20 @@ class Translator:
             texts_batch: 文本列表（10-20段）
             target_lang: 目标语言
             source_lang: 源语言
+            on_segment: 每段译文完成时的回调 (段落序号, 译文)；流式输出时在整批完成前即被调用
         
         Returns:
             翻译结果列表
         """
+        key = SingleFlight.make_key('batch', texts_batch, target_lang, source_lang, self._model_key(model_config))
+        # 加入进行中的相同批次时同样逐段收到译文（已完成的段落先补发）
+        return list(self._in_flight.do_streaming(key, self._request_batch, texts_batch, target_lang, source_lang, model_config,
+                                                 on_event=on_segment))
+    
+    def _request_batch(self, texts_batch: List[str], target_lang: str, source_lang: str, model_config: dict = None,
+                       on_segment: Callable[[int, str], None] = None) -> List[str]:
+        """调用API批量翻译（中途失败时已完成的段落保留，其余逐段翻译）"""
+        translations = [None] * len(texts_batch)
         try:
             # 使用传入的模型配置，或使用默认配置
             if model_config is None:
@@ -120,8 +252,229 @@ class Translator:
                 api_base = model_config.get('base_url', self.api_base_url)
                 model = model_config.get('model', self.model)
             
-            lang_name = config.LANGUAGES.get(target_lang, '中文')
+            wire_format = self._get_wire_format(model_config)
+            messages = self.build_batch_messages(texts_batch, target_lang, source_lang, wire_format)
+            
+            payload = {
+                'model': model,
+                'messages': messages,
+                'temperature': 0.3
+            }
             
+            with profiling.span('provider.request', kind='batch', model=model, segments=len(texts_batch)):
+                if wire_format == 'compact' and self._stream_enabled(model_config):
+                    # 流式输出：下一段编号出现时上一段即已完整，立即回调
+                    def store(idx, translation):
+                        if idx < len(translations):
+                            translations[idx] = translation
+                            if on_segment:
+                                on_segment(idx, translation)
+                    
+                    parser = CompactStreamParser(store)
+                    self._chat_completion(api_base, payload, model_config, timeout=60, on_text=parser.feed)
+                    parser.finish()
+                else:
+                    translation_text = self._chat_completion(api_base, payload, model_config, timeout=60).strip()
+                    with profiling.span('translate.decode', segments=len(texts_batch)):
+                        decoded = self.decode_batch_response(translation_text, len(texts_batch), wire_format)
+                    for idx, translation in enumerate(decoded[:len(texts_batch)]):
+                        translations[idx] = translation
+                        if on_segment and translation is not None:
+                            on_segment(idx, translation)
+            
+            if all(translation is None for translation in translations):
+                raise Exception("批量翻译结果中没有段落编号")
+                
+        except Exception as e:
+            # 批量翻译失败（或流式输出中途超时），未完成的段落降级为逐段翻译
+            print(f"批量翻译失败，未完成的段落逐段翻译: {str(e)}")
+        
+        # 缺失的段落逐段补译
+        for idx, translation in enumerate(translations):
+            if translation is None:
+                try:
+                    translations[idx] = self.translate_text(texts_batch[idx], target_lang, source_lang, model_config)
+                except Exception:
+                    translations[idx] = "[翻译失败]"
+                if on_segment:
+                    on_segment(idx, translations[idx])
+        
+        return translations
+    
+    def translate_batch_multi_optimized(self, texts_batch: List[str], target_langs: List[str], source_lang: str = 'auto', model_config: dict = None,
+                                        on_segment: Callable[[int, str, str], None] = None) -> Dict[str, List[str]]:
+        """
+        一次API请求把多段文本同时翻译成多种语言
+        
+        Args:
+            texts_batch: 文本列表
+            target_langs: 目标语言列表
+            on_segment: 每段译文完成时的回调 (段落序号, 目标语言, 译文)
+        
+        Returns:
+            {目标语言: 翻译结果列表}
+        """
+        key = SingleFlight.make_key('multi', texts_batch, tuple(target_langs), source_lang, self._model_key(model_config))
+        results = self._in_flight.do_streaming(key, self._request_multi_batch, texts_batch, target_langs, source_lang, model_config,
+                                               on_event=on_segment)
+        return {lang: list(translations) for lang, translations in results.items()}
+    
+    def _request_multi_batch(self, texts_batch: List[str], target_langs: List[str], source_lang: str, model_config: dict = None,
+                             on_segment: Callable[[int, str, str], None] = None) -> Dict[str, List[str]]:
+        """调用API同时翻译成多种语言（缺失或失败的段落逐段逐语言翻译）"""
+        results = {lang: [None] * len(texts_batch) for lang in target_langs}
+        try:
+            # 使用传入的模型配置，或使用默认配置
+            if model_config is None:
+                api_base = self.api_base_url
+                model = self.model
+            else:
+                api_base = model_config.get('base_url', self.api_base_url)
+                model = model_config.get('model', self.model)
+            
+            payload = {
+                'model': model,
+                'messages': self.build_multi_batch_messages(texts_batch, target_langs, source_lang),
+                'temperature': 0.3
+            }
+            
+            def store(key, translation):
+                idx, lang = key
+                if lang in results and idx < len(texts_batch):
+                    results[lang][idx] = translation
+                    if on_segment:
+                        on_segment(idx, lang, translation)
+            
+            parser = CompactStreamParser(store, MULTI_LANG_MARKER_PATTERN)
+            with profiling.span('provider.request', kind='multi', model=model, segments=len(texts_batch), languages=len(target_langs)):
+                # 输出长度随语言数增加，非流式时相应延长超时
+                self._chat_completion(api_base, payload, model_config, timeout=60 * len(target_langs), on_text=parser.feed)
+                parser.finish()
+            
+            if parser.marker_count == 0:
+                raise Exception("批量翻译结果中没有段落编号")
+                
+        except Exception as e:
+            print(f"多语言批量翻译失败，未完成的段落逐段翻译: {str(e)}")
+        
+        for lang, translations in results.items():
+            for idx, translation in enumerate(translations):
+                if translation is None:
+                    try:
+                        translations[idx] = self.translate_text(texts_batch[idx], lang, source_lang, model_config)
+                    except Exception:
+                        translations[idx] = "[翻译失败]"
+                    if on_segment:
+                        on_segment(idx, lang, translations[idx])
+        
+        return results
+    
+    def _chat_completion(self, api_base: str, payload: Dict, model_config: dict = None, timeout: int = 60,
+                         on_text: Callable[[str], None] = None) -> str:
+        """
+        调用 chat/completions 并返回完整输出
+        
+        启用流式输出时按SSE逐块接收，on_text 收到每个增量片段；超时为两次收到数据之间的最长间隔，
+        生成时间再长也不会因总时长超时。未启用时为普通请求，timeout 为总超时。
+        """
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        
+        if not self._stream_enabled(model_config):
+            response = requests.post(
+                f'{api_base}/v1/chat/completions',
+                headers=headers,
+                json=payload,
+                timeout=timeout
+            )
+            if response.status_code != 200:
+                raise Exception(f"API请求失败: {response.status_code} - {response.text}")
+            content = response.json()['choices'][0]['message']['content']
+            if on_text:
+                on_text(content)
+            return content
+        
+        inactivity_timeout = getattr(config, 'STREAM_INACTIVITY_TIMEOUT', 30)
+        with requests.post(
+            f'{api_base}/v1/chat/completions',
+            headers=headers,
+            json=dict(payload, stream=True),
+            timeout=(10, inactivity_timeout),  # (连接超时, 两次收到数据之间的最长间隔)
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                raise Exception(f"API请求失败: {response.status_code} - {response.text}")
+            
+            parts = []
+            # chunk_size=None：收到多少处理多少，不等凑满缓冲区；SSE规定为UTF-8，不依赖响应头的编码
+            for line in response.iter_lines(chunk_size=None):
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[5:].decode('utf-8').strip()
+                if data == '[DONE]':
+                    break
+                choices = json.loads(data).get('choices') or [{}]
+                delta = (choices[0].get('delta') or {}).get('content')
+                if delta:
+                    parts.append(delta)
+                    if on_text:
+                        on_text(delta)
+            return ''.join(parts)
+    
+    def _prefilter_enabled(self) -> bool:
+        """是否启用本地预过滤"""
+        return getattr(config, 'PREFILTER_ENABLED', True)
+    
+    def _stream_enabled(self, model_config: dict = None) -> bool:
+        """是否使用流式输出：模型配置优先，其次全局配置"""
+        default = getattr(config, 'STREAM_COMPLETIONS', True)
+        if model_config is None:
+            return default
+        return model_config.get('stream', default)
+    
+    def _languages_per_request(self, model_config: dict = None) -> int:
+        """多语言翻译时一个请求同时翻译的语言数：模型配置优先，其次全局配置；仅紧凑格式支持"""
+        if self._get_wire_format(model_config) != 'compact':
+            return 1
+        default = getattr(config, 'LANGUAGES_PER_REQUEST', 1)
+        count = model_config.get('languages_per_request', default) if model_config else default
+        return max(1, int(count))
+    
+    def _split_tokens(self) -> int:
+        """超过该token数的段落切分后翻译（0表示不切分）"""
+        return getattr(config, 'SEGMENT_SPLIT_TOKENS', 600)
+    
+    def _model_key(self, model_config: dict = None) -> str:
+        """模型标识（译文缓存按模型区分）"""
+        if model_config is None:
+            return f'{self.api_base_url}|{self.model}'
+        return f"{model_config.get('base_url', self.api_base_url)}|{model_config.get('model', self.model)}"
+    
+    def _get_wire_format(self, model_config: dict = None) -> str:
+        """获取批量翻译的报文格式：模型配置优先，其次全局配置"""
+        default_format = getattr(config, 'BATCH_WIRE_FORMAT', 'compact')
+        if model_config is None:
+            return default_format
+        return model_config.get('wire_format', default_format)
+    
+    def build_batch_messages(self, texts_batch: List[str], target_lang: str = 'zh-CN', source_lang: str = 'auto', wire_format: str = 'compact') -> List[Dict]:
+        """
+        构建批量翻译请求的messages
+        
+        Args:
+            texts_batch: 文本列表
+            target_lang: 目标语言
+            source_lang: 源语言
+            wire_format: compact（编号分隔，固定指令放在system消息中便于服务端前缀缓存）或 json（旧格式）
+        
+        Returns:
+            messages列表
+        """
+        lang_name = config.LANGUAGES.get(target_lang, '中文')
+        
+        if wire_format == 'json':
             # 构建批量翻译提示
             # 使用JSON格式确保段落对应关系
             texts_json = []
@@ -141,145 +494,305 @@ class Translator:
 {json.dumps(texts_json, ensure_ascii=False, indent=2)}
 
 请返回翻译后的JSON数组："""
-
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            payload = {
-                'model': model,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ],
-                'temperature': 0.3
-            }
-            
-            response = requests.post(
-                f'{api_base}/v1/chat/completions',
-                headers=headers,
-                json=payload,
-                timeout=60  # 批量翻译需要更长超时
-            )
+            return [{'role': 'user', 'content': prompt}]
+        
+        # 紧凑格式：每段以 [[编号]] 开头，语言等可变信息放在user消息
+        header = f"目标语言：{lang_name}"
+        if source_lang != 'auto':
+            header += f"\n源语言：{config.LANGUAGES.get(source_lang, source_lang)}"
+        body = '\n'.join(f'[[{idx}]]{text}' for idx, text in enumerate(texts_batch))
+        return [
+            {'role': 'system', 'content': COMPACT_BATCH_INSTRUCTIONS},
+            {'role': 'user', 'content': f'{header}\n{body}'}
+        ]
+    
+    def build_multi_batch_messages(self, texts_batch: List[str], target_langs: List[str], source_lang: str = 'auto') -> List[Dict]:
+        """构建同时翻译成多种语言的请求messages（紧凑格式，输出以 [[编号:语言代码]] 分隔）"""
+        header = "目标语言：" + "；".join(f"{lang}={config.LANGUAGES.get(lang, lang)}" for lang in target_langs)
+        if source_lang != 'auto':
+            header += f"\n源语言：{config.LANGUAGES.get(source_lang, source_lang)}"
+        body = '\n'.join(f'[[{idx}]]{text}' for idx, text in enumerate(texts_batch))
+        return [
+            {'role': 'system', 'content': MULTI_LANG_BATCH_INSTRUCTIONS},
+            {'role': 'user', 'content': f'{header}\n{body}'}
+        ]
+    
+    def decode_batch_response(self, translation_text: str, expected_count: int, wire_format: str = 'compact') -> List:
+        """
+        解析批量翻译的返回内容
+        
+        Returns:
+            与原文顺序一致的译文列表，紧凑格式下缺失的段落为None
+        """
+        # 移除markdown代码块
+        if translation_text.startswith('```'):
+            translation_text = translation_text.split('```')[1]
+            if translation_text.startswith('json'):
+                translation_text = translation_text[4:]
+            translation_text = translation_text.strip()
+        
+        if wire_format == 'json':
+            translations_data = json.loads(translation_text)
             
-            if response.status_code == 200:
-                result = response.json()
-                translation_text = result['choices'][0]['message']['content'].strip()
-                
-                # 解析JSON响应
-                # 尝试提取JSON数组
-                if translation_text.startswith('```'):
-                    # 移除markdown代码块
-                    translation_text = translation_text.split('```')[1]
-                    if translation_text.startswith('json'):
-                        translation_text = translation_text[4:]
-                    translation_text = translation_text.strip()
-                
-                translations_data = json.loads(translation_text)
-                
-                # 按index排序并提取翻译
-                translations_data.sort(key=lambda x: x.get('index', 0))
-                translations = [item.get('translation', '') for item in translations_data]
-                
-                return translations
-            else:
-                raise Exception(f"API请求失败: {response.status_code}")
-                
-        except Exception as e:
-            # 批量翻译失败，降级为逐段翻译
-            print(f"批量翻译失败，降级为逐段: {str(e)}")
-            translations = []
-            for text in texts_batch:
-                try:
-                    trans = self.translate_text(text, target_lang, source_lang, model_config)
-                    translations.append(trans)
-                except:
-                    translations.append(f"[翻译失败]")
-            return translations
+            # 按index排序并提取翻译
+            translations_data.sort(key=lambda x: x.get('index', 0))
+            return [item.get('translation', '') for item in translations_data]
+        
+        translations = [None] * expected_count
+        markers = list(COMPACT_MARKER_PATTERN.finditer(translation_text))
+        if not markers:
+            raise Exception("批量翻译结果中没有段落编号")
+        
+        for pos, marker in enumerate(markers):
+            idx = int(marker.group(1))
+            end = markers[pos + 1].start() if pos + 1 < len(markers) else len(translation_text)
+            if idx < expected_count and translations[idx] is None:
+                translations[idx] = translation_text[marker.end():end].strip()
+        
+        return translations
     
-    def translate_batch(self, texts: List[Dict], target_lang: str = 'zh-CN', source_lang: str = 'auto', batch_size: int = 15, max_workers: int = 3, model_config: dict = None) -> List[Dict]:
+    def translate_batch(self, texts: List[Segment], target_lang: str = 'zh-CN', source_lang: str = 'auto', batch_size: int = 15, max_workers: int = 3, model_config: dict = None, tenant: str = None, priority: int = PRIORITY_BULK,
+                        on_segment: Callable[[Segment], None] = None, known_translations: Dict[str, str] = None) -> List[Segment]:
         """
-        批量翻译文本（使用线程池并发 + 分批处理）
+        批量翻译文本（使用共享调度器并发 + 分批处理）
         
         Args:
-            texts: 文本列表，每项包含原文信息
+            texts: 段落列表（Segment，也接受段落dict）
             target_lang: 目标语言
             source_lang: 源语言
             batch_size: 每批处理的段落数（默认15段）
-            max_workers: 最大线程数（默认3个并发）
+            max_workers: 该用户的最大并发批次数（默认3个并发，同时受全局上限约束）
+            tenant: 用户标识，调度器在不同用户之间轮询
+            priority: 调度优先级（上传后的预翻译使用 PRIORITY_SPECULATIVE）
+            on_segment: 每个段落译文完成时的回调（在调度器工作线程中调用，应尽快返回）
+            known_translations: 已有的译文（原文 -> 译文，如预翻译保存的结果），这些段落不再调用API
         
         Returns:
-            包含翻译结果的列表
+            段落列表，译文写入每个段落的 translation
+        """
+        # 统一为紧凑段落对象，译文直接写入段落（不再逐段复制dict）
+        segments = [Segment.coerce(item) for item in texts]
+        self._translate_targets({target_lang: segments}, source_lang, batch_size, max_workers, model_config, tenant, priority,
+                                (lambda lang, idx, segment: on_segment(segment)) if on_segment else None,
+                                {target_lang: known_translations} if known_translations else None)
+        return segments
+    
+    def translate_multi(self, texts: List[Segment], target_langs: List[str], source_lang: str = 'auto', batch_size: int = 15, max_workers: int = 3, model_config: dict = None, tenant: str = None, priority: int = PRIORITY_BULK,
+                        on_segment: Callable[[str, int, Segment], None] = None) -> Dict[str, List[Segment]]:
+        """
+        把同一组段落一次翻译成多种语言
+        
+        源语言检测、预过滤、去重、超长段落切分和分批只做一次，所有 (批次 × 语言) 任务在共享调度器中并发；
+        模型配置了 languages_per_request 时一个请求同时翻译多种语言。
+        
+        Args:
+            texts: 段落列表（Segment，也接受段落dict）
+            target_langs: 目标语言列表
+            on_segment: 每个段落译文完成时的回调 (目标语言, 段落序号, 段落)
+            其余参数同 translate_batch
+        
+        Returns:
+            {目标语言: 段落列表}，每种语言一份段落副本
+        """
+        segments = [Segment.coerce(item) for item in texts]
+        targets = {lang: [segment.copy() for segment in segments] for lang in dict.fromkeys(target_langs)}
+        if targets:
+            self._translate_targets(targets, source_lang, batch_size, max_workers, model_config, tenant, priority, on_segment)
+        return targets
+    
+    def _translate_targets(self, targets: Dict[str, List[Segment]], source_lang: str, batch_size: int, max_workers: int, model_config: dict,
+                           tenant: str, priority: int, on_segment: Callable[[str, int, Segment], None] = None,
+                           known: Dict[str, Dict[str, str]] = None):
         """
+        翻译到一种或多种目标语言，译文写入各语言的段落列表
+        
+        Args:
+            targets: {目标语言: 段落列表}，各列表的原文相同
+            known: {目标语言: {原文: 译文}}，已有的译文直接使用
+        """
+        langs = list(targets)
+        texts = [segment.text for segment in targets[langs[0]]]
         total = len(texts)
-        results = [None] * total  # 预分配结果列表，保持顺序
-        
-        # 分批
-        batches = []
-        for i in range(0, total, batch_size):
-            batch_items = texts[i:i + batch_size]
-            batch_texts = [item['text'] for item in batch_items]
-            batches.append({
-                'start_idx': i,
-                'items': batch_items,
-                'texts': batch_texts
-            })
-        
-        print(f"总共 {total} 段，分成 {len(batches)} 批，每批最多 {batch_size} 段")
-        
-        # 使用线程池并发处理
-        def process_batch(batch_info):
+        for segments in targets.values():
+            for segment in segments:
+                segment.translation = None
+        
+        # 每个段落每种语言只回调一次
+        emitted = set()
+        emit_lock = threading.Lock()
+        
+        def emit(lang, idx):
+            if on_segment is None:
+                return
+            with emit_lock:
+                if (lang, idx) in emitted:
+                    return
+                emitted.add((lang, idx))
+            on_segment(lang, idx, targets[lang][idx])
+        
+        # 原文相同的段落只翻译一次：每组的第一个段落代表整组
+        duplicates = {}
+        for idx, text in enumerate(texts):
+            duplicates.setdefault(text, []).append(idx)
+        
+        def assign(lang, idx, translation):
+            """写入译文（同时写入原文相同的段落）"""
+            for dup in duplicates[texts[idx]]:
+                targets[lang][dup].translation = translation
+                emit(lang, dup)
+        
+        # 本地预过滤：无需翻译的段落直接原样返回，并在本地检测源语言
+        pending = [indices[0] for indices in duplicates.values()]
+        unique_count = len(pending)
+        
+        # 已有的译文（预翻译结果）直接写入
+        if known:
+            for idx in pending:
+                for lang in langs:
+                    translation = known.get(lang, {}).get(texts[idx])
+                    if translation is not None:
+                        assign(lang, idx, translation)
+            pending = [idx for idx in pending if any(targets[lang][idx].translation is None for lang in langs)]
+        
+        if self._prefilter_enabled():
+            with profiling.span('translate.prefilter', segments=total):
+                source_lang = PreFilter.resolve_source_lang(texts, source_lang)
+                remaining = []
+                for idx in pending:
+                    needed = False
+                    for lang in langs:
+                        if targets[lang][idx].translation is not None:
+                            continue
+                        if PreFilter.should_skip(texts[idx], lang):
+                            assign(lang, idx, texts[idx])
+                        else:
+                            needed = True
+                    if needed:
+                        remaining.append(idx)
+                pending = remaining
+        
+        # 超长段落不放入批次，单独在句子边界切分后并发翻译（避免单个请求过大而超时或译文被截断）
+        split_tokens = self._split_tokens()
+        batch_indices = pending
+        long_indices = []
+        if split_tokens:
+            batch_indices = []
+            for idx in pending:
+                if Segmenter.estimate_tokens(texts[idx]) > split_tokens:
+                    long_indices.append(idx)
+                else:
+                    batch_indices.append(idx)
+        
+        # 分批；多种语言时按模型配置把几种语言合并到一个请求
+        batches = [batch_indices[i:i + batch_size] for i in range(0, len(batch_indices), batch_size)]
+        per_request = self._languages_per_request(model_config) if len(langs) > 1 else 1
+        lang_groups = [langs[i:i + per_request] for i in range(0, len(langs), per_request)]
+        
+        print(f"总共 {total} 段（去重后 {unique_count} 段），跳过 {unique_count - len(pending)} 段无需翻译，分成 {len(batches)} 批，每批最多 {batch_size} 段，{len(long_indices)} 段超长段落切分翻译，"
+              f"目标语言 {'、'.join(langs)}（每个请求 {per_request} 种）")
+        
+        cache = get_translation_cache()
+        model_key = self._model_key(model_config)
+        
+        # 处理单个批次的一组语言（在调度器工作线程中执行）
+        @profiling.traced('translate.process_batch')
+        def process_batch(batch, group_langs):
             """处理一个批次"""
+            # 执行时再查缓存：预翻译或其他请求已完成的段落不再调用API
+            todo = {}  # 语言 -> 仍需翻译的段落序号
+            for lang in group_langs:
+                for idx in batch:
+                    if targets[lang][idx].translation is not None:
+                        continue
+                    cached = cache.get(texts[idx], lang, source_lang, model_key)
+                    if cached is not None:
+                        assign(lang, idx, cached)
+                    else:
+                        todo.setdefault(lang, []).append(idx)
+            if not todo:
+                return
+            
             try:
-                start_idx = batch_info['start_idx']
-                items = batch_info['items']
-                texts = batch_info['texts']
-                
-                # 批量翻译
-                translations = self.translate_batch_optimized(texts, target_lang, source_lang, model_config)
-                
-                # 构建结果
-                batch_results = []
-                for idx, item in enumerate(items):
-                    result_item = item.copy()
-                    result_item['translation'] = translations[idx] if idx < len(translations) else "[翻译失败]"
-                    batch_results.append((start_idx + idx, result_item))
-                
-                return batch_results
+                if len(todo) == 1:
+                    # 批量翻译
+                    lang, indices = next(iter(todo.items()))
+                    translations = self.translate_batch_optimized(
+                        [texts[idx] for idx in indices], lang, source_lang, model_config,
+                        on_segment=(lambda pos, translation: assign(lang, indices[pos], translation)) if on_segment else None)
+                    for pos, idx in enumerate(indices):
+                        assign(lang, idx, translations[pos] if pos < len(translations) else "[翻译失败]")
+                else:
+                    # 一个请求同时翻译多种语言（某种语言已有译文的段落也一并翻译，结果只写入缺失的语言）
+                    indices = sorted({idx for lang_indices in todo.values() for idx in lang_indices})
+                    needed = {lang: set(lang_indices) for lang, lang_indices in todo.items()}
+                    
+                    def on_multi_segment(pos, lang, translation):
+                        if indices[pos] in needed.get(lang, ()):
+                            assign(lang, indices[pos], translation)
+                    
+                    results = self.translate_batch_multi_optimized(
+                        [texts[idx] for idx in indices], list(todo), source_lang, model_config,
+                        on_segment=on_multi_segment if on_segment else None)
+                    for lang, translations in results.items():
+                        for pos, idx in enumerate(indices):
+                            if idx in needed[lang]:
+                                assign(lang, idx, translations[pos])
                 
             except Exception as e:
                 print(f"批次处理失败: {str(e)}")
                 # 失败时逐段翻译
-                batch_results = []
-                for idx, item in enumerate(batch_info['items']):
-                    try:
-                        translation = self.translate_text(item['text'], target_lang, source_lang, model_config)
-                        result_item = item.copy()
-                        result_item['translation'] = translation
-                    except:
-                        result_item = item.copy()
-                        result_item['translation'] = "[翻译失败]"
-                    batch_results.append((batch_info['start_idx'] + idx, result_item))
-                return batch_results
-        
-        # 使用线程池并发处理批次
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有批次
-            future_to_batch = {executor.submit(process_batch, batch): batch for batch in batches}
+                for lang, indices in todo.items():
+                    for idx in indices:
+                        try:
+                            assign(lang, idx, self.translate_text(texts[idx], lang, source_lang, model_config))
+                        except:
+                            assign(lang, idx, "[翻译失败]")
             
-            # 获取结果
-            for future in as_completed(future_to_batch):
-                batch_results = future.result()
-                # 将结果放回正确位置
-                for idx, result_item in batch_results:
-                    results[idx] = result_item
+            for lang, indices in todo.items():
+                for idx in indices:
+                    translation = targets[lang][idx].translation
+                    if translation != "[翻译失败]":
+                        cache.put(texts[idx], lang, source_lang, model_key, translation)
         
-        return results
+        # 处理单个超长段落（切分后的各块由调度器并发翻译）
+        @profiling.traced('translate.process_long_segment')
+        def process_long_segment(idx, lang):
+            """处理一个超长段落"""
+            if targets[lang][idx].translation is not None:
+                return
+            cached = cache.get(texts[idx], lang, source_lang, model_key)
+            if cached is not None:
+                assign(lang, idx, cached)
+                return
+            try:
+                translation = self.translate_text(texts[idx], lang, source_lang, model_config)
+            except Exception as e:
+                print(f"超长段落翻译失败: {str(e)}")
+                assign(lang, idx, "[翻译失败]")
+                return
+            assign(lang, idx, translation)
+            cache.put(texts[idx], lang, source_lang, model_key, translation)
+        
+        # 提交到进程级共享调度器（全局并发上限，按用户轮询）
+        scheduler = get_scheduler()
+        tenant = tenant or f'batch-{id(targets)}'
+        futures = [
+            scheduler.submit(process_batch, batch, group_langs, priority=priority, tenant=tenant, limit=max_workers)
+            for batch in batches
+            for group_langs in lang_groups
+        ]
+        futures += [
+            scheduler.submit(process_long_segment, idx, lang, priority=priority, tenant=tenant, limit=max_workers)
+            for idx in long_indices
+            for lang in langs
+        ]
+        
+        # 等待所有批次完成
+        with profiling.span('translate.wait', batches=len(futures)):
+            for future in as_completed(futures):
+                future.result()
     
-    def translate_image(self, image_base64: str, target_lang: str = 'zh-CN', model_config: dict = None) -> str:
+    def translate_image(self, image_base64: str, target_lang: str = 'zh-CN', model_config: dict = None, mime_type: str = 'image/jpeg') -> str:
         """
         整图翻译（直接发送图片给AI进行翻译）
         
@@ -287,10 +800,16 @@ class Translator:
             image_base64: 图片的base64编码（不含data:image前缀）
             target_lang: 目标语言代码
             model_config: 模型配置
+            mime_type: 图片类型
         
         Returns:
             翻译后的文本
         """
+        key = SingleFlight.make_key('image', [image_base64], target_lang, self._model_key(model_config))
+        return self._in_flight.do(key, self._request_image, image_base64, target_lang, model_config, mime_type)
+    
+    def _request_image(self, image_base64: str, target_lang: str, model_config: dict = None, mime_type: str = 'image/jpeg') -> str:
+        """调用视觉模型API翻译图片"""
         try:
             # 使用传入的模型配置，或使用默认配置
             if model_config is None:
@@ -315,11 +834,6 @@ class Translator:
 请开始翻译："""
             
             # 调用API（支持vision模型）
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
             payload = {
                 'model': model,
                 'messages': [
@@ -333,7 +847,7 @@ class Translator:
                             {
                                 'type': 'image_url',
                                 'image_url': {
-                                    'url': f'data:image/jpeg;base64,{image_base64}'
+                                    'url': f'data:{mime_type};base64,{image_base64}'
                                 }
                             }
                         ]
@@ -343,19 +857,9 @@ class Translator:
                 'max_tokens': 2000
             }
             
-            response = requests.post(
-                f'{api_base}/v1/chat/completions',
-                headers=headers,
-                json=payload,
-                timeout=60  # 图片处理可能需要更长时间
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                translation = result['choices'][0]['message']['content'].strip()
-                return translation
-            else:
-                raise Exception(f"API请求失败: {response.status_code} - {response.text}")
+            with profiling.span('provider.request', kind='image', model=model):
+                # 图片处理可能需要更长时间
+                return self._chat_completion(api_base, payload, model_config, timeout=60).strip()
                 
         except Exception as e:
             raise Exception(f"整图翻译错误: {str(e)}")